@@ -0,0 +1,60 @@
+"""
+Memory and allocation benchmark of the IR: interprets a large synthetic puzzle and reports 
+the retained memory, the peak memory, the number of retained allocations and the wall time as JSON. 
+
+    python benchmarks/bench_ir_memory.py --n-statements 20000 
+"""
+import gc 
+import json 
+import time 
+import argparse 
+import tracemalloc 
+
+from aitestgen.llm.json_2_prompt import execute_json_statements 
+
+def make_json_statements (n_statements :int, n_variables :int): 
+    json_statements = [] 
+    for i in range(n_statements): 
+        var_name = f"v{i % n_variables}"
+        if (i % 3 == 0): 
+            json_statements.append([":=", ["var", var_name], ["var", f"v{(i + 1) % n_variables}"]])
+        elif (i % 3 == 1): 
+            json_statements.append(["assert", ["startsWith", ["var", var_name], "www"]])
+        else: 
+            json_statements.append(["assert", ["not", ["endsWith", ["subStr", ["var", var_name], 0, 8], ".net"]]])
+    return json_statements 
+
+def run (n_statements :int, n_variables :int): 
+    json_statements = make_json_statements(n_statements, n_variables)
+
+    gc.collect() 
+    tracemalloc.start() 
+    snapshot_before = tracemalloc.take_snapshot() 
+    time_start = time.perf_counter() 
+    exe_context = execute_json_statements(json_statements)
+    wall_time = time.perf_counter() - time_start 
+    gc.collect() 
+    snapshot_after = tracemalloc.take_snapshot() 
+    current_bytes, peak_bytes = tracemalloc.get_traced_memory() 
+    tracemalloc.stop() 
+
+    stats = snapshot_after.compare_to(snapshot_before, "filename")
+    return {
+        "benchmark": "ir_memory", 
+        "n_statements": n_statements, 
+        "n_variables": n_variables, 
+        "n_executed_statements": len(exe_context.executed_statements), 
+        "wall_time_seconds": wall_time, 
+        "retained_bytes": sum([stat.size_diff for stat in stats]), 
+        "retained_allocations": sum([stat.count_diff for stat in stats]), 
+        "current_bytes": current_bytes, 
+        "peak_bytes": peak_bytes 
+    }
+
+if __name__ == "__main__": 
+    arg_parser = argparse.ArgumentParser(description="IR memory and allocation benchmark")
+    arg_parser.add_argument("--n-statements", type=int, default=20000)
+    arg_parser.add_argument("--n-variables", type=int, default=100)
+    args = arg_parser.parse_args() 
+
+    print(json.dumps(run(n_statements=args.n_statements, n_variables=args.n_variables), indent=2))
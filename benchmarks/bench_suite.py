@@ -0,0 +1,194 @@
+"""
+Benchmark suite: times the interpretation, the prompt generation and the end-to-end solving of synthetic puzzles
+against the offline stub backend (with injected latency), and reports the results as JSON.
+
+    PYTHONPATH=src python benchmarks/bench_suite.py --n-puzzles 64 --latency 0.05 --output bench.json
+"""
+import sys
+import json
+import time
+import asyncio
+import argparse
+import platform
+import statistics
+from typing import Callable, Dict, List
+
+from aitestgen.ir.interpreter import ExecutionContext, interpret_json_statement
+from aitestgen.llm.json_2_prompt import execute_json_statements, generate_prompt_from_json_statements
+from aitestgen.llm.client import ChatGPTClient
+from aitestgen.llm.stub import StubChatModel
+from aitestgen.llm.replay import ReplayLLMClient
+
+from synthetic_puzzles import make_synthetic_puzzle
+
+def get_aitestgen_version () -> str:
+    try:
+        from importlib.metadata import version
+        return version("aitestgen")
+    except Exception: # running from the source tree
+        return None
+
+def summarize (name :str, durations :List[float], n_items :int=None) -> Dict:
+    """
+    durations are in seconds, one per repetition; n_items is the number of items processed per repetition.
+    """
+    durations = sorted(durations)
+    summary = {
+        "name": name,
+        "repeat": len(durations),
+        "min_seconds": durations[0],
+        "median_seconds": statistics.median(durations),
+        "mean_seconds": statistics.mean(durations),
+        "max_seconds": durations[-1]
+    }
+    if (n_items is not None):
+        summary["n_items"] = n_items
+        summary["median_seconds_per_item"] = summary["median_seconds"] / max(1, n_items)
+    return summary
+
+def time_repeatedly (run_once :Callable[[], None], repeat :int) -> List[float]:
+    durations = []
+    for _ in range(repeat):
+        time_start = time.perf_counter()
+        run_once()
+        durations.append(time.perf_counter() - time_start)
+    return durations
+
+def run (
+        n_puzzles :int=16,
+        n_statements :int=32,
+        chain_depth :int=2,
+        substr_depth :int=1,
+        n_variables :int=8,
+        n_components :int=1,
+        latency :float=0.0,
+        latency_per_chunk :float=0.0,
+        concurrency :int=8,
+        repeat :int=3,
+        replay_path :str=None,
+        jitter :float=0.0
+) -> Dict:
+    puzzles = [
+        make_synthetic_puzzle(
+            n_statements=n_statements,
+            chain_depth=chain_depth,
+            substr_depth=substr_depth,
+            n_variables=n_variables,
+            n_components=n_components,
+            seed=seed
+        )
+        for seed in range(n_puzzles)
+    ]
+    n_total_statements = sum([len(puzzle) for puzzle in puzzles])
+
+    def interpret_all ():
+        for puzzle in puzzles:
+            exe_context = ExecutionContext()
+            for json_stat in puzzle:
+                exe_context = interpret_json_statement(json_obj=json_stat, exe_context=exe_context)
+
+    def build_client () -> ChatGPTClient:
+        if (replay_path is not None): # recorded completions, the stub answers the prompts that were not recorded
+            return ReplayLLMClient(
+                replay_path,
+                latency_seconds=latency,
+                jitter_seconds=jitter,
+                fallback=StubChatModel(),
+                max_concurrency=concurrency
+            )
+        return ChatGPTClient(
+            llm=StubChatModel(latency_seconds=latency, latency_per_chunk_seconds=latency_per_chunk),
+            max_concurrency=concurrency
+        )
+
+    def solve_sequentially ():
+        client = build_client()
+        for puzzle in puzzles:
+            client.solve_json_statements(puzzle)
+
+    def solve_streaming ():
+        client = build_client()
+        for puzzle in puzzles:
+            client.solve_json_statements_streaming(puzzle)
+
+    def solve_many ():
+        build_client().solve_many(puzzles, max_concurrency=concurrency)
+
+    def asolve_many ():
+        asyncio.run(build_client().asolve_many(puzzles, max_concurrency=concurrency))
+
+    def solve_many_packed ():
+        build_client().solve_many_packed(puzzles, max_concurrency=concurrency)
+
+    results = [
+        summarize("interpret_json_statement", time_repeatedly(interpret_all, repeat), n_items=n_total_statements),
+        summarize("execute_json_statements", time_repeatedly(lambda: [execute_json_statements(puzzle) for puzzle in puzzles], repeat), n_items=n_puzzles),
+        summarize("generate_prompt_from_json_statements", time_repeatedly(lambda: [generate_prompt_from_json_statements(puzzle) for puzzle in puzzles], repeat), n_items=n_puzzles),
+        summarize("solve_json_statements", time_repeatedly(solve_sequentially, repeat), n_items=n_puzzles),
+        summarize("solve_json_statements_streaming", time_repeatedly(solve_streaming, repeat), n_items=n_puzzles),
+        summarize("solve_many", time_repeatedly(solve_many, repeat), n_items=n_puzzles),
+        summarize("asolve_many", time_repeatedly(asolve_many, repeat), n_items=n_puzzles),
+        summarize("solve_many_packed", time_repeatedly(solve_many_packed, repeat), n_items=n_puzzles)
+    ]
+
+    return {
+        "benchmark": "suite",
+        "aitestgen_version": get_aitestgen_version(),
+        "python_version": platform.python_version(),
+        "platform": platform.platform(),
+        "timestamp": time.time(),
+        "parameters": {
+            "n_puzzles": n_puzzles,
+            "n_statements": n_statements,
+            "chain_depth": chain_depth,
+            "substr_depth": substr_depth,
+            "n_variables": n_variables,
+            "n_components": n_components,
+            "latency_seconds": latency,
+            "latency_per_chunk_seconds": latency_per_chunk,
+            "concurrency": concurrency,
+            "repeat": repeat,
+            "replay_path": replay_path,
+            "jitter_seconds": jitter
+        },
+        "results": results
+    }
+
+if __name__ == "__main__":
+    arg_parser = argparse.ArgumentParser(description="Interpretation, prompt generation and end-to-end solving benchmarks")
+    arg_parser.add_argument("--n-puzzles", type=int, default=16)
+    arg_parser.add_argument("--n-statements", type=int, default=32)
+    arg_parser.add_argument("--chain-depth", type=int, default=2)
+    arg_parser.add_argument("--substr-depth", type=int, default=1)
+    arg_parser.add_argument("--n-variables", type=int, default=8)
+    arg_parser.add_argument("--n-components", type=int, default=1)
+    arg_parser.add_argument("--latency", type=float, default=0.0, help="the injected latency of every stub LLM call, in seconds")
+    arg_parser.add_argument("--latency-per-chunk", type=float, default=0.0, help="the injected latency of every streamed chunk, in seconds")
+    arg_parser.add_argument("--replay", default=None, help="replay the completions recorded in this file (see aitestgen.llm.replay) instead of the stub")
+    arg_parser.add_argument("--jitter", type=float, default=0.0, help="the max jitter added to the replay latency, in seconds")
+    arg_parser.add_argument("--concurrency", type=int, default=8)
+    arg_parser.add_argument("--repeat", type=int, default=3)
+    arg_parser.add_argument("--output", default=None, help="the JSON result file (default: stdout)")
+    args = arg_parser.parse_args()
+
+    result = run(
+        n_puzzles=args.n_puzzles,
+        n_statements=args.n_statements,
+        chain_depth=args.chain_depth,
+        substr_depth=args.substr_depth,
+        n_variables=args.n_variables,
+        n_components=args.n_components,
+        latency=args.latency,
+        latency_per_chunk=args.latency_per_chunk,
+        concurrency=args.concurrency,
+        repeat=args.repeat,
+        replay_path=args.replay,
+        jitter=args.jitter
+    )
+
+    if (args.output is None):
+        json.dump(result, sys.stdout, indent=2)
+        print()
+    else:
+        with open(args.output, "w") as f:
+            json.dump(result, f, indent=2)
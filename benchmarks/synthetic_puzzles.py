@@ -0,0 +1,67 @@
+"""
+Parameterized synthetic puzzles (json statements) for the benchmarks.
+
+Every puzzle is satisfied by giving "www.example.net" to all of its unbounded variables,
+so the offline stub backend (aitestgen.llm.stub.StubChatModel) always answers it correctly.
+"""
+import random
+from typing import List
+
+ANSWER = "www.example.net"
+
+def nest_sub_str (json_expr :List, substr_depth :int) -> List:
+    # every level keeps the "www." prefix
+    for depth in range(substr_depth):
+        json_expr = ["subStr", json_expr, 0, len(ANSWER) - depth]
+    return json_expr
+
+def make_synthetic_puzzle (
+        n_statements :int=32,
+        chain_depth :int=2,
+        substr_depth :int=1,
+        n_variables :int=8,
+        n_components :int=1,
+        seed :int=0
+) -> List:
+    """
+    A puzzle of exactly n_statements json statements over n_variables unbounded variables,
+    split into n_components independent components (as long as n_statements allows linking them).
+
+    - the variables of a component are first linked by equalities,
+    - then come, at random, assignment chains of chain_depth copies ending in an assertion,
+      startsWith assertions on subStr expressions nested substr_depth deep, and endsWith assertions.
+    """
+    assert(n_components >= 1 and n_variables >= n_components)
+
+    rng = random.Random(seed)
+    component_vars = [
+        [f"c{k}_v{j}" for j in range(n_variables // n_components + (1 if k < n_variables % n_components else 0))]
+        for k in range(n_components)
+    ]
+
+    json_statements = []
+    for var_names in component_vars:
+        for var_name, next_var_name in zip(var_names, var_names[1:]):
+            json_statements.append(["assert", ["==", ["var", var_name], ["var", next_var_name]]])
+
+    i_chain = 0
+    while (len(json_statements) < n_statements):
+        var_name = rng.choice(rng.choice(component_vars))
+        kind = rng.choice(["chain", "prefix", "suffix"])
+
+        if (kind == "chain"):
+            prev_var_name = var_name
+            for depth in range(chain_depth):
+                chain_var_name = f"{var_name}_t{i_chain}_{depth}"
+                json_statements.append([":=", ["var", chain_var_name], ["var", prev_var_name]])
+                prev_var_name = chain_var_name
+            json_statements.append(["assert", ["endsWith", ["var", prev_var_name], ".net"]])
+            i_chain += 1
+
+        elif (kind == "prefix"):
+            json_statements.append(["assert", ["startsWith", nest_sub_str(["var", var_name], substr_depth), "www"]])
+
+        else:
+            json_statements.append(["assert", ["endsWith", ["var", var_name], ".net"]])
+
+    return json_statements[:n_statements]
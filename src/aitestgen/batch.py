@@ -0,0 +1,202 @@
+import os
+import json
+import asyncio
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, Iterator, List, Set, Tuple, Union
+
+from .llm.json_2_prompt import execute_json_statements
+from .llm.client import ChatGPTClient, DEFAULT_MAX_CONCURRENCY
+from .llm.ratelimit import PRIORITY_BATCH, rate_limit_priority
+from .ir.simplify import simplify_execution_context
+from .solver.symbolic import SAT, UNSAT, UnsatisfiableConstraintsError, solve_symbolically
+
+import logging
+logging.basicConfig(level=logging.INFO)
+
+# ====
+# Puzzle files
+# ====
+def line_puzzle_id (i_line :int) -> str:
+    # a namespace of its own, so that an explicit id never collides with a line number
+    return f"line:{i_line}"
+
+def read_batch_puzzles (input_path :str) -> Iterator[Tuple[str, Union[List, ValueError]]]:
+    """
+    Read (puzzle id, json statements) pairs from a JSONL file.
+    A line is either a JSON array of statements or an object {"id": ..., "statements": [...]};
+    puzzles without an id are identified by their line number ("line:<i>").
+    A malformed line gets a ValueError instead of its statements.
+    """
+    with open(input_path, "r") as f:
+        for i_line, line in enumerate(f):
+            if (line.strip() == ""):
+                continue
+
+            try:
+                puzzle = json.loads(line)
+            except json.JSONDecodeError as ex:
+                yield (line_puzzle_id(i_line), ValueError(f"Invalid JSON: {ex}"))
+                continue
+
+            if (isinstance(puzzle, dict)):
+                puzzle_id = (str(puzzle["id"]) if ("id" in puzzle) else line_puzzle_id(i_line))
+                if (not isinstance(puzzle.get("statements"), list)):
+                    yield (puzzle_id, ValueError("No \"statements\" list"))
+                    continue
+                yield (puzzle_id, puzzle["statements"])
+            elif (isinstance(puzzle, list)):
+                yield (line_puzzle_id(i_line), puzzle)
+            else:
+                yield (line_puzzle_id(i_line), ValueError(f"Not a list of statements: {puzzle!r}"))
+
+def read_checkpoint (checkpoint_path :str) -> Set[str]:
+    done_ids = set()
+    if (os.path.exists(checkpoint_path)):
+        with open(checkpoint_path, "r") as f:
+            for line in f:
+                try:
+                    done_ids.add(json.loads(line)["id"])
+                except (json.JSONDecodeError, KeyError): # a torn last line of a killed run
+                    pass
+    return done_ids
+
+# ====
+# CPU-bound preparation (runs in the process pool)
+# ====
+def prepare_batch_puzzle (json_statements :List, use_symbolic_solver :bool, simplify :bool=False) -> Dict:
+    """
+    Validate the puzzle, and settle it without the LLM if possible: {"solution": ...} or a final {"error": ...}.
+    The other puzzles are left to the client ({"unsolved": True}).
+    """
+    try:
+        exe_context = execute_json_statements(json_statements)
+    except Exception as ex: # the puzzle's error (final), unlike the errors of the pool itself
+        return {"error": f"Invalid puzzle: {ex!r}", "final": True}
+
+    if (simplify):
+        try:
+            simplify_execution_context(exe_context)
+        except UnsatisfiableConstraintsError as ex:
+            return {"error": f"Unsatisfiable: {ex}", "final": True}
+
+    if (use_symbolic_solver):
+        symbolic_solution = solve_symbolically(exe_context)
+        if (symbolic_solution.status == SAT):
+            return {"solution": symbolic_solution.to_solution()}
+        elif (symbolic_solution.status == UNSAT):
+            return {"error": f"Unsatisfiable: {symbolic_solution.reason}", "final": True}
+
+    return {"unsolved": True}
+
+# ====
+# Summary
+# ====
+class BatchSummary :
+    def __init__ (self):
+        self.n_solved = 0
+        self.n_failed = 0
+        self.n_skipped = 0
+
+    def to_dict (self) -> Dict:
+        return {"solved": self.n_solved, "failed": self.n_failed, "skipped": self.n_skipped}
+
+    def __repr__ (self) -> str:
+        return f"BatchSummary({self.to_dict()})"
+
+# ====
+# Batch run
+# ====
+async def arun_batch (
+        client :ChatGPTClient,
+        input_path :str,
+        output_path :str,
+        checkpoint_path :str=None,
+        max_concurrency :int=DEFAULT_MAX_CONCURRENCY,
+        n_processes :int=None,
+        use_symbolic_solver :bool=False,
+        simplify :bool=False
+) -> BatchSummary:
+    """
+    Solve every puzzle of input_path and append one JSON line per puzzle to output_path as soon as it finishes:
+    {"id": ..., "solution": {...}} or {"id": ..., "error": "..."}.
+
+    Completed puzzles are recorded in the checkpoint file (default: <output_path>.ckpt) and skipped by later runs,
+    so a killed run resumes without paying for them again.
+    Failed puzzles are not checkpointed (and retried on resume), unless the failure is final (e.g., invalid or unsatisfiable),
+    so a retried puzzle may have several records in output_path: the last record of an id wins.
+
+    The puzzles are validated (and simplified or solved symbolically) in the process pool;
+    the others go through the client's solve pipeline (answer format, cache, verification),
+    which interprets them once more in this process. An answer that fails verification is an error, retried on resume.
+    """
+    if (checkpoint_path is None):
+        checkpoint_path = f"{output_path}.ckpt"
+
+    summary = BatchSummary()
+    done_ids = read_checkpoint(checkpoint_path)
+    loop = asyncio.get_running_loop()
+    semaphore = asyncio.Semaphore(max(1, max_concurrency))
+
+    with open(output_path, "a") as output_file, \
+            open(checkpoint_path, "a") as checkpoint_file, \
+            ProcessPoolExecutor(max_workers=n_processes) as process_pool:
+
+        def write_result (puzzle_id :str, result :Dict, is_final :bool):
+            output_file.write(json.dumps({"id": puzzle_id, **result}) + "\n")
+            output_file.flush()
+            if (is_final):
+                checkpoint_file.write(json.dumps({"id": puzzle_id}) + "\n")
+                checkpoint_file.flush()
+
+        async def solve_one (puzzle_id :str, json_statements :List):
+            try:
+                try:
+                    prepared = await loop.run_in_executor(process_pool, prepare_batch_puzzle, json_statements, use_symbolic_solver, simplify)
+                except Exception as ex: # e.g., a broken pool or a pickling error: retried on resume
+                    prepared = {"error": f"Preparation failed: {ex!r}", "final": False}
+
+                if ("unsolved" in prepared):
+                    try:
+                        with rate_limit_priority(PRIORITY_BATCH):
+                            solution, result = await client.asolve_and_verify_json_statements(json_statements)
+                        if (result.is_valid):
+                            prepared = {"solution": solution}
+                        else:
+                            prepared = {"error": f"Unverified answer: {result}", "final": False}
+                    except UnsatisfiableConstraintsError as ex:
+                        prepared = {"error": f"Unsatisfiable: {ex}", "final": True}
+                    except Exception as ex:
+                        prepared = {"error": repr(ex), "final": False}
+
+                if ("solution" in prepared):
+                    summary.n_solved += 1
+                    write_result(puzzle_id, {"solution": prepared["solution"]}, is_final=True)
+                else:
+                    summary.n_failed += 1
+                    write_result(puzzle_id, {"error": prepared["error"]}, is_final=prepared["final"])
+
+            finally:
+                semaphore.release()
+
+        tasks = []
+        for puzzle_id, json_statements in read_batch_puzzles(input_path):
+            if (puzzle_id in done_ids):
+                summary.n_skipped += 1
+                continue
+
+            if (isinstance(json_statements, ValueError)): # a malformed line fails alone
+                summary.n_failed += 1
+                write_result(puzzle_id, {"error": f"Invalid puzzle: {json_statements}"}, is_final=True)
+                continue
+
+            # backpressure: at most max_concurrency puzzles in flight, the input is read lazily
+            await semaphore.acquire()
+            tasks.append(asyncio.create_task(solve_one(puzzle_id, json_statements)))
+            tasks = [task for task in tasks if (not task.done())]
+
+        await asyncio.gather(*tasks)
+
+    return summary
+
+def run_batch (*args, **kwargs) -> BatchSummary:
+    return asyncio.run(arun_batch(*args, **kwargs))
@@ -0,0 +1,122 @@
+import sys
+import json
+import argparse
+from typing import List
+
+from .llm.client import ChatGPTClient, DEFAULT_MAX_CONCURRENCY
+from .llm.registry import ClientRegistry
+from .llm.cascade import CascadingClient
+from .llm.ratelimit import RateLimitScheduler
+from .llm.json_2_prompt import ANSWER_FORMAT_TEXT, ANSWER_FORMATS
+from .instrumentation import Instrumentation, StatsInstrument
+from .server import DEFAULT_HOST, DEFAULT_PORT, DEFAULT_MAX_QUEUE_SIZE, run_server
+
+import logging
+logging.basicConfig(level=logging.INFO)
+
+# ====
+# Sub-commands
+# ====
+def add_client_arguments (arg_parser :argparse.ArgumentParser):
+    arg_parser.add_argument("--model", default="gpt-3.5-turbo", help="the OpenAI model")
+    arg_parser.add_argument("--endpoint-url", default=None, help="the OpenAI-compatible endpoint")
+    arg_parser.add_argument("--max-tokens", type=int, default=256, help="the max number of completion tokens per call")
+    arg_parser.add_argument("--requests-per-minute", type=float, default=None, help="the request budget (default: learned from the rate-limit headers)")
+    arg_parser.add_argument("--tokens-per-minute", type=float, default=None, help="the token budget (default: learned from the rate-limit headers)")
+
+def build_client (args :argparse.Namespace, registry :ClientRegistry=None, model :str=None, **client_kwargs) -> ChatGPTClient:
+    # the API key is read from OPENAI_API_KEY; one keep-alive connection per in-flight request
+    if (registry is None):
+        registry = ClientRegistry(
+            max_connections=max(1, args.concurrency),
+            max_keepalive_connections=max(1, args.concurrency)
+        )
+    return registry.get_client(
+        model=(args.model if model is None else model),
+        endpoint_url=args.endpoint_url,
+        default_max_tokens=args.max_tokens,
+        rate_limiter=RateLimitScheduler(requests_per_minute=args.requests_per_minute, tokens_per_minute=args.tokens_per_minute),
+        **client_kwargs
+    )
+
+def run_batch_command (args :argparse.Namespace) -> int:
+    from .batch import run_batch
+
+    summary = run_batch(
+        client=build_client(args),
+        input_path=args.input,
+        output_path=args.output,
+        checkpoint_path=args.checkpoint,
+        max_concurrency=args.concurrency,
+        n_processes=args.processes,
+        use_symbolic_solver=args.symbolic,
+        simplify=args.simplify
+    )
+    print(json.dumps(summary.to_dict()))
+    return 0
+
+def run_serve_command (args :argparse.Namespace) -> int:
+    registry = ClientRegistry(max_connections=max(1, args.concurrency), max_keepalive_connections=max(1, args.concurrency))
+    client_kwargs = {
+        "use_symbolic_solver": args.symbolic, 
+        "simplify": args.simplify, 
+        "answer_format": args.answer_format, 
+        "max_concurrency": args.concurrency
+    }
+    # the clients (and the cascade) report to one instrument, whose aggregates GET /healthz returns
+    stats_instrument = StatsInstrument()
+    instrumentation = Instrumentation([stats_instrument])
+    client = build_client(args, registry, instrumentation=instrumentation, **client_kwargs)
+    if (args.cascade_model is not None): # the cheaper model first, then --model for the puzzles it fails 
+        cheap_client = build_client(args, registry, model=args.cascade_model, instrumentation=instrumentation, **client_kwargs)
+        client = CascadingClient([cheap_client, client], instrumentation=instrumentation)
+
+    run_server(
+        client=client,
+        host=args.host,
+        port=args.port,
+        max_concurrency=args.concurrency,
+        max_queue_size=args.queue_size,
+        stats_instrument=stats_instrument,
+        registry=registry
+    )
+    return 0
+
+# ====
+# Entry point
+# ====
+def build_arg_parser () -> argparse.ArgumentParser:
+    arg_parser = argparse.ArgumentParser(prog="aitestgen", description="AI driven test generation")
+    sub_parsers = arg_parser.add_subparsers(dest="command", required=True)
+
+    batch_parser = sub_parsers.add_parser("batch", help="solve a JSONL file of puzzles, with checkpoint/resume")
+    batch_parser.add_argument("input", help="the input JSONL file, one puzzle per line")
+    batch_parser.add_argument("output", help="the output JSONL file, one result per line (appended)")
+    batch_parser.add_argument("--checkpoint", default=None, help="the checkpoint file (default: <output>.ckpt)")
+    batch_parser.add_argument("--concurrency", type=int, default=DEFAULT_MAX_CONCURRENCY, help="the max number of in-flight puzzles")
+    batch_parser.add_argument("--processes", type=int, default=None, help="the number of processes interpreting the puzzles")
+    batch_parser.add_argument("--symbolic", action="store_true", help="solve the supported fragment in-process")
+    batch_parser.add_argument("--simplify", action="store_true", help="simplify the puzzles before rendering their prompts")
+    add_client_arguments(batch_parser)
+    batch_parser.set_defaults(run=run_batch_command)
+
+    serve_parser = sub_parsers.add_parser("serve", help="serve an HTTP JSON API (POST /solve, POST /solve_many, GET /healthz)")
+    serve_parser.add_argument("--host", default=DEFAULT_HOST, help="the address to listen on")
+    serve_parser.add_argument("--port", type=int, default=DEFAULT_PORT, help="the port to listen on")
+    serve_parser.add_argument("--concurrency", type=int, default=DEFAULT_MAX_CONCURRENCY, help="the max number of puzzles solved at once")
+    serve_parser.add_argument("--queue-size", type=int, default=DEFAULT_MAX_QUEUE_SIZE, help="the max number of waiting puzzles, beyond which requests get 503")
+    serve_parser.add_argument("--symbolic", action="store_true", help="solve the supported fragment in-process")
+    serve_parser.add_argument("--simplify", action="store_true", help="simplify the puzzles before rendering their prompts")
+    serve_parser.add_argument("--cascade-model", default=None, help="a cheaper model to try first, escalating to --model on an invalid answer")
+    serve_parser.add_argument("--answer-format", choices=ANSWER_FORMATS, default=ANSWER_FORMAT_TEXT, help="ask for text lines, or for a JSON object constrained to the unknown variables")
+    add_client_arguments(serve_parser)
+    serve_parser.set_defaults(run=run_serve_command)
+
+    return arg_parser
+
+def main (argv :List[str]=None) -> int:
+    args = build_arg_parser().parse_args(argv)
+    return args.run(args)
+
+if __name__ == "__main__":
+    sys.exit(main())
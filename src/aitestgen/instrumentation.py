@@ -0,0 +1,225 @@
+import time
+import threading
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List
+from uuid import UUID
+
+from langchain_core.callbacks import BaseCallbackHandler
+from langchain_core.outputs import LLMResult
+
+from .llm.json_2_prompt import estimate_token_count
+
+import logging
+logging.basicConfig(level=logging.INFO)
+
+# ====
+# Globals
+# ====
+# the phases of the solve pipeline
+PHASE_SOLVE = "solve" # a whole solve_json_statements call
+PHASE_INTERPRET = "interpret" # execute_json_statements
+PHASE_SIMPLIFY = "simplify" # the simplification of the puzzle before the prompt rendering
+PHASE_SYMBOLIC = "symbolic" # the symbolic solver
+PHASE_CACHE = "cache" # the cache lookup
+PHASE_RENDER = "render" # the prompt rendering
+PHASE_LLM = "llm" # one LLM round trip
+PHASE_PARSE = "parse" # the answer parsing
+
+# the counters
+COUNTER_CACHE_HITS = "cache_hits"
+COUNTER_CACHE_MISSES = "cache_misses"
+COUNTER_LLM_CALLS = "llm_calls"
+COUNTER_LLM_ERRORS = "llm_errors"
+COUNTER_RETRIES = "retries"
+COUNTER_PROMPT_TOKENS = "prompt_tokens"
+COUNTER_COMPLETION_TOKENS = "completion_tokens"
+COUNTER_ESCALATIONS = "escalations" # a puzzle handed to the next tier of a model cascade
+
+# ====
+# Instruments
+# ====
+class Instrument :
+    """
+    The receiver of the measurements. Subclasses override the hooks they need (the default ones do nothing).
+    The hooks may be called from several threads.
+    """
+    def on_span_end (self, phase :str, start_time_ns :int, duration_seconds :float, attributes :Dict[str, Any]):
+        pass
+
+    def on_count (self, counter :str, value :int, attributes :Dict[str, Any]):
+        pass
+
+class _PhaseStats :
+    def __init__ (self):
+        self.count = 0
+        self.total_seconds = 0.0
+        self.max_seconds = 0.0
+
+    def to_dict (self) -> Dict:
+        return {
+            "count": self.count,
+            "total_seconds": self.total_seconds,
+            "mean_seconds": (self.total_seconds / self.count if self.count > 0 else 0.0),
+            "max_seconds": self.max_seconds
+        }
+
+class StatsInstrument (Instrument):
+    """
+    In-process aggregates: per phase count and wall time, and the counter totals.
+    """
+    def __init__ (self):
+        self._lock = threading.Lock()
+        self._phase_2_stats = {}
+        self._counter_2_total = {}
+
+    def on_span_end (self, phase :str, start_time_ns :int, duration_seconds :float, attributes :Dict[str, Any]):
+        with self._lock:
+            stats = self._phase_2_stats.setdefault(phase, _PhaseStats())
+            stats.count += 1
+            stats.total_seconds += duration_seconds
+            stats.max_seconds = max(stats.max_seconds, duration_seconds)
+
+    def on_count (self, counter :str, value :int, attributes :Dict[str, Any]):
+        with self._lock:
+            self._counter_2_total[counter] = self._counter_2_total.get(counter, 0) + value
+
+    def snapshot (self) -> Dict:
+        with self._lock:
+            return {
+                "phases": {phase: stats.to_dict() for phase, stats in self._phase_2_stats.items()},
+                "counters": dict(self._counter_2_total)
+            }
+
+    def reset (self):
+        with self._lock:
+            self._phase_2_stats.clear()
+            self._counter_2_total.clear()
+
+class OpenTelemetryInstrument (Instrument):
+    """
+    Exports the spans and the counters through OpenTelemetry (the opentelemetry-api package is required).
+    Without a tracer or a meter, the global providers are used.
+    """
+    def __init__ (self, tracer :Any=None, meter :Any=None):
+        try:
+            from opentelemetry import trace, metrics
+        except ImportError as ex:
+            raise ImportError("OpenTelemetryInstrument requires opentelemetry-api (pip install aitestgen[otel])") from ex
+
+        self.tracer = (trace.get_tracer("aitestgen") if tracer is None else tracer)
+        self.meter = (metrics.get_meter("aitestgen") if meter is None else meter)
+
+        self._lock = threading.Lock()
+        self._counters = {}
+
+    def on_span_end (self, phase :str, start_time_ns :int, duration_seconds :float, attributes :Dict[str, Any]):
+        span = self.tracer.start_span(f"aitestgen.{phase}", start_time=start_time_ns, attributes=attributes)
+        span.end(end_time=start_time_ns + int(duration_seconds * 1e9))
+
+    def on_count (self, counter :str, value :int, attributes :Dict[str, Any]):
+        with self._lock:
+            if (counter not in self._counters):
+                self._counters[counter] = self.meter.create_counter(f"aitestgen.{counter}")
+        self._counters[counter].add(value, attributes=attributes)
+
+# ====
+# Instrumentation
+# ====
+class Instrumentation :
+    """
+    Measures the phases (spans) and the counters and hands them to the instruments.
+    Without instruments, the measurements are skipped.
+    """
+    def __init__ (self, instruments :List[Instrument]=None):
+        self.instruments = list(instruments or [])
+
+    def add_instrument (self, instrument :Instrument):
+        self.instruments.append(instrument)
+
+    @contextmanager
+    def span (self, phase :str, **attributes) -> Iterator[Dict[str, Any]]:
+        """
+        Time the enclosed block. The yielded attributes can be completed inside the block.
+        """
+        if (len(self.instruments) == 0):
+            yield attributes
+            return
+
+        start_time_ns = time.time_ns()
+        time_start = time.perf_counter()
+        try:
+            yield attributes
+        except BaseException as ex:
+            attributes["error"] = type(ex).__name__
+            raise
+        finally:
+            self.end_span(phase, start_time_ns, time.perf_counter() - time_start, attributes)
+
+    def end_span (self, phase :str, start_time_ns :int, duration_seconds :float, attributes :Dict[str, Any]):
+        for instrument in self.instruments:
+            instrument.on_span_end(phase, start_time_ns, duration_seconds, attributes)
+
+    def count (self, counter :str, value :int=1, **attributes):
+        for instrument in self.instruments:
+            instrument.on_count(counter, value, attributes)
+
+# ====
+# LLM round trips and token usage (as a langchain callback)
+# ====
+class LLMUsageCallbackHandler (BaseCallbackHandler):
+    """
+    Reports every chat model call as an "llm" span, with its prompt and completion tokens.
+    The token usage comes from the response metadata, or is estimated from the texts if the model does not report it.
+    """
+    def __init__ (self, instrumentation :Instrumentation):
+        super().__init__()
+        self.instrumentation = instrumentation
+
+        self._lock = threading.Lock()
+        self._run_id_2_start = {} # run id -> (start time ns, perf counter, estimated prompt tokens)
+
+    def on_chat_model_start (self, serialized :Dict[str, Any], messages :List[List[Any]], *, run_id :UUID, **kwargs :Any) -> Any:
+        if (len(self.instrumentation.instruments) == 0):
+            return
+        prompt_tokens = sum([estimate_token_count(str(message.content)) for batch in messages for message in batch])
+        with self._lock:
+            self._run_id_2_start[run_id] = (time.time_ns(), time.perf_counter(), prompt_tokens)
+
+    def _end (self, run_id :UUID) -> Any:
+        with self._lock:
+            return self._run_id_2_start.pop(run_id, None)
+
+    def on_llm_end (self, response :LLMResult, *, run_id :UUID, **kwargs :Any) -> Any:
+        start = self._end(run_id)
+        if (start is None):
+            return
+        start_time_ns, time_start, prompt_tokens = start
+
+        completion_tokens = 0
+        reported_usage = False
+        for generations in response.generations:
+            for generation in generations:
+                usage = getattr(getattr(generation, "message", None), "usage_metadata", None)
+                if (usage):
+                    prompt_tokens = usage.get("input_tokens", prompt_tokens)
+                    completion_tokens += usage.get("output_tokens", 0)
+                    reported_usage = True
+                else:
+                    completion_tokens += estimate_token_count(generation.text)
+
+        self.instrumentation.count(COUNTER_LLM_CALLS)
+        self.instrumentation.count(COUNTER_PROMPT_TOKENS, prompt_tokens)
+        self.instrumentation.count(COUNTER_COMPLETION_TOKENS, completion_tokens)
+        self.instrumentation.end_span(
+            PHASE_LLM, start_time_ns, time.perf_counter() - time_start,
+            {"prompt_tokens": prompt_tokens, "completion_tokens": completion_tokens, "reported_usage": reported_usage}
+        )
+
+    def on_llm_error (self, error :BaseException, *, run_id :UUID, **kwargs :Any) -> Any:
+        start = self._end(run_id)
+        if (start is None):
+            return
+        start_time_ns, time_start, _ = start
+
+        self.instrumentation.count(COUNTER_LLM_ERRORS)
+        self.instrumentation.end_span(PHASE_LLM, start_time_ns, time.perf_counter() - time_start, {"error": type(error).__name__})
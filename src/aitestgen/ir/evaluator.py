@@ -0,0 +1,195 @@
+from typing import Any, Callable, Dict, List, Union
+
+from .node import Expression, Constant, Variable
+from .node import StringOperation, UnaryExpression, BinaryExpression
+from .node import Statement, AssignStatement, AssertStatement
+from .interpreter import ExecutionContext
+
+import logging
+logging.basicConfig(level=logging.INFO)
+
+# ====
+# The "undefined" value
+# ====
+class _Undefined :
+    """
+    The value of a variable which is missing in the model or whose assignment failed to evaluate.
+    Any operation on it fails, so every assert depending on it is violated.
+    """
+    def __repr__ (self) -> str:
+        return "UNDEFINED"
+
+UNDEFINED = _Undefined()
+
+class UndefinedValueError (Exception):
+    pass
+
+class UnsatisfiableConstraintsError (Exception):
+    pass
+
+def _make_strict_operator (operator :Callable) -> Callable:
+    def strict_operator (*args):
+        for arg in args:
+            if (arg is UNDEFINED):
+                raise UndefinedValueError()
+        return operator(*args)
+    return strict_operator
+
+# ====
+# Verification result
+# ====
+class VerificationResult :
+    def __init__ (
+            self,
+            satisfied :List[AssertStatement],
+            violated :List[AssertStatement],
+            missing_variables :List[Variable]
+    ):
+        self.satisfied = satisfied
+        self.violated = violated
+        self.missing_variables = missing_variables
+
+    @property
+    def is_valid (self) -> bool:
+        return len(self.violated) == 0
+
+    def __repr__ (self) -> str:
+        return f"VerificationResult(satisfied={len(self.satisfied)}, violated={len(self.violated)}, missing_variables={[str(v) for v in self.missing_variables]})"
+
+# ====
+# Compiled puzzle
+# ====
+class CompiledPuzzle :
+    """
+    The executed statements of an execution context compiled into one Python function.
+
+    The function takes the values of the unbounded variables (positionally) and returns one boolean per assert.
+    Compile once per puzzle, then check any number of models.
+    """
+    def __init__ (self, exe_context :ExecutionContext):
+        assert(isinstance(exe_context, ExecutionContext))
+
+        self.unbounded_variables = list(exe_context.unbounded_variables)
+        self.asserts = []
+
+        self._namespace = {"UNDEFINED": UNDEFINED}
+        self._operator_2_name = {}
+        self._local_names = {} # Variable -> python local name
+        for i, var in enumerate(self.unbounded_variables):
+            self._local_names[var] = f"u{i}"
+
+        body_lines = []
+        for stat in exe_context.executed_statements:
+            body_lines += self._compile_statement(stat)
+
+        args = ", ".join(self._local_names[var] for var in self.unbounded_variables)
+        results = "".join(f"r{i}, " for i in range(len(self.asserts)))
+        self.source = "\n".join(
+            [f"def check_puzzle ({args}):"]
+            + [f"    {line}" for line in body_lines]
+            + [f"    return ({results})"]
+        )
+
+        exec(compile(self.source, "<aitestgen-compiled-puzzle>", "exec"), self._namespace)
+        self._check = self._namespace["check_puzzle"]
+
+    # ----
+    # Compilation
+    # ----
+    def _operator_name (self, operator_table :Dict, opt :str) -> str:
+        key = (id(operator_table), opt)
+        if (key not in self._operator_2_name):
+            name = f"op{len(self._operator_2_name)}"
+            self._namespace[name] = _make_strict_operator(operator_table[opt])
+            self._operator_2_name[key] = name
+        return self._operator_2_name[key]
+
+    def _compile_expression (self, expr :Expression) -> str:
+        if (isinstance(expr, Variable)):
+            return self._local_names.get(expr, "UNDEFINED")
+
+        elif (isinstance(expr, Constant)):
+            name = f"c{len(self._namespace)}"
+            self._namespace[name] = expr.value
+            return name
+
+        elif (isinstance(expr, StringOperation)):
+            opd_codes = [self._compile_expression(opd) for opd in expr.operands]
+            return f"{self._operator_name(StringOperation.operators, expr.operator)}({', '.join(opd_codes)})"
+
+        elif (isinstance(expr, UnaryExpression)):
+            opd_code = self._compile_expression(expr.operands[0])
+            return f"{self._operator_name(UnaryExpression.operators, expr.operator)}({opd_code})"
+
+        elif (isinstance(expr, BinaryExpression)):
+            lhs_code = self._compile_expression(expr.operands[0])
+            rhs_code = self._compile_expression(expr.operands[1])
+            return f"{self._operator_name(BinaryExpression.operators, expr.operator)}({lhs_code}, {rhs_code})"
+
+        else:
+            assert(False), f"Cannot compile expression: {expr}"
+
+    def _compile_statement (self, stat :Statement) -> List[str]:
+        if (isinstance(stat, AssignStatement)):
+            expr_code = self._compile_expression(stat.expression)
+            local_name = f"a{len(self._local_names)}"
+            self._local_names[stat.variable] = local_name
+            return [
+                "try:",
+                f"    {local_name} = {expr_code}",
+                "except Exception:",
+                f"    {local_name} = UNDEFINED"
+            ]
+
+        elif (isinstance(stat, AssertStatement)):
+            expr_code = self._compile_expression(stat.bool_expression)
+            result_name = f"r{len(self.asserts)}"
+            self.asserts.append(stat)
+            return [
+                "try:",
+                f"    {result_name} = ({expr_code}) is True",
+                "except Exception:",
+                f"    {result_name} = False"
+            ]
+
+        else:
+            assert(False), f"Cannot compile statement: {stat}"
+
+    # ----
+    # Checking
+    # ----
+    def _model_to_args (self, model :Dict) -> List[Any]:
+        args = []
+        for var in self.unbounded_variables:
+            if (var in model):
+                args.append(model[var])
+            else:
+                args.append(model.get(str(var), UNDEFINED))
+        return args
+
+    def check (self, model :Dict[Union[Variable, str], Any]) -> List[bool]:
+        """
+        The model maps unbounded variables (the Variable objects or their names, e.g., "abc_1") to values.
+        """
+        return list(self._check(*self._model_to_args(model)))
+
+    def verify (self, model :Dict[Union[Variable, str], Any]) -> VerificationResult:
+        args = self._model_to_args(model)
+        satisfied = []
+        violated = []
+        for stat, result in zip(self.asserts, self._check(*args)):
+            (satisfied if result else violated).append(stat)
+        return VerificationResult(
+            satisfied=satisfied,
+            violated=violated,
+            missing_variables=[var for var, arg in zip(self.unbounded_variables, args) if (arg is UNDEFINED)]
+        )
+
+# ====
+# Shortcuts
+# ====
+def compile_execution_context (exe_context :ExecutionContext) -> CompiledPuzzle:
+    return CompiledPuzzle(exe_context)
+
+def verify_solution (exe_context :ExecutionContext, solution :Dict[Union[Variable, str], Any]) -> VerificationResult:
+    return CompiledPuzzle(exe_context).verify(solution)
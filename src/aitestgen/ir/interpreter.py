@@ -4,32 +4,58 @@ from .node import Constant, Variable
 from .node import StringOperation
 from .node import UnaryExpression, BinaryExpression
 from .node import AssignStatement, AssertStatement
+from .node import NodeFactory
+from .store import PersistentList, VersionedStore
 
 import logging
 logging.basicConfig(level=logging.INFO)
 
 class ExecutionContext : 
+    """
+    An immutable-by-convention snapshot of the interpretation state. 
+    All the containers are persistent (see .store), so clone() is O(1) and never copies the history. 
+    """
     def __init__ (self): 
-        self.store = {} # Variable (Expression) -> Expression
-        self.executed_statements = []
-        self.unbounded_variables = [] 
+        self.store = VersionedStore() # Variable (Expression) -> Expression
+        self.executed_statements = PersistentList() 
+        self.unbounded_variables = PersistentList(key_fn=lambda var: var.name) 
+        self.node_factory = NodeFactory() # shared by all the snapshots of the puzzle 
+        self.next_variable_id = 0 # variable ids are allocated per puzzle, so the names do not depend on other puzzles 
 
     def clone (self): 
-        my_clone = ExecutionContext() 
-        my_clone.store = { k:v for k,v in self.store.items() }
-        my_clone.executed_statements = self.executed_statements[:]
-        my_clone.unbounded_variables = self.unbounded_variables[:]
+        my_clone = ExecutionContext.__new__(ExecutionContext) 
+        my_clone.store = self.store.snapshot() 
+        my_clone.executed_statements = self.executed_statements.snapshot() 
+        my_clone.unbounded_variables = self.unbounded_variables.snapshot() 
+        my_clone.node_factory = self.node_factory 
+        my_clone.next_variable_id = self.next_variable_id 
         return my_clone
     
+    def new_variable (self, var_name :str) -> Variable: 
+        new_var = Variable(name=var_name, var_id=self.next_variable_id)
+        self.next_variable_id += 1 
+        return new_var 
+
     def read_latest_var (self, var_name :str) -> Tuple[Union[Expression, None], Union[Expression, None]]: 
-        latest_var = None 
-        latest_expr = None 
+        return self.store.read_latest(var_name) 
+
+    def read_unbounded_var (self, var_name :str) -> Union[Variable, None]: 
+        return self.unbounded_variables.find_latest(var_name) 
+
+    def compact (self): 
+        """
+        A context holding only the live state: the latest version of every variable and the unbounded variables. 
+        The executed statements and the shadowed versions are dropped, so the result no longer describes the whole puzzle, 
+        but interpreting further statements on it gives the same statements as on self. 
+        """
+        my_compact = ExecutionContext() 
+        my_compact.next_variable_id = self.next_variable_id 
         for var, expr in self.store.items(): 
-            if (var.name == var_name): 
-                if (latest_var is None or latest_var.id < var.id): 
-                    latest_var = var 
-                    latest_expr = expr 
-        return (latest_var, latest_expr) 
+            if (self.store.read_latest(var.name)[0] is var): 
+                my_compact.store[var] = expr 
+        for var in self.unbounded_variables: 
+            my_compact.unbounded_variables.append(var)
+        return my_compact 
 
 # ====
 # Interpretation functions
@@ -53,11 +79,11 @@ def interpret_json_expression (
             var_name = json_obj[1] 
             latest_var, _ = exe_context.read_latest_var(var_name=var_name)
             if (latest_var is None): # The variable is not in the store... 
-                for unb_var in exe_context.unbounded_variables: # check if the variable is alreayd appeared as unbounded
-                    if (unb_var.name == var_name): 
-                        return unb_var
+                unb_var = exe_context.read_unbounded_var(var_name) # check if the variable is alreayd appeared as unbounded
+                if (unb_var is not None): 
+                    return unb_var
                     
-                new_var = Variable(name=var_name)
+                new_var = exe_context.new_variable(var_name)
                 exe_context.unbounded_variables.append(new_var)
                 return new_var
             
@@ -66,23 +92,23 @@ def interpret_json_expression (
 
         elif (opt in StringOperation.operators): 
             opds = [interpret_json_expression(json_obj=json_opd, exe_context=exe_context) for json_opd in json_obj[1:]] 
-            return StringOperation(opt=opt, opds=opds)
+            return exe_context.node_factory.string_operation(opt=opt, opds=opds)
         
         elif (opt in UnaryExpression.operators): 
             opds = [interpret_json_expression(json_obj=json_opd, exe_context=exe_context) for json_opd in json_obj[1:]] 
             assert(len(opds) == 1)
-            return UnaryExpression(opt=opt, opd=opds[0]) 
+            return exe_context.node_factory.unary_expression(opt=opt, opd=opds[0]) 
         
         elif (opt in BinaryExpression.operators):
             opds = [interpret_json_expression(json_obj=json_opd, exe_context=exe_context) for json_opd in json_obj[1:]] 
             assert(len(opds) == 2)
-            return BinaryExpression(opt=opt, lhs=opds[0], rhs=opds[1])
+            return exe_context.node_factory.binary_expression(opt=opt, lhs=opds[0], rhs=opds[1])
     
         else: 
             assert(False), f"Invalid json list: {json_obj}"
 
-    elif (type(json_obj) in [str, int, float, bool]): 
-        return Constant(json_obj)
+    elif (json_obj is None or type(json_obj) in [str, int, float, bool]): # None stands for an open subStr index 
+        return exe_context.node_factory.constant(json_obj)
     
     else: 
         assert(False), f"Invalid type of json_obj: {type(json_obj)}"
@@ -104,7 +130,7 @@ def interpret_json_statement (
 
         assert(json_obj[1][0] == Variable.operator)
         var_name = json_obj[1][1] 
-        var = Variable(name=var_name)
+        var = next_exe_context.new_variable(var_name)
 
         expr = interpret_json_expression(json_obj[2], exe_context=next_exe_context)
 
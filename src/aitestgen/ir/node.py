@@ -1,12 +1,7 @@
 import re 
-from typing import List, Union, Any
+from typing import List, Tuple, Union, Any
 import json 
 
-# ====
-# Global 
-# ====
-NEXT_VARIABLE_ID = 0 
-
 # ====
 # Some util functions 
 # ====
@@ -17,12 +12,26 @@ def preproc_generated_natural_language (nl_str :str):
 # ====
 # Class definition: Expression
 # ====
-class Expression : 
-    operator :str = None 
-    operands :List = None 
+_set_field = object.__setattr__ # the only way to set the fields of an ImmutableNode 
+
+class ImmutableNode : 
+    """
+    IR nodes are slotted and immutable, so that structurally equal nodes can be shared (see NodeFactory). 
+    """
+    __slots__ = ("__weakref__",)
+
+    def __setattr__ (self, name :str, value :Any): 
+        raise AttributeError(f"{type(self).__name__} is immutable")
+
+    def __delattr__ (self, name :str): 
+        raise AttributeError(f"{type(self).__name__} is immutable")
+
+class Expression (ImmutableNode): 
+    __slots__ = ("operator", "operands")
 
     def __init__ (self): 
-        pass 
+        _set_field(self, "operator", None)
+        _set_field(self, "operands", ())
 
     def to_json (self) -> Any:
         return json.dumps([self.operator] + [opd.to_json() for opd in self.operands])
@@ -34,8 +43,11 @@ class Expression :
         return "" 
 
 class Constant (Expression): 
+    __slots__ = ()
+
     def __init__ (self, value): 
-        self.operands = [value] 
+        _set_field(self, "operator", None)
+        _set_field(self, "operands", (value,))
     
     @property
     def type (self): 
@@ -55,18 +67,17 @@ class Constant (Expression):
             return str(self.value).lower()
 
 class Variable (Expression): 
+    __slots__ = ("id", "name")
     operator :str = "var"
 
-    def __init__ (self, name :str):
-        global NEXT_VARIABLE_ID 
-
+    def __init__ (self, name :str, var_id :int):
+        # the id is allocated by the owner of the variable, e.g., ExecutionContext.new_variable 
         assert(type(name) is str) 
+        assert(type(var_id) is int)
         
-        self.id = NEXT_VARIABLE_ID 
-        NEXT_VARIABLE_ID += 1
-        
-        self.name = name 
-        self.operands = [f"{self.name}_{self.id}"]
+        _set_field(self, "id", var_id)
+        _set_field(self, "name", name)
+        _set_field(self, "operands", (f"{name}_{var_id}",))
 
     def __hash__ (self): 
         return int(self.id)
@@ -81,14 +92,14 @@ class Variable (Expression):
         return self.operands[0]
         
     def to_json(self) -> Any:
-        return [self.operator] + self.operands
+        return [self.operator] + list(self.operands)
         
     def to_natural_language(self, *args, **kwargs) -> str:
         return f"variable {self.operands[0]}"
         
     @classmethod
-    def get_tmp_var (cls): 
-        return cls("__var")
+    def get_tmp_var (cls, var_id :int): 
+        return cls("__var", var_id)
     
 def substr_operator (s :str, i_start :Union[int, None], i_end :Union[int, None]) -> str: 
     if (i_start is None and i_end is None): 
@@ -107,21 +118,22 @@ def convert_programming_index_to_natural_language_index (programming_index :int)
         return "2nd"
     elif (programming_index == 2): 
         return "3rd"
-    else:
+    else: 
         return f"{programming_index+1}th"
 
 class StringOperation (Expression): 
+    __slots__ = ()
     operators = {
         "subStr":substr_operator, 
-        "startsWith": lambda opd_x, opd_y: opd_x.starswith(opd_y), 
+        "startsWith": lambda opd_x, opd_y: opd_x.startswith(opd_y), 
         "endsWith": lambda opd_x, opd_y: opd_x.endswith(opd_y)
     }
 
     def __init__(self, opt :str, opds :List[Expression]):
         assert(opt in StringOperation.operators) 
 
-        self.operator = opt 
-        self.operands = opds[:]
+        _set_field(self, "operator", opt)
+        _set_field(self, "operands", tuple(opds))
 
         assert(self.operator != "subStr" or len(self.operands) == 3)
         assert(self.operator != "startsWith" or len(self.operands) == 2)
@@ -134,11 +146,13 @@ class StringOperation (Expression):
 
         if (self.operator == "subStr"): 
             nl_str = f"the sub-string of {self.operands[0].to_natural_language()}" 
-            if (self.operands[1] is not None): # starting index is given 
-                i_start = convert_programming_index_to_natural_language_index(self.operands[1])
+            opd_start = (self.operands[1].value if isinstance(self.operands[1], Constant) else self.operands[1])
+            opd_end = (self.operands[2].value if isinstance(self.operands[2], Constant) else self.operands[2])
+            if (opd_start is not None): # starting index is given 
+                i_start = convert_programming_index_to_natural_language_index(opd_start)
                 nl_str = f"{nl_str} starting from the {i_start} character"
-            if (self.operands[2] is not None): # ending index is given 
-                i_end = convert_programming_index_to_natural_language_index(self.operands[2]) 
+            if (opd_end is not None): # ending index is given 
+                i_end = convert_programming_index_to_natural_language_index(opd_end) 
                 nl_str = f"{nl_str} ending before the {i_end} character"
 
         elif (self.operator == "startsWith"): 
@@ -147,12 +161,13 @@ class StringOperation (Expression):
         elif (self.operator == "endsWith"): 
             nl_str = f"{self.operands[0].to_natural_language()} {negator} ends with {self.operands[1].to_natural_language()}"
 
-        else:
+        else: 
             assert(False)
 
         return preproc_generated_natural_language(nl_str)
 
 class UnaryExpression (Expression): 
+    __slots__ = ()
     operators = {
         "not": lambda opd: (not opd)
     }
@@ -161,8 +176,8 @@ class UnaryExpression (Expression):
         assert(opt in UnaryExpression.operators)
         assert(isinstance(opd, Expression))
 
-        self.operator = opt 
-        self.operands = [opd]
+        _set_field(self, "operator", opt)
+        _set_field(self, "operands", (opd,))
 
     def to_natural_language(self, *args, **kwargs) -> str:
         if (self.operator == "not"): 
@@ -172,6 +187,7 @@ class UnaryExpression (Expression):
             assert(False)
 
 class BinaryExpression (Expression): 
+    __slots__ = ()
     operators = {
         "==": lambda lhs, rhs: (lhs == rhs)
     }
@@ -181,8 +197,8 @@ class BinaryExpression (Expression):
         assert(isinstance(lhs, Expression))
         assert(isinstance(rhs, Expression))
 
-        self.operator = opt 
-        self.operands = [lhs, rhs]
+        _set_field(self, "operator", opt)
+        _set_field(self, "operands", (lhs, rhs))
 
         assert(self.operator != "==" or len(self.operands) == 2)
 
@@ -196,13 +212,17 @@ class BinaryExpression (Expression):
 # ====
 # Class definition: Statement
 # ==== 
-class Statement: 
+class Statement (ImmutableNode): 
+    __slots__ = ()
     keyword :str = None
-    body :List = None
 
     def __init__ (self): 
         pass 
 
+    @property
+    def body (self) -> Tuple: 
+        return ()
+
     def to_json (self) -> Any:
         return json.dumps([self.keyword] + [content.to_json() for content in self.body])
 
@@ -213,26 +233,80 @@ class Statement:
         return "" 
 
 class AssignStatement (Statement): 
+    __slots__ = ("variable", "expression")
     keyword = ":=" 
 
     def __init__(self, var :Variable, expr :Expression):
         assert(isinstance(var, Variable))
         assert(isinstance(expr, Expression))
 
-        self.variable = var 
-        self.expression = expr
-        self.body = [self.expression]
+        _set_field(self, "variable", var)
+        _set_field(self, "expression", expr)
+
+    @property
+    def body (self) -> Tuple: 
+        return (self.expression,)
 
     def to_natural_language(self, *args, **kwargs) -> str:
         return f"{self.variable.to_natural_language()} is {self.expression.to_natural_language()}"
     
 class AssertStatement (Statement): 
+    __slots__ = ("bool_expression",)
     keyword = "assert" 
 
     def __init__(self, bool_expr :Expression):
         assert(isinstance(bool_expr, Expression))
-        self.bool_expression = bool_expr
+        _set_field(self, "bool_expression", bool_expr)
+
+    @property
+    def body (self) -> Tuple: 
+        return (self.bool_expression,)
 
     def to_natural_language(self, *args, **kwargs) -> str:
         return self.bool_expression.to_natural_language() 
-    
\ No newline at end of file
+
+# ====
+# Hash-consing factory 
+# ====
+class NodeFactory : 
+    """
+    Interns expressions: structurally equal constants and operations are built once and shared. 
+    Since the operands are interned too, a node is keyed by its operator and the identities of its operands. 
+    Variables are never interned since every Variable is a distinct version. 
+
+    A factory belongs to one puzzle (see ExecutionContext.node_factory) and holds its nodes strongly. 
+    """
+    def __init__ (self): 
+        self._table = {} 
+
+    def constant (self, value) -> Constant: 
+        # the type is part of the key since 1 == 1.0 == True, and repr tells 0.0 from -0.0 
+        key = (type(value), (repr(value) if type(value) is float else value))
+        node = self._table.get(key)
+        if (node is None): 
+            node = self._table[key] = Constant(value)
+        return node 
+
+    def string_operation (self, opt :str, opds :List[Expression]) -> StringOperation: 
+        key = (opt, *opds)
+        node = self._table.get(key)
+        if (node is None): 
+            node = self._table[key] = StringOperation(opt=opt, opds=opds)
+        return node 
+
+    def unary_expression (self, opt :str, opd :Expression) -> UnaryExpression: 
+        key = (opt, opd)
+        node = self._table.get(key)
+        if (node is None): 
+            node = self._table[key] = UnaryExpression(opt=opt, opd=opd)
+        return node 
+
+    def binary_expression (self, opt :str, lhs :Expression, rhs :Expression) -> BinaryExpression: 
+        key = (opt, lhs, rhs)
+        node = self._table.get(key)
+        if (node is None): 
+            node = self._table[key] = BinaryExpression(opt=opt, lhs=lhs, rhs=rhs)
+        return node 
+
+    def __len__ (self) -> int: 
+        return len(self._table)
@@ -0,0 +1,184 @@
+from typing import Dict, List, Tuple
+
+from .node import Expression, Constant, Variable
+from .node import StringOperation, UnaryExpression, BinaryExpression
+from .node import AssignStatement, AssertStatement
+from .node import NodeFactory
+from .interpreter import ExecutionContext
+from .slicing import collect_expression_variables
+from ..solver.symbolic import UnsatisfiableConstraintsError
+
+import logging
+logging.basicConfig(level=logging.INFO)
+
+# ====
+# Expression rewriting
+# ====
+def _fold (expr :Expression, factory :NodeFactory) -> Expression:
+    """
+    Evaluate an operation on constants, and the trivial identities (x == x, not not x).
+    Ill-typed operations (e.g., the subStr of a number) are left as they are.
+    """
+    opds = expr.operands
+
+    if (isinstance(expr, UnaryExpression) and expr.operator == "not"):
+        if (isinstance(opds[0], UnaryExpression) and opds[0].operator == "not"):
+            return opds[0].operands[0]
+
+    elif (isinstance(expr, BinaryExpression) and expr.operator == "=="):
+        if (opds[0] is opds[1]): # the operands are interned
+            return factory.constant(True)
+
+    if (all([isinstance(opd, Constant) for opd in opds])):
+        try:
+            value = type(expr).operators[expr.operator](*[opd.value for opd in opds])
+        except Exception:
+            return expr
+        return factory.constant(value)
+    return expr
+
+def _rewrite (expr :Expression, substitution :Dict[Variable, Expression], factory :NodeFactory, memo :Dict[Expression, Expression]) -> Expression:
+    if (isinstance(expr, Variable)):
+        return substitution.get(expr, expr)
+    elif (isinstance(expr, Constant)):
+        return expr
+    elif (expr in memo):
+        return memo[expr]
+
+    opds = [_rewrite(opd, substitution, factory, memo) for opd in expr.operands]
+    if (isinstance(expr, StringOperation)):
+        new_expr = factory.string_operation(opt=expr.operator, opds=opds)
+    elif (isinstance(expr, UnaryExpression)):
+        new_expr = factory.unary_expression(opt=expr.operator, opd=opds[0])
+    elif (isinstance(expr, BinaryExpression)):
+        new_expr = factory.binary_expression(opt=expr.operator, lhs=opds[0], rhs=opds[1])
+    else:
+        assert(False), f"Unknown expression: {expr}"
+
+    memo[expr] = _fold(new_expr, factory)
+    return memo[expr]
+
+# ====
+# Cheap contradiction detection
+# ====
+def _literal (expr :Expression) -> Tuple[Expression, bool]:
+    polarity = True
+    while (isinstance(expr, UnaryExpression) and expr.operator == "not"):
+        expr, polarity = expr.operands[0], (not polarity)
+    return (expr, polarity)
+
+def _check_contradictions (asserted_exprs :List[Expression]):
+    """
+    Look for the contradictions visible without solving: an assertion and its negation,
+    two different constants asserted equal to the same expression,
+    incompatible prefixes (suffixes) of the same expression, and a constant not fitting a prefix (suffix) of its expression.
+    """
+    literals = {} # expression -> polarity
+    subject_2_constants = {} # expression -> [str]
+    subject_2_prefixes = {}
+    subject_2_suffixes = {}
+
+    for asserted_expr in asserted_exprs:
+        expr, polarity = _literal(asserted_expr)
+        if (literals.get(expr, polarity) != polarity):
+            raise UnsatisfiableConstraintsError(f"Both asserted and negated: {expr}")
+        literals[expr] = polarity
+        if (not polarity):
+            continue
+
+        if (isinstance(expr, BinaryExpression) and expr.operator == "=="):
+            lhs, rhs = expr.operands
+            if (isinstance(rhs, Constant) and not isinstance(lhs, Constant)):
+                subject_2_constants.setdefault(lhs, []).append(rhs.value)
+            elif (isinstance(lhs, Constant) and not isinstance(rhs, Constant)):
+                subject_2_constants.setdefault(rhs, []).append(lhs.value)
+
+        elif (isinstance(expr, StringOperation) and expr.operator in ["startsWith", "endsWith"]):
+            subject, affix = expr.operands
+            if (isinstance(affix, Constant) and type(affix.value) is str):
+                subject_2_affixes = (subject_2_prefixes if expr.operator == "startsWith" else subject_2_suffixes)
+                subject_2_affixes.setdefault(subject, []).append(affix.value)
+
+    for subject, values in subject_2_constants.items():
+        for value in values[1:]:
+            if (value != values[0]):
+                raise UnsatisfiableConstraintsError(f"Conflicting values of {subject}: {values[0]!r} vs {value!r}")
+
+    for subject_2_affixes, is_prefix in [(subject_2_prefixes, True), (subject_2_suffixes, False)]:
+        for subject, affixes in subject_2_affixes.items():
+            longest = max(affixes, key=len)
+            for affix in affixes:
+                if (not (longest.startswith(affix) if is_prefix else longest.endswith(affix))):
+                    raise UnsatisfiableConstraintsError(f"Incompatible {'prefixes' if is_prefix else 'suffixes'} of {subject}: {affix!r} vs {longest!r}")
+
+            value = subject_2_constants.get(subject, [None])[0]
+            if (type(value) is str and not (value.startswith(longest) if is_prefix else value.endswith(longest))):
+                raise UnsatisfiableConstraintsError(f"{value!r} does not {'start' if is_prefix else 'end'} with {longest!r}")
+
+# ====
+# Simplification
+# ====
+def simplify_execution_context (exe_context :ExecutionContext) -> ExecutionContext:
+    """
+    An equivalent, smaller execution context for the prompt:
+    1. copy propagation: a variable assigned a variable or a constant is replaced by it
+    2. constant folding: subStr/startsWith/endsWith/==/not on constants are evaluated
+    3. the assertions folded to true and the duplicated assertions are dropped
+    4. dead-assignment elimination: the assignments no assertion depends on are dropped
+
+    The unbounded variables are kept, so an answer to the simplified context is an answer to exe_context.
+    Raises UnsatisfiableConstraintsError if an assertion folds to false or two assertions contradict each other (see _check_contradictions).
+    """
+    factory = exe_context.node_factory
+    substitution = {} # Variable -> Variable or Constant
+    memo = {}
+
+    statements = [] # Statement
+    asserted_exprs = set()
+    for stat in exe_context.executed_statements:
+        if (isinstance(stat, AssignStatement)):
+            expr = _rewrite(stat.expression, substitution, factory, memo)
+            if (isinstance(expr, (Variable, Constant))):
+                substitution[stat.variable] = expr
+            else:
+                statements.append(stat if (expr is stat.expression) else AssignStatement(var=stat.variable, expr=expr))
+
+        elif (isinstance(stat, AssertStatement)):
+            expr = _rewrite(stat.bool_expression, substitution, factory, memo)
+            if (isinstance(expr, Constant) and type(expr.value) is bool):
+                if (not expr.value):
+                    raise UnsatisfiableConstraintsError(f"Assertion of a false constant: {stat.bool_expression}")
+                continue
+            if (expr in asserted_exprs):
+                continue
+            asserted_exprs.add(expr)
+            statements.append(stat if (expr is stat.bool_expression) else AssertStatement(bool_expr=expr))
+
+        else:
+            assert(False), f"Unknown statement: {stat}"
+
+    _check_contradictions([stat.bool_expression for stat in statements if isinstance(stat, AssertStatement)])
+
+    # the statements are in SSA form, so one backward pass finds the live assignments
+    live_variables = set() # Variable
+    for stat in statements:
+        if (isinstance(stat, AssertStatement)):
+            collect_expression_variables(stat.bool_expression, live_variables)
+    live_statements = []
+    for stat in reversed(statements):
+        if (isinstance(stat, AssignStatement)):
+            if (stat.variable not in live_variables):
+                continue
+            collect_expression_variables(stat.expression, live_variables)
+        live_statements.append(stat)
+
+    simplified = ExecutionContext()
+    simplified.node_factory = factory
+    simplified.next_variable_id = exe_context.next_variable_id
+    for stat in reversed(live_statements):
+        simplified.executed_statements.append(stat)
+        if (isinstance(stat, AssignStatement)):
+            simplified.store[stat.variable] = stat.expression
+    for var in exe_context.unbounded_variables:
+        simplified.unbounded_variables.append(var)
+    return simplified
@@ -0,0 +1,107 @@
+from typing import Dict, List, Set
+
+from .node import Expression, Variable
+from .node import Statement, AssignStatement, AssertStatement
+from .interpreter import ExecutionContext
+from .evaluator import CompiledPuzzle, UnsatisfiableConstraintsError
+
+import logging
+logging.basicConfig(level=logging.INFO)
+
+# ====
+# Union-find
+# ====
+class UnionFind :
+    def __init__ (self):
+        self.parents = {}
+
+    def find (self, x):
+        self.parents.setdefault(x, x)
+        root = x
+        while (self.parents[root] != root):
+            root = self.parents[root]
+        while (self.parents[x] != root):
+            self.parents[x], x = root, self.parents[x]
+        return root
+
+    def union (self, x, y):
+        root_x, root_y = self.find(x), self.find(y)
+        if (root_x != root_y):
+            self.parents[root_y] = root_x
+
+# ====
+# Variables of expressions and statements
+# ====
+def collect_expression_variables (expr :Expression, variables :Set[Variable]=None) -> Set[Variable]:
+    if (variables is None):
+        variables = set()
+
+    if (isinstance(expr, Variable)):
+        variables.add(expr)
+    else:
+        for opd in expr.operands:
+            if (isinstance(opd, Expression)):
+                collect_expression_variables(opd, variables)
+    return variables
+
+def collect_statement_variables (stat :Statement) -> Set[Variable]:
+    if (isinstance(stat, AssignStatement)):
+        return collect_expression_variables(stat.expression, {stat.variable})
+    elif (isinstance(stat, AssertStatement)):
+        return collect_expression_variables(stat.bool_expression)
+    else:
+        assert(False), f"Unknown statement: {stat}"
+
+# ====
+# Slicing
+# ====
+def slice_execution_context (exe_context :ExecutionContext) -> List[ExecutionContext]:
+    """
+    Split an execution context into the connected components of its variable-dependency graph.
+
+    Two variables are connected if they appear in the same statement.
+    Each component is a standalone execution context with its own statements, store and unbounded variables (in the original order).
+    Statements without any variable do not constrain any component: they are evaluated and dropped if true.
+    Raises UnsatisfiableConstraintsError if one of them is false.
+    """
+    union_find = UnionFind()
+    stat_vars = []
+    for stat in exe_context.executed_statements:
+        variables = collect_statement_variables(stat)
+        stat_vars.append(variables)
+
+        variables = list(variables)
+        for var in variables[1:]:
+            union_find.union(variables[0], var)
+
+    constant_context = ExecutionContext() # the statements without any variable
+    for stat, variables in zip(exe_context.executed_statements, stat_vars):
+        if (len(variables) == 0):
+            constant_context.executed_statements.append(stat)
+    if (len(constant_context.executed_statements) > 0):
+        compiled_puzzle = CompiledPuzzle(constant_context)
+        for stat, is_true in zip(compiled_puzzle.asserts, compiled_puzzle.check({})):
+            if (not is_true):
+                raise UnsatisfiableConstraintsError(f"Assertion of a false constant: {stat.bool_expression}")
+
+    root_2_component = {} # root Variable -> ExecutionContext
+    def component_of (var :Variable) -> ExecutionContext:
+        root = union_find.find(var)
+        if (root not in root_2_component):
+            root_2_component[root] = ExecutionContext()
+            root_2_component[root].next_variable_id = exe_context.next_variable_id
+        return root_2_component[root]
+
+    for stat, variables in zip(exe_context.executed_statements, stat_vars):
+        if (len(variables) == 0):
+            continue
+
+        component = component_of(next(iter(variables)))
+        component.executed_statements.append(stat)
+        if (isinstance(stat, AssignStatement)):
+            component.store[stat.variable] = stat.expression
+
+    for var in exe_context.unbounded_variables:
+        component_of(var).unbounded_variables.append(var)
+
+    return list(root_2_component.values())
@@ -0,0 +1,159 @@
+from bisect import bisect_left
+from typing import Any, Callable, Dict, Iterator, Tuple, Union
+
+# ====
+# Shared, append-only buffer
+# ====
+class _SharedBuffer :
+    """
+    The backing storage shared by all the snapshots of a PersistentList.
+    Items are only ever appended, so a snapshot is fully described by its length.
+    """
+    def __init__ (self, key_fn :Callable=None):
+        self.items = []
+        self.key_fn = key_fn
+        self.key_2_positions = {} # key -> increasing list of positions in items
+
+    def append (self, item):
+        if (self.key_fn is not None):
+            self.key_2_positions.setdefault(self.key_fn(item), []).append(len(self.items))
+        self.items.append(item)
+
+    def fork (self, size :int) -> "_SharedBuffer":
+        forked = _SharedBuffer(key_fn=self.key_fn)
+        for item in self.items[:size]:
+            forked.append(item)
+        return forked
+
+# ====
+# Persistent list
+# ====
+class PersistentList :
+    """
+    An append-only list with O(1) snapshots.
+
+    Snapshots share one buffer.
+    Appending to the newest snapshot is an in-place append;
+    appending to an older snapshot forks the buffer first (copy-on-write),
+    so that no snapshot ever observes another snapshot's appends.
+
+    If key_fn is given, items are indexed by key_fn(item) so that the latest item of a key can be found in O(1) amortized.
+    """
+    def __init__ (self, key_fn :Callable=None):
+        self._buffer = _SharedBuffer(key_fn=key_fn)
+        self._size = 0
+
+    def snapshot (self) -> "PersistentList":
+        my_snapshot = PersistentList.__new__(PersistentList)
+        my_snapshot._buffer = self._buffer
+        my_snapshot._size = self._size
+        return my_snapshot
+
+    def append (self, item):
+        if (self._size != len(self._buffer.items)): # another snapshot appended to the shared buffer
+            self._buffer = self._buffer.fork(self._size)
+        self._buffer.append(item)
+        self._size += 1
+
+    def find_latest (self, key) -> Any:
+        positions = self._buffer.key_2_positions.get(key)
+        if (not positions):
+            return None
+        if (positions[-1] < self._size): # the common case: this snapshot is the newest one
+            return self._buffer.items[positions[-1]]
+        i = bisect_left(positions, self._size)
+        return (None if i == 0 else self._buffer.items[positions[i-1]])
+
+    def __len__ (self) -> int:
+        return self._size
+
+    def __iter__ (self) -> Iterator:
+        items = self._buffer.items
+        for i in range(self._size):
+            yield items[i]
+
+    def __getitem__ (self, index :Union[int, slice]) -> Any:
+        if (isinstance(index, slice)):
+            return [self._buffer.items[i] for i in range(self._size)[index]]
+        return self._buffer.items[range(self._size)[index]]
+
+    def __bool__ (self) -> bool:
+        return self._size > 0
+
+    def __repr__ (self) -> str:
+        return f"PersistentList({list(self)})"
+
+# ====
+# Versioned (SSA-style) variable store
+# ====
+class VersionedStore :
+    """
+    A persistent mapping Variable -> Expression.
+
+    Every assignment introduces a fresh Variable version (SSA-style), so the store is append-only.
+    It keeps a name -> latest-version index so that reading the latest version of a name is O(1) amortized.
+    """
+    def __init__ (self):
+        self._entries = PersistentList(key_fn=lambda entry: entry[0].name)
+        self._var_2_position = {} # shared across snapshots; a position is visible iff it is < len(self._entries)
+
+    def snapshot (self) -> "VersionedStore":
+        my_snapshot = VersionedStore.__new__(VersionedStore)
+        my_snapshot._entries = self._entries.snapshot()
+        my_snapshot._var_2_position = self._var_2_position
+        return my_snapshot
+
+    def read_latest (self, var_name :str) -> Tuple[Any, Any]:
+        entry = self._entries.find_latest(var_name)
+        return ((None, None) if entry is None else entry)
+
+    def _lookup (self, var) -> Union[Tuple, None]:
+        position = self._var_2_position.get(var)
+        if (position is None or position >= len(self._entries)):
+            return None
+        entry = self._entries[position]
+        return (entry if entry[0] == var else None)
+
+    def __setitem__ (self, var, expr):
+        assert(self._lookup(var) is None), f"Variable {var} is already assigned (the store is SSA)"
+
+        if (len(self._entries) != len(self._entries._buffer.items)): # about to fork
+            self._var_2_position = dict(self._var_2_position)
+        self._var_2_position[var] = len(self._entries)
+        self._entries.append((var, expr))
+
+    def __getitem__ (self, var) -> Any:
+        entry = self._lookup(var)
+        if (entry is None):
+            raise KeyError(var)
+        return entry[1]
+
+    def get (self, var, default=None) -> Any:
+        entry = self._lookup(var)
+        return (default if entry is None else entry[1])
+
+    def __contains__ (self, var) -> bool:
+        return self._lookup(var) is not None
+
+    def __len__ (self) -> int:
+        return len(self._entries)
+
+    def __iter__ (self) -> Iterator:
+        return self.keys()
+
+    def keys (self) -> Iterator:
+        for var, _ in self._entries:
+            yield var
+
+    def values (self) -> Iterator:
+        for _, expr in self._entries:
+            yield expr
+
+    def items (self) -> Iterator:
+        return iter(self._entries)
+
+    def to_dict (self) -> Dict:
+        return dict(self._entries)
+
+    def __repr__ (self) -> str:
+        return f"VersionedStore({self.to_dict()})"
@@ -0,0 +1,185 @@
+import os
+import json
+import codecs
+from typing import BinaryIO, Callable, Iterator, List, Union
+
+from .node import Statement
+from .interpreter import ExecutionContext, interpret_json_statement
+
+import logging
+logging.basicConfig(level=logging.INFO)
+
+# ====
+# Globals
+# ====
+DEFAULT_CHUNK_SIZE = 1 << 16
+DEFAULT_COMPACT_EVERY = 4096
+DEFAULT_MAX_VALUE_SIZE = 1 << 24 # characters of a single json statement
+
+JSON_WHITESPACES = " \t\r\n"
+
+# ====
+# Incremental parsing of json statements
+# ====
+class _ChunkReader :
+    """
+    Reads a (binary or text) stream into a text buffer, chunk by chunk.
+    A value is buffered up to max_value_size characters, so a malformed or unterminated one fails early.
+    """
+    def __init__ (self, stream, chunk_size :int, max_value_size :int=DEFAULT_MAX_VALUE_SIZE):
+        self.stream = stream
+        self.chunk_size = chunk_size
+        self.max_value_size = max_value_size
+        self.decoder = codecs.getincrementaldecoder("utf-8")()
+        self.buffer = ""
+        self.pos = 0
+        self.eof = False
+
+    def read_more (self) -> bool:
+        if (self.eof):
+            return False
+
+        chunk = self.stream.read(self.chunk_size)
+        if (isinstance(chunk, bytes)):
+            text = self.decoder.decode(chunk, final=(len(chunk) == 0))
+        else:
+            text = chunk
+        if (len(chunk) == 0):
+            self.eof = True
+
+        # drop the consumed text
+        if (self.pos > 0):
+            self.buffer = self.buffer[self.pos:]
+            self.pos = 0
+        self.buffer += text
+        return True
+
+    def peek_non_whitespace (self, offset :int=0) -> Union[str, None]:
+        """
+        The offset-th non-whitespace character from the current position (without consuming it).
+        """
+        i = self.pos
+        while (True):
+            while (i < len(self.buffer) and self.buffer[i] in JSON_WHITESPACES):
+                i += 1
+            if (i < len(self.buffer)):
+                if (offset == 0):
+                    return self.buffer[i]
+                offset -= 1
+                i += 1
+                continue
+
+            consumed = i - self.pos
+            if (not self.read_more()):
+                return None
+            i = self.pos + consumed
+
+    def skip_whitespaces (self):
+        self.peek_non_whitespace()
+        while (self.pos < len(self.buffer) and self.buffer[self.pos] in JSON_WHITESPACES):
+            self.pos += 1
+
+    def expect (self, char :str):
+        self.skip_whitespaces()
+        assert(self.pos < len(self.buffer) and self.buffer[self.pos] == char), f"Expected {char!r} in the json statements"
+        self.pos += 1
+
+    def decode_value (self, decoder :json.JSONDecoder):
+        self.skip_whitespaces()
+        while (True):
+            try:
+                value, end = decoder.raw_decode(self.buffer, self.pos)
+                # a value touching the end of the buffer may be truncated, e.g., a number
+                if (end < len(self.buffer) or self.eof):
+                    self.pos = end
+                    return value
+            except json.JSONDecodeError:
+                if (self.eof):
+                    raise
+            if (len(self.buffer) - self.pos > self.max_value_size):
+                raise ValueError(f"A json statement exceeds {self.max_value_size} characters (malformed or unterminated?)")
+            self.read_more()
+
+def _iter_json_array (reader :_ChunkReader) -> Iterator[List]:
+    decoder = json.JSONDecoder()
+
+    reader.expect("[")
+    if (reader.peek_non_whitespace() == "]"):
+        reader.expect("]")
+        return
+
+    while (True):
+        yield reader.decode_value(decoder)
+
+        if (reader.peek_non_whitespace() == ","):
+            reader.expect(",")
+        else:
+            reader.expect("]")
+            return
+
+def _iter_json_lines (reader :_ChunkReader) -> Iterator[List]:
+    decoder = json.JSONDecoder()
+    while (reader.peek_non_whitespace() is not None):
+        yield reader.decode_value(decoder)
+
+def iter_json_statements (
+        source :Union[str, os.PathLike, BinaryIO],
+        chunk_size :int=DEFAULT_CHUNK_SIZE,
+        max_value_size :int=DEFAULT_MAX_VALUE_SIZE
+) -> Iterator[List]:
+    """
+    Incrementally parse json statements from a file path or a stream.
+    The content is either a JSON array of statements or JSONL (one statement per line).
+    Raises ValueError if a statement is malformed, or longer than max_value_size characters.
+    """
+    if (isinstance(source, (str, os.PathLike))):
+        with open(source, "rb") as stream:
+            yield from iter_json_statements(stream, chunk_size=chunk_size, max_value_size=max_value_size)
+        return
+
+    reader = _ChunkReader(source, chunk_size=chunk_size, max_value_size=max_value_size)
+
+    # a JSON array of statements starts with "[[" (or "[]"), while a JSONL statement starts with '["'
+    first_char = reader.peek_non_whitespace()
+    if (first_char is None):
+        return
+    if (first_char == "[" and reader.peek_non_whitespace(offset=1) in ["[", "]"]):
+        yield from _iter_json_array(reader)
+    else:
+        yield from _iter_json_lines(reader)
+
+# ====
+# Streaming interpretation
+# ====
+def execute_json_statements_stream (
+        source :Union[str, os.PathLike, BinaryIO],
+        on_statement :Callable[[Statement, ExecutionContext], None]=None,
+        compact_every :int=DEFAULT_COMPACT_EVERY,
+        chunk_size :int=DEFAULT_CHUNK_SIZE,
+        max_value_size :int=DEFAULT_MAX_VALUE_SIZE,
+        keep_statements :bool=False
+) -> ExecutionContext:
+    """
+    Interpret json statements as they are parsed from source.
+
+    Every executed statement is handed to on_statement (if given), and the context is compacted
+    every compact_every statements (see ExecutionContext.compact), so memory stays bounded by the live variables
+    rather than by the input size: the statements are only retained by the callback.
+    With keep_statements, the context is not compacted and the result is the same as execute_json_statements on the whole list.
+    """
+    exe_context = ExecutionContext()
+
+    n_since_compaction = 0
+    for json_stat in iter_json_statements(source, chunk_size=chunk_size, max_value_size=max_value_size):
+        exe_context = interpret_json_statement(json_obj=json_stat, exe_context=exe_context)
+
+        if (on_statement is not None):
+            on_statement(exe_context.executed_statements[-1], exe_context)
+
+        if (not keep_statements):
+            n_since_compaction += 1
+            if (n_since_compaction >= compact_every):
+                exe_context = exe_context.compact()
+                n_since_compaction = 0
+
+    return exe_context
@@ -0,0 +1,179 @@
+import json
+import time
+import sqlite3
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, List, Tuple, Union
+
+from ..ir.node import Variable
+
+import logging
+logging.basicConfig(level=logging.INFO)
+
+# ====
+# Canonicalization of json statements
+# ====
+def canonicalize_json_statements (json_statements :List) -> Tuple[List, Dict[str, str]]:
+    """
+    Rename the variables in first-use order (v0, v1, ...) so that alpha-equivalent puzzles get the same canonical form.
+    Returns the canonical statements and the original name -> canonical name mapping.
+    """
+    name_2_canonical = {}
+
+    def canonicalize (json_obj :Any) -> Any:
+        if (isinstance(json_obj, List)):
+            if (len(json_obj) == 2 and json_obj[0] == Variable.operator and type(json_obj[1]) is str):
+                if (json_obj[1] not in name_2_canonical):
+                    name_2_canonical[json_obj[1]] = f"v{len(name_2_canonical)}"
+                return [Variable.operator, name_2_canonical[json_obj[1]]]
+            return [canonicalize(json_sub) for json_sub in json_obj]
+        return json_obj
+
+    return (canonicalize(json_statements), name_2_canonical)
+
+def compute_cache_key (json_statements :List, **llm_settings) -> str:
+    """
+    The content address of a puzzle: the hash of its canonical form and the LLM settings (model, temperature, ...).
+    """
+    canonical_statements, _ = canonicalize_json_statements(json_statements)
+    key_material = json.dumps(
+        {"statements": canonical_statements, "settings": llm_settings},
+        sort_keys=True,
+        separators=(',', ':')
+    )
+    return hashlib.sha256(key_material.encode("utf-8")).hexdigest()
+
+# ====
+# Map solutions from/to the unbounded variable order
+# ====
+def solution_to_cache_value (solution :Dict, unbounded_variables :List[Variable]) -> List:
+    """
+    Cache values are aligned with the unbounded variables, which are in the same order for alpha-equivalent puzzles.
+    """
+    return [solution.get(str(var)) for var in unbounded_variables]
+
+def cache_value_to_solution (cache_value :List, unbounded_variables :List[Variable]) -> Dict:
+    return {
+        str(var): val
+        for var, val in zip(unbounded_variables, cache_value)
+        if (val is not None)
+    }
+
+# ====
+# On-disk tier
+# ====
+class SqliteSolutionCache :
+    def __init__ (
+            self,
+            path :str,
+            max_entries :int=None,
+            ttl_seconds :float=None
+    ):
+        self.path = path
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+
+        self._lock = threading.Lock()
+        self._connection = sqlite3.connect(self.path, check_same_thread=False)
+        with self._lock, self._connection:
+            self._connection.execute(
+                "CREATE TABLE IF NOT EXISTS solutions ("
+                "key TEXT PRIMARY KEY, value TEXT NOT NULL, created_at REAL NOT NULL, accessed_at REAL NOT NULL)"
+            )
+            self._connection.execute("CREATE INDEX IF NOT EXISTS solutions_accessed_at ON solutions (accessed_at)")
+
+    def get (self, key :str) -> Union[List, None]:
+        now = time.time()
+        with self._lock, self._connection:
+            row = self._connection.execute("SELECT value, created_at FROM solutions WHERE key = ?", (key,)).fetchone()
+            if (row is None):
+                return None
+
+            value, created_at = row
+            if (self.ttl_seconds is not None and now - created_at > self.ttl_seconds):
+                self._connection.execute("DELETE FROM solutions WHERE key = ?", (key,))
+                return None
+
+            self._connection.execute("UPDATE solutions SET accessed_at = ? WHERE key = ?", (now, key))
+            return json.loads(value)
+
+    def put (self, key :str, value :List):
+        now = time.time()
+        with self._lock, self._connection:
+            self._connection.execute(
+                "INSERT OR REPLACE INTO solutions (key, value, created_at, accessed_at) VALUES (?, ?, ?, ?)",
+                (key, json.dumps(value), now, now)
+            )
+            if (self.ttl_seconds is not None):
+                self._connection.execute("DELETE FROM solutions WHERE created_at < ?", (now - self.ttl_seconds,))
+            if (self.max_entries is not None):
+                self._connection.execute(
+                    "DELETE FROM solutions WHERE key IN "
+                    "(SELECT key FROM solutions ORDER BY accessed_at DESC LIMIT -1 OFFSET ?)",
+                    (self.max_entries,)
+                )
+
+    def __len__ (self) -> int:
+        with self._lock:
+            return self._connection.execute("SELECT COUNT(*) FROM solutions").fetchone()[0]
+
+    def close (self):
+        with self._lock:
+            self._connection.close()
+
+# ====
+# In-memory LRU tier (in front of the optional on-disk tier)
+# ====
+class SolutionCache :
+    def __init__ (
+            self,
+            max_entries :int=4096,
+            ttl_seconds :float=None,
+            disk_cache :SqliteSolutionCache=None
+    ):
+        assert(max_entries > 0)
+
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.disk_cache = disk_cache
+
+        self._lock = threading.Lock()
+        self._entries = OrderedDict() # key -> (stored_at, value)
+        self.hits = 0
+        self.misses = 0
+
+    def get (self, key :str) -> Union[List, None]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if (entry is not None):
+                stored_at, value = entry
+                if (self.ttl_seconds is None or time.monotonic() - stored_at <= self.ttl_seconds):
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return value
+                del self._entries[key]
+
+        value = (None if self.disk_cache is None else self.disk_cache.get(key))
+        with self._lock:
+            if (value is None):
+                self.misses += 1
+            else:
+                self.hits += 1
+                self._put_in_memory(key, value)
+        return value
+
+    def put (self, key :str, value :List):
+        with self._lock:
+            self._put_in_memory(key, value)
+        if (self.disk_cache is not None):
+            self.disk_cache.put(key, value)
+
+    def _put_in_memory (self, key :str, value :List):
+        self._entries[key] = (time.monotonic(), value)
+        self._entries.move_to_end(key)
+        while (len(self._entries) > self.max_entries):
+            self._entries.popitem(last=False)
+
+    def __len__ (self) -> int:
+        return len(self._entries)
@@ -0,0 +1,256 @@
+import threading
+from typing import Dict, List, Tuple, Union
+
+from ..ir.node import Expression, Constant, Variable, StringOperation
+from ..ir.node import AssignStatement, AssertStatement
+from ..ir.interpreter import ExecutionContext
+from ..ir.evaluator import VerificationResult
+from .json_2_prompt import execute_json_statements
+from .client import AbstractLLMClient, ChatGPTClient
+from ..solver.symbolic import UnsatisfiableConstraintsError
+from ..instrumentation import Instrumentation, COUNTER_ESCALATIONS
+
+import logging
+logging.basicConfig(level=logging.INFO)
+
+# ====
+# Globals
+# ====
+DEFAULT_MIN_SAMPLES = 4
+DEFAULT_MIN_SUCCESS_RATE = 0.5
+DEFAULT_PROBE_INTERVAL = 16
+
+# the features of a shape are capped, so that the large puzzles share their statistics
+MAX_SHAPE_COUNT = 4
+
+# the errors no tier can do better on; any other failure of a tier (a malformed answer, a timeout, an API error,
+# an assertion of its client) escalates. An invalid puzzle is rejected before the first tier (see _interpret).
+FATAL_ERRORS = (UnsatisfiableConstraintsError,)
+
+# ====
+# Puzzle shape
+# ====
+def _substr_depth (expr :Expression, exe_context :ExecutionContext, memo :Dict[int, int]) -> int:
+    """
+    The subStr nesting of the expression, through the assigned variables.
+    """
+    if (id(expr) in memo):
+        return memo[id(expr)]
+
+    if (isinstance(expr, Variable)):
+        assigned_expr = exe_context.store.get(expr)
+        depth = (0 if assigned_expr is None else _substr_depth(assigned_expr, exe_context, memo))
+    elif (isinstance(expr, Constant)):
+        depth = 0
+    else:
+        depth = max([_substr_depth(opd, exe_context, memo) for opd in expr.operands if (isinstance(opd, Expression))] + [0])
+        if (isinstance(expr, StringOperation) and expr.operator == "subStr"):
+            depth += 1
+
+    memo[id(expr)] = depth
+    return depth
+
+def _collect_operators (expr :Expression, operators :set):
+    if (isinstance(expr, (Variable, Constant))):
+        return
+    operators.add(expr.operator)
+    for opd in expr.operands:
+        if (isinstance(opd, Expression)):
+            _collect_operators(opd, operators)
+
+def puzzle_shape (exe_context :ExecutionContext) -> str:
+    """
+    A coarse signature of how hard a puzzle is, shared by the puzzles that differ only in names and constants:
+    the deepest subStr nesting of an assertion, the numbers of unknowns and assertions, and the operators.
+    """
+    memo = {}
+    operators = set()
+    substr_depth = 0
+    n_asserts = 0
+    for stat in exe_context.executed_statements:
+        if (isinstance(stat, AssignStatement)):
+            _collect_operators(stat.expression, operators)
+        elif (isinstance(stat, AssertStatement)):
+            n_asserts += 1
+            _collect_operators(stat.bool_expression, operators)
+            substr_depth = max(substr_depth, _substr_depth(stat.bool_expression, exe_context, memo))
+
+    return ";".join([
+        f"substr_depth={min(substr_depth, MAX_SHAPE_COUNT)}",
+        f"n_vars={min(len(exe_context.unbounded_variables), MAX_SHAPE_COUNT)}",
+        f"n_asserts={min(n_asserts, MAX_SHAPE_COUNT)}",
+        f"operators={','.join(sorted(operators))}"
+    ])
+
+# ====
+# Solve rates per shape and tier
+# ====
+class ShapeStats :
+    """
+    How often each tier of a cascade solved the puzzles of each shape. Thread-safe.
+    """
+    def __init__ (self):
+        self._lock = threading.Lock()
+        self._counts = {} # (shape, i_tier) -> [attempts, solved]
+        self._n_skipped = {} # shape -> the puzzles sent past the first tier
+
+    def record (self, shape :str, i_tier :int, is_solved :bool):
+        with self._lock:
+            counts = self._counts.setdefault((shape, i_tier), [0, 0])
+            counts[0] += 1
+            counts[1] += int(is_solved)
+
+    def counts (self, shape :str, i_tier :int) -> Tuple[int, int]:
+        with self._lock:
+            return tuple(self._counts.get((shape, i_tier), [0, 0]))
+
+    def success_rate (self, shape :str, i_tier :int, min_samples :int=1) -> Union[float, None]:
+        """
+        The share of the puzzles of the shape the tier solved, or None below min_samples attempts.
+        """
+        n_attempts, n_solved = self.counts(shape, i_tier)
+        return (None if n_attempts < max(1, min_samples) else n_solved / n_attempts)
+
+    def count_skip (self, shape :str) -> int:
+        with self._lock:
+            self._n_skipped[shape] = self._n_skipped.get(shape, 0) + 1
+            return self._n_skipped[shape]
+
+    def snapshot (self) -> Dict:
+        with self._lock:
+            snapshot = {}
+            for (shape, i_tier), (n_attempts, n_solved) in sorted(self._counts.items()):
+                snapshot.setdefault(shape, {})[i_tier] = {"attempts": n_attempts, "solved": n_solved}
+            return snapshot
+
+# ====
+# Cascading client
+# ====
+class CascadingClient (AbstractLLMClient):
+    """
+    Tries the tiers (clients of increasingly capable models) in order, and hands a puzzle to the next tier
+    if the answer violates the interpreted constraints or the tier failed (except with FATAL_ERRORS).
+    If no tier solves it, the best ranked answer is returned.
+
+    The solve rate of every tier is tracked per puzzle shape (see puzzle_shape): the shapes a tier solved less than
+    min_success_rate of the time (over min_samples attempts at least) skip it, except for one probe every probe_interval
+    puzzles so that the statistics can recover.
+    """
+    def __init__ (
+            self,
+            tiers :List[ChatGPTClient],
+            shape_stats :ShapeStats=None,
+            min_samples :int=DEFAULT_MIN_SAMPLES,
+            min_success_rate :float=DEFAULT_MIN_SUCCESS_RATE,
+            probe_interval :int=DEFAULT_PROBE_INTERVAL,
+            instrumentation :Instrumentation=None
+    ) -> None:
+        super().__init__()
+        assert(len(tiers) >= 1)
+
+        self.tiers = tiers
+        self.shape_stats = (ShapeStats() if shape_stats is None else shape_stats)
+        self.min_samples = min_samples
+        self.min_success_rate = min_success_rate
+        self.probe_interval = probe_interval
+        self.instrumentation = (Instrumentation() if instrumentation is None else instrumentation)
+
+    def is_hard_for (self, shape :str, i_tier :int) -> bool:
+        success_rate = self.shape_stats.success_rate(shape, i_tier, min_samples=self.min_samples)
+        return (success_rate is not None and success_rate < self.min_success_rate)
+
+    def first_tier (self, shape :str) -> int:
+        """
+        The first tier that is not known to be too weak for the shape.
+        """
+        i_tier = 0
+        while (i_tier < len(self.tiers) - 1 and self.is_hard_for(shape, i_tier)):
+            i_tier += 1
+        return i_tier
+
+    def _route (self, shape :str) -> int:
+        i_tier = self.first_tier(shape)
+        if (i_tier > 0 and self.probe_interval > 0 and self.shape_stats.count_skip(shape) % self.probe_interval == 0):
+            return 0
+        return i_tier
+
+    def _rank (self, result :VerificationResult) -> Tuple[int, int]:
+        return (len(result.violated), len(result.missing_variables))
+
+    def _on_answer (
+            self,
+            shape :str,
+            i_tier :int,
+            answer :Union[Tuple[Dict, VerificationResult], None],
+            best :Union[Tuple[Dict, VerificationResult], None]
+    ) -> Tuple[Union[Tuple[Dict, VerificationResult], None], bool]:
+        """
+        Record the tier's answer (None if it failed), and return the best answer so far and whether to stop.
+        """
+        is_solved = (answer is not None and answer[1].is_valid)
+        self.shape_stats.record(shape, i_tier, is_solved)
+        if (answer is not None and (best is None or self._rank(answer[1]) < self._rank(best[1]))):
+            best = answer
+        if (not is_solved and i_tier < len(self.tiers) - 1):
+            self.instrumentation.count(COUNTER_ESCALATIONS, shape=shape, tier=i_tier)
+        return (best, is_solved)
+
+    def _interpret (self, json_statements :List) -> Tuple[ExecutionContext, str]:
+        """
+        Interpret the puzzle once, for its shape and for all the tiers; an invalid puzzle raises here, before any LLM call.
+        """
+        exe_context = execute_json_statements(json_statements)
+        return (exe_context, puzzle_shape(exe_context))
+
+    def solve_and_verify_json_statements (self, json_statements :List, max_tokens :int=None) -> Tuple[Dict, VerificationResult]:
+        """
+        Returns the first valid answer of the cascade, or else the best ranked one (see SolveTask.select_candidate).
+        """
+        exe_context, shape = self._interpret(json_statements)
+
+        best = None
+        for i_tier in range(self._route(shape), len(self.tiers)):
+            try:
+                answer = self.tiers[i_tier].solve_and_verify_json_statements(json_statements, max_tokens=max_tokens, exe_context=exe_context)
+            except FATAL_ERRORS:
+                raise
+            except Exception as ex:
+                if (i_tier == len(self.tiers) - 1 and best is None):
+                    raise
+                logging.warning(f"Tier {self.tiers[i_tier].model} failed: {ex!r}")
+                answer = None
+            best, is_solved = self._on_answer(shape, i_tier, answer, best)
+            if (is_solved):
+                break
+        return best
+
+    async def asolve_and_verify_json_statements (self, json_statements :List, max_tokens :int=None) -> Tuple[Dict, VerificationResult]:
+        exe_context, shape = self._interpret(json_statements)
+
+        best = None
+        for i_tier in range(self._route(shape), len(self.tiers)):
+            try:
+                answer = await self.tiers[i_tier].asolve_and_verify_json_statements(json_statements, max_tokens=max_tokens, exe_context=exe_context)
+            except FATAL_ERRORS:
+                raise
+            except Exception as ex:
+                if (i_tier == len(self.tiers) - 1 and best is None):
+                    raise
+                logging.warning(f"Tier {self.tiers[i_tier].model} failed: {ex!r}")
+                answer = None
+            best, is_solved = self._on_answer(shape, i_tier, answer, best)
+            if (is_solved):
+                break
+        return best
+
+    def solve_json_statements (self, json_statements :List, max_tokens :int=None) -> Dict:
+        return self.solve_and_verify_json_statements(json_statements, max_tokens=max_tokens)[0]
+
+    async def asolve_json_statements (self, json_statements :List, max_tokens :int=None) -> Dict:
+        return (await self.asolve_and_verify_json_statements(json_statements, max_tokens=max_tokens))[0]
+
+    def stats (self) -> Dict:
+        return {
+            "tiers": [tier.model for tier in self.tiers],
+            "shapes": self.shape_stats.snapshot()
+        }
@@ -1,16 +1,191 @@
 import os 
+import asyncio
 from abc import ABC, abstractmethod
-from typing import Dict, List 
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, AsyncIterator, Dict, Iterator, List, Tuple, Union
 
+from langchain_core.language_models import BaseChatModel
+from langchain_core.messages import BaseMessage
+from langchain_core.prompt_values import PromptValue
 from langchain_core.prompts import ChatPromptTemplate
 from langchain_core.output_parsers import StrOutputParser 
+from langchain_core.runnables import Runnable, RunnableLambda 
 from langchain_openai.chat_models import ChatOpenAI
 
-from .json_2_prompt import SYSTEM_MESSAGE, generate_prompt_from_json_statements
+from ..ir.node import Variable
+from ..ir.interpreter import ExecutionContext
+from ..ir.evaluator import CompiledPuzzle, VerificationResult
+from ..ir.slicing import slice_execution_context
+from ..ir.simplify import simplify_execution_context
+from ..solver.symbolic import SAT, UNSAT, UnsatisfiableConstraintsError, solve_symbolically
+from .json_2_prompt import SYSTEM_MESSAGE, execute_json_statements, generate_prompt_from_execution_context
+from .json_2_prompt import generate_repair_prompt, estimate_token_count, ANSWER_FORMAT_TEXT, ANSWER_FORMAT_JSON, ANSWER_FORMATS
+from .saying import parse_llm_saying, parse_llm_saying_line, StreamingSayingParser, dump_solution_to_saying
+from .structured import AnswerFormatError, StreamingJSONAnswerParser, build_response_format, parse_json_answer, dump_solution_to_json_answer
+from .cache import SolutionCache, compute_cache_key, solution_to_cache_value, cache_value_to_solution
+from .packing import DEFAULT_MAX_PACK_PROMPT_TOKENS, DEFAULT_MAX_PUZZLES_PER_PACK
+from .packing import generate_packed_prompt, parse_packed_saying, plan_packs
+from .resilience import RetryPolicy, HedgePolicy, ResilientCaller
+from .ratelimit import RateLimitScheduler, RateLimitCallbackHandler, PRIORITY_BATCH, rate_limit_priority, get_rate_limit_priority
+from ..instrumentation import Instrumentation, LLMUsageCallbackHandler
+from ..instrumentation import PHASE_SOLVE, PHASE_INTERPRET, PHASE_SIMPLIFY, PHASE_SYMBOLIC, PHASE_CACHE, PHASE_RENDER, PHASE_PARSE
+from ..instrumentation import COUNTER_CACHE_HITS, COUNTER_CACHE_MISSES, COUNTER_RETRIES
 
 import logging 
 logging.basicConfig(level=logging.INFO)
 
+# ====
+# Globals
+# ====
+DEFAULT_MAX_CONCURRENCY = 8
+DEFAULT_MAX_REPAIR_ATTEMPTS = 3
+DEFAULT_N_CANDIDATES = 4
+DEFAULT_SAMPLING_TEMPERATURE = 0.7
+
+# ====
+# Requests
+# ====
+def get_request_text (request_inputs :Dict) -> str: 
+    """
+    The text of a request's inputs (without its response_format). 
+    """
+    return "".join([val for val in request_inputs.values() if (isinstance(val, str))])
+
+def get_requests_text (request_inputs_list :List[Dict]) -> str: 
+    return "".join([get_request_text(request_inputs) for request_inputs in request_inputs_list])
+
+# ====
+# A puzzle on its way through a client 
+# ====
+class SolveTask : 
+    def __init__ (self, exe_context :ExecutionContext, answer_format :str=ANSWER_FORMAT_TEXT): 
+        self.exe_context = exe_context 
+        self.answer_format = answer_format 
+        self.prompt_context = exe_context # the context the prompts are rendered from (simplified, if the client simplifies) 
+        self.prompt = None 
+        self.component_prompts = None # one prompt per independent component, if the puzzle is sliced 
+        self.component_contexts = None 
+        self.cache_key = None 
+        self.solution = None 
+        self._compiled_puzzle = None 
+
+    @property
+    def request_prompts (self) -> List[str]: 
+        return (self.component_prompts if self.component_prompts is not None else [self.prompt])
+
+    @property
+    def request_contexts (self) -> List[ExecutionContext]: 
+        return (self.component_contexts if self.component_contexts is not None else [self.prompt_context])
+
+    @property
+    def variable_solution (self) -> Dict[Variable, str]: 
+        """
+        The solution keyed by the unbounded variables of the puzzle, e.g., for the evaluator. 
+        """
+        return {v: self.solution[str(v)] for v in self.exe_context.unbounded_variables if (str(v) in self.solution)}
+
+    def parse (self, chatgpt_saying :str) -> Dict: 
+        if (self.answer_format == ANSWER_FORMAT_JSON): 
+            return {str(var): val for var, val in parse_json_answer(chatgpt_saying, self.exe_context.unbounded_variables).items()}
+        return parse_llm_saying(chatgpt_saying)
+
+    def parse_leniently (self, chatgpt_saying :str) -> Dict: 
+        """
+        A malformed answer answers nothing (and is left to verification). 
+        """
+        try: 
+            return self.parse(chatgpt_saying)
+        except AnswerFormatError: 
+            return {} 
+
+    @property
+    def compiled_puzzle (self) -> CompiledPuzzle: 
+        if (self._compiled_puzzle is None): 
+            self._compiled_puzzle = CompiledPuzzle(self.exe_context)
+        return self._compiled_puzzle 
+
+    def verify (self) -> VerificationResult: 
+        return self.compiled_puzzle.verify(self.solution)
+
+    def select_candidate (self, chatgpt_sayings :List[str]) -> Tuple[Dict, VerificationResult]: 
+        """
+        The first valid candidate answer, or else the one with the fewest violated relations (then missing variables). 
+        """
+        best_solution, best_result = None, None 
+        for chatgpt_saying in chatgpt_sayings: 
+            solution = self.parse_leniently(chatgpt_saying)
+            result = self.compiled_puzzle.verify(solution)
+            if (result.is_valid): 
+                return (solution, result)
+            if (best_result is None or (len(result.violated), len(result.missing_variables)) < (len(best_result.violated), len(best_result.missing_variables))): 
+                best_solution, best_result = solution, result 
+        return (best_solution, best_result)
+
+# ====
+# Generate-verify-repair loop state 
+# ====
+class RepairLoop : 
+    """
+    Tracks the attempts and the (estimated) tokens spent on one puzzle, and keeps the best answer so far. 
+    A repair turn only re-sends the requests (e.g., the sliced components) whose answers violate some relations. 
+    """
+    def __init__ (self, task :SolveTask, max_attempts :int, max_total_tokens :int=None): 
+        assert(max_attempts >= 1)
+
+        self.task = task 
+        self.max_attempts = max_attempts 
+        self.max_total_tokens = max_total_tokens 
+        self.compiled_requests = [CompiledPuzzle(exe_context) for exe_context in task.request_contexts]
+
+        self.n_attempts = 0 
+        self.n_tokens = 0 
+        self.best_solution = None 
+        self.best_result = None 
+
+    def accept (self, chatgpt_saying :Union[str, None], request_text :str="") -> VerificationResult: 
+        if (chatgpt_saying is not None): 
+            self.n_attempts += 1 
+            self.n_tokens += estimate_token_count(request_text) + estimate_token_count(chatgpt_saying)
+            # a repaired answer may only restate the fixed variables 
+            self.task.solution = {**(self.best_solution or {}), **self.task.parse_leniently(chatgpt_saying)}
+
+        result = self.task.verify() 
+        if (self.best_result is None or len(result.violated) < len(self.best_result.violated)): 
+            self.best_solution = dict(self.task.solution)
+            self.best_result = result 
+        return result 
+
+    def fits_budget (self, request_text :str) -> bool: 
+        return (self.max_total_tokens is None or self.n_tokens + estimate_token_count(request_text) <= self.max_total_tokens)
+
+    def next_repair_inputs (self) -> Union[List[Dict], None]: 
+        """
+        The inputs of the next repair requests, one per request whose answer violates some relations, 
+        or None if the answer is valid or the budget is spent. 
+        """
+        if (self.best_result.is_valid or self.n_attempts >= self.max_attempts): 
+            return None 
+
+        is_json = (self.task.answer_format == ANSWER_FORMAT_JSON)
+        dump_solution = (dump_solution_to_json_answer if is_json else dump_solution_to_saying)
+        repair_inputs_list = [] 
+        for prompt, exe_context, compiled_puzzle in zip(self.task.request_prompts, self.task.request_contexts, self.compiled_requests): 
+            violated = compiled_puzzle.verify(self.best_solution).violated 
+            if (len(violated) == 0): 
+                continue 
+            var_names = set([str(v) for v in exe_context.unbounded_variables])
+            repair_inputs = {
+                "statements": prompt, 
+                "answer": dump_solution({var_name: val for var_name, val in self.best_solution.items() if (var_name in var_names)}), 
+                "repair": generate_repair_prompt(exe_context, violated, answer_format=self.task.answer_format)
+            }
+            if (is_json): 
+                repair_inputs["response_format"] = build_response_format(exe_context.unbounded_variables)
+            repair_inputs_list.append(repair_inputs)
+
+        if (len(repair_inputs_list) == 0 or not self.fits_budget(get_requests_text(repair_inputs_list))): 
+            return None 
+        return repair_inputs_list 
 
 # ====
 # Abstract LLM client 
@@ -20,9 +195,54 @@ class AbstractLLMClient (ABC):
         super().__init__() 
 
     @abstractmethod
-    def solve_json_statements (json_statements :List) -> Dict: 
+    def solve_json_statements (self, json_statements :List) -> Dict:
         pass 
-        
+
+    async def asolve_json_statements (self, json_statements :List, **kwargs) -> Dict:
+        """
+        Async version of solve_json_statements.
+        Clients without a native async surface run the blocking call in a worker thread.
+        """
+        return await asyncio.to_thread(self.solve_json_statements, json_statements, **kwargs)
+
+    def solve_many (
+            self, 
+            json_statements_list :List[List],
+            max_concurrency :int=DEFAULT_MAX_CONCURRENCY,
+            **kwargs
+    ) -> List[Union[Dict, Exception]]:
+        """
+        Solve many puzzles with at most max_concurrency in-flight calls.
+        The results are in the order of json_statements_list; a failed puzzle gets its exception instead of a solution.
+        """
+        def solve_one (json_statements :List) -> Union[Dict, Exception]:
+            try:
+                return self.solve_json_statements(json_statements, **kwargs)
+            except Exception as ex:
+                return ex
+
+        with ThreadPoolExecutor(max_workers=max(1, max_concurrency)) as executor:
+            return list(executor.map(solve_one, json_statements_list))
+
+    async def asolve_many (
+            self, 
+            json_statements_list :List[List],
+            max_concurrency :int=DEFAULT_MAX_CONCURRENCY,
+            **kwargs
+    ) -> List[Union[Dict, Exception]]:
+        """
+        Async version of solve_many.
+        """
+        semaphore = asyncio.Semaphore(max(1, max_concurrency))
+
+        async def asolve_one (json_statements :List) -> Union[Dict, Exception]:
+            async with semaphore:
+                try:
+                    return await self.asolve_json_statements(json_statements, **kwargs)
+                except Exception as ex:
+                    return ex
+
+        return list(await asyncio.gather(*[asolve_one(json_statements) for json_statements in json_statements_list]))
 
 # ====
 # ChatGPT client 
@@ -33,21 +253,44 @@ class ChatGPTClient (AbstractLLMClient):
             openai_api_key :str=None, 
             model :str='gpt-3.5-turbo', 
             endpoint_url :str=None, # "https://api.openai.com/v1/chat/completions", 
-            default_max_tokens :int=256
+            default_max_tokens :int=256,
+            llm :BaseChatModel=None, # use the given chat model instead of building a ChatOpenAI one
+            cache :SolutionCache=None, 
+            use_symbolic_solver :bool=False, # solve the supported fragment in-process, only send the rest to the LLM 
+            slice_components :bool=False, # solve the independent components of a puzzle with separate, smaller prompts 
+            simplify :bool=False, # simplify the puzzle (see aitestgen.ir.simplify) before rendering its prompt 
+            answer_format :str=ANSWER_FORMAT_TEXT, # ANSWER_FORMAT_JSON asks for a JSON object constrained to the unbounded variables 
+            max_concurrency :int=DEFAULT_MAX_CONCURRENCY, 
+            http_client :Any=None, # an httpx.Client (and its connection pool) shared with other clients 
+            http_async_client :Any=None, # an httpx.AsyncClient shared with other clients 
+            instrumentation :Instrumentation=None, 
+            timeout :float=None, # the deadline of every LLM call, in seconds 
+            retry_policy :RetryPolicy=None, # retry the retryable errors (and the missed deadlines) 
+            hedge_policy :HedgePolicy=None, # duplicate the slow LLM calls 
+            rate_limiter :RateLimitScheduler=None # the request and token budgets, shared by the clients of one account 
     ) -> None:
-        super().__init__()
-
-        # configure openai authentication 
-        if (type(openai_api_key) is not str): 
-            openai_api_key = os.environ.get('OPENAI_API_KEY') 
-        assert(type(openai_api_key) is str)
-        self.openai_api_key = openai_api_key
+        super().__init__() 
+        assert(answer_format in ANSWER_FORMATS), f"Unknown answer format: {answer_format}"
 
         # configure parameters 
         self.model = model
         self.openai_url = endpoint_url 
         self.default_max_tokens = default_max_tokens 
         self.temperature = 0.0 
+        self.cache = cache 
+        self.use_symbolic_solver = use_symbolic_solver 
+        self.slice_components = slice_components 
+        self.simplify = simplify 
+        self.answer_format = answer_format 
+        self.max_concurrency = max_concurrency 
+        self.instrumentation = (Instrumentation() if instrumentation is None else instrumentation)
+        self.resilient_caller = ResilientCaller(
+            timeout=timeout, 
+            retry_policy=retry_policy, 
+            hedge_policy=hedge_policy, 
+            instrumentation=self.instrumentation
+        )
+        self.rate_limiter = rate_limiter 
 
         # build the LLM chain 
         self.prompt_template = ChatPromptTemplate.from_messages(
@@ -56,47 +299,733 @@ class ChatGPTClient (AbstractLLMClient):
                 ("human", "{statements}")
             ]
         )
-        
-        self.llm = ChatOpenAI(
-            model=self.model, 
-            temperature=self.temperature,
-            api_key=self.openai_api_key, 
-            max_tokens=self.default_max_tokens,  
-            base_url=self.openai_url, 
-            verbose=True
-        )
+
+        if (llm is None):
+            # configure openai authentication
+            if (type(openai_api_key) is not str):
+                openai_api_key = os.environ.get('OPENAI_API_KEY')
+            assert(type(openai_api_key) is str)
+
+            llm = ChatOpenAI(
+                model=self.model,
+                temperature=self.temperature,
+                api_key=openai_api_key,
+                max_tokens=self.default_max_tokens,
+                base_url=self.openai_url,
+                http_client=http_client,
+                http_async_client=http_async_client,
+                # the rate-limit headers; ChatOpenAI cannot report them for the requests with a response_format, 
+                # so the JSON answers rely on the configured budgets and the 429s only 
+                include_response_headers=(rate_limiter is not None and answer_format == ANSWER_FORMAT_TEXT), 
+                verbose=True
+            )
+        self.openai_api_key = openai_api_key
+        self.llm = llm
 
         self.output_parser = StrOutputParser() 
 
-        self.llm_chain = self.prompt_template | self.llm | self.output_parser 
+        # the prompt for the follow-up turn of the generate-verify-repair loop 
+        self.repair_prompt_template = ChatPromptTemplate.from_messages(
+            messages=[
+                ("system", SYSTEM_MESSAGE), 
+                ("human", "{statements}"), 
+                ("ai", "{answer}"), 
+                ("human", "{repair}")
+            ]
+        )
+
+        self.build_llm_chains() 
+
+    def build_llm_chains (self): 
+        """
+        (Re)build the chains around self.llm, e.g., after wrapping it. 
+        """
+        # every LLM round trip (and its token usage) is reported to the instrumentation 
+        self.llm_usage_callback = LLMUsageCallbackHandler(self.instrumentation)
+        self.llm_callbacks = [self.llm_usage_callback] 
+        if (self.rate_limiter is not None): # the rate-limit headers and the 429s adjust the budgets 
+            self.llm_callbacks.append(RateLimitCallbackHandler(self.rate_limiter))
+        self.instrumented_llm = self.llm.with_config(callbacks=self.llm_callbacks)
+        self.llm_chain = self.prompt_template | self.make_resilient(self.instrumented_llm) | self.output_parser 
+        self.repair_llm_chain = self.repair_prompt_template | self.make_resilient(self.instrumented_llm) | self.output_parser 
+
+        # the chains of the puzzles' requests, constrained to the answer schema in the JSON answer format 
+        if (self.answer_format == ANSWER_FORMAT_JSON): 
+            self.answer_llm_chain = self.make_structured_chain(self.prompt_template)
+            self.answer_repair_llm_chain = self.make_structured_chain(self.repair_prompt_template)
+        else: 
+            self.answer_llm_chain = self.llm_chain 
+            self.answer_repair_llm_chain = self.repair_llm_chain 
+
+    def make_structured_chain (self, prompt_template :ChatPromptTemplate, max_tokens :int=None) -> Runnable: 
+        """
+        A chain whose chat model is bound to the response_format of each of its inputs (see _request_inputs). 
+        """
+        def route (inputs :Dict) -> Runnable: 
+            llm = self.get_llm(max_tokens).bind(response_format=inputs["response_format"])
+            return prompt_template | self.make_resilient(llm, max_tokens=max_tokens) | self.output_parser 
+        return RunnableLambda(route)
+
+    def make_resilient (self, llm :Runnable, max_tokens :int=None) -> Runnable: 
+        """
+        Wrap the chat model calls with the rate limits, the deadline, the retries and the hedging of the client (if any). 
+        Every attempt (retry or hedge) is admitted by the rate limiter on its own. 
+        """
+        if (self.resilient_caller.is_trivial and self.rate_limiter is None): 
+            return llm 
+
+        def to_messages (messages :Any) -> List[BaseMessage]: 
+            return (messages.to_messages() if isinstance(messages, PromptValue) else messages)
+
+        def invoke_resilient (messages :Any, config :Dict) -> Any: 
+            priority = get_rate_limit_priority() # the hedges run in other threads 
+            def attempt () -> Any: 
+                self.acquire_rate_limit(to_messages(messages), max_tokens=max_tokens, priority=priority)
+                return llm.invoke(messages, config)
+            return self.resilient_caller.call(attempt)
+
+        async def ainvoke_resilient (messages :Any, config :Dict) -> Any: 
+            async def attempt () -> Any: 
+                await self.aacquire_rate_limit(to_messages(messages), max_tokens=max_tokens)
+                return await llm.ainvoke(messages, config)
+            return await self.resilient_caller.acall(attempt)
+
+        return RunnableLambda(invoke_resilient, afunc=ainvoke_resilient)
+
+    # ----
+    # Rate limiting 
+    # ----
+    def estimate_request_tokens (self, messages :List[BaseMessage], max_tokens :int=None, n :int=1) -> int: 
+        """
+        The tokens a request counts against the budget: the estimated prompt tokens plus the max completion tokens. 
+        """
+        prompt_tokens = sum([estimate_token_count(str(message.content)) for message in messages])
+        return prompt_tokens + n * (self.default_max_tokens if max_tokens is None else max_tokens)
+
+    def acquire_rate_limit (self, messages :List[BaseMessage], max_tokens :int=None, n :int=1, priority :int=None): 
+        if (self.rate_limiter is not None): 
+            self.rate_limiter.acquire(self.estimate_request_tokens(messages, max_tokens=max_tokens, n=n), priority=priority)
+
+    async def aacquire_rate_limit (self, messages :List[BaseMessage], max_tokens :int=None, n :int=1): 
+        if (self.rate_limiter is not None): 
+            await self.rate_limiter.aacquire(self.estimate_request_tokens(messages, max_tokens=max_tokens, n=n))
+
+    # ----
+    # Prompt completion
+    # ----
+    def get_llm (self, max_tokens :int=None): 
+        """
+        The chat model, with max_tokens overriding the default_max_tokens of the client. 
+        """
+        return (self.instrumented_llm if max_tokens is None else self.instrumented_llm.bind(max_tokens=max_tokens))
+
+    def get_llm_chain (self, max_tokens :int=None): 
+        if (max_tokens is None): 
+            return self.llm_chain 
+        return self.prompt_template | self.make_resilient(self.get_llm(max_tokens), max_tokens=max_tokens) | self.output_parser 
+
+    def get_answer_chain (self, max_tokens :int=None): 
+        if (max_tokens is None): 
+            return self.answer_llm_chain 
+        if (self.answer_format == ANSWER_FORMAT_JSON): 
+            return self.make_structured_chain(self.prompt_template, max_tokens=max_tokens)
+        return self.get_llm_chain(max_tokens)
+
+    def complete_prompt (self, prompt :str, max_tokens :int=None) -> str:
+        return self.get_llm_chain(max_tokens).invoke({
+            "statements": prompt
+        })
+
+    async def acomplete_prompt (self, prompt :str, max_tokens :int=None) -> str:
+        return await self.get_llm_chain(max_tokens).ainvoke({
+            "statements": prompt
+        })
+
+    # ----
+    # Solving
+    # ----
+    def _prepare_task (self, json_statements :List, max_tokens :int=None, exe_context :ExecutionContext=None) -> SolveTask: 
+        if (exe_context is None): 
+            with self.instrumentation.span(PHASE_INTERPRET, n_statements=len(json_statements)): 
+                exe_context = execute_json_statements(json_statements)
+        task = SolveTask(exe_context=exe_context, answer_format=self.answer_format)
+
+        if (self.simplify): # the trivially unsatisfiable puzzles stop here 
+            with self.instrumentation.span(PHASE_SIMPLIFY) as span_attributes: 
+                task.prompt_context = simplify_execution_context(exe_context)
+                span_attributes["n_statements"] = len(exe_context.executed_statements)
+                span_attributes["n_simplified_statements"] = len(task.prompt_context.executed_statements)
+
+        if (self.use_symbolic_solver): 
+            with self.instrumentation.span(PHASE_SYMBOLIC) as span_attributes: 
+                symbolic_solution = solve_symbolically(exe_context)
+                span_attributes["status"] = symbolic_solution.status 
+            if (symbolic_solution.status == SAT): 
+                task.solution = symbolic_solution.to_solution() 
+                return task 
+            elif (symbolic_solution.status == UNSAT): 
+                raise UnsatisfiableConstraintsError(symbolic_solution.reason)
+
+        if (self.cache is not None): 
+            with self.instrumentation.span(PHASE_CACHE) as span_attributes: 
+                task.cache_key = compute_cache_key(
+                    json_statements, 
+                    model=self.model, 
+                    temperature=self.temperature, 
+                    max_tokens=(self.default_max_tokens if max_tokens is None else max_tokens)
+                )
+                cache_value = self.cache.get(task.cache_key)
+                span_attributes["hit"] = (cache_value is not None)
+            if (cache_value is not None): 
+                self.instrumentation.count(COUNTER_CACHE_HITS)
+                task.solution = cache_value_to_solution(cache_value, exe_context.unbounded_variables)
+                return task 
+            self.instrumentation.count(COUNTER_CACHE_MISSES)
+
+        self._render_task(task)
+        return task 
+
+    def _render_task (self, task :SolveTask): 
+        with self.instrumentation.span(PHASE_RENDER): 
+            task.prompt = generate_prompt_from_execution_context(task.prompt_context, answer_format=self.answer_format)
+            if (self.slice_components): 
+                components = [
+                    component for component in slice_execution_context(task.prompt_context) 
+                    if (len(component.unbounded_variables) > 0)
+                ]
+                if (len(components) > 1): 
+                    task.component_contexts = components 
+                    task.component_prompts = [
+                        generate_prompt_from_execution_context(component, answer_format=self.answer_format) 
+                        for component in components
+                    ]
+
+    def _request_inputs (self, prompt :str, exe_context :ExecutionContext) -> Dict: 
+        request_inputs = {"statements": prompt}
+        if (self.answer_format == ANSWER_FORMAT_JSON): 
+            request_inputs["response_format"] = build_response_format(exe_context.unbounded_variables)
+        return request_inputs 
+
+    def _task_inputs (self, task :SolveTask) -> List[Dict]: 
+        return [self._request_inputs(prompt, exe_context) for prompt, exe_context in zip(task.request_prompts, task.request_contexts)]
+
+    def _complete_task (self, task :SolveTask, max_tokens :int=None) -> str: 
+        task_inputs = self._task_inputs(task)
+        if (len(task_inputs) == 1): 
+            return self.get_answer_chain(max_tokens).invoke(task_inputs[0])
+
+        chatgpt_sayings = self.get_answer_chain(max_tokens).batch(
+            task_inputs, 
+            config={"max_concurrency": self.max_concurrency}
+        )
+        return "\n".join(chatgpt_sayings)
+
+    async def _acomplete_task (self, task :SolveTask, max_tokens :int=None) -> str: 
+        task_inputs = self._task_inputs(task)
+        if (len(task_inputs) == 1): 
+            return await self.get_answer_chain(max_tokens).ainvoke(task_inputs[0])
+
+        chatgpt_sayings = await self.get_answer_chain(max_tokens).abatch(
+            task_inputs, 
+            config={"max_concurrency": self.max_concurrency}
+        )
+        return "\n".join(chatgpt_sayings)
+
+    def _finish_task (self, task :SolveTask, chatgpt_saying :str) -> Dict: 
+        with self.instrumentation.span(PHASE_PARSE): 
+            solution = task.parse(chatgpt_saying)
+        return self._accept_solution(task, solution)
+
+    def _accept_solution (self, task :SolveTask, solution :Dict) -> Dict: 
+        task.solution = solution 
+        # only a valid answer is cached, else a wrong one would be served from then on 
+        if (self.cache is not None and task.verify().is_valid): 
+            self.cache.put(task.cache_key, solution_to_cache_value(task.solution, task.exe_context.unbounded_variables))
+        return task.solution 
+
+    def _solve_task (self, json_statements :List, max_tokens :int=None) -> SolveTask: 
+        with self.instrumentation.span(PHASE_SOLVE): 
+            # "execute" the json statements and generate the prompt (unless the solution is cached) 
+            task = self._prepare_task(json_statements, max_tokens=max_tokens)
+            if (task.solution is not None): 
+                return task 
+
+            # call ChatGPT for the answer 
+            chatgpt_saying = self._complete_task(task, max_tokens=max_tokens)
+
+            # parase ChatGPT's answer 
+            self._finish_task(task, chatgpt_saying)
+            return task 
+
+    async def _asolve_task (self, json_statements :List, max_tokens :int=None) -> SolveTask: 
+        with self.instrumentation.span(PHASE_SOLVE): 
+            task = self._prepare_task(json_statements, max_tokens=max_tokens)
+            if (task.solution is not None): 
+                return task 
+
+            chatgpt_saying = await self._acomplete_task(task, max_tokens=max_tokens)
+            self._finish_task(task, chatgpt_saying)
+            return task 
 
     def solve_json_statements(
             self, 
             json_statements: List, 
             max_tokens :int=None
     ) -> Dict:
-        # generate the prompt from the execution context 
-        prompt = generate_prompt_from_json_statements(json_statements=json_statements)
+        return self._solve_task(json_statements, max_tokens=max_tokens).solution 
 
-        # call ChatGPT for the answer 
-        chatgpt_saying = self.llm_chain.invoke({
-            "statements": prompt
-        })
+    async def asolve_json_statements(
+            self, 
+            json_statements: List, 
+            max_tokens :int=None
+    ) -> Dict:
+        return (await self._asolve_task(json_statements, max_tokens=max_tokens)).solution 
+
+    def solve_json_statements_to_variables (
+            self, 
+            json_statements :List, 
+            max_tokens :int=None 
+    ) -> Tuple[ExecutionContext, Dict[Variable, str]]: 
+        """
+        Same as solve_json_statements, but the solution is keyed by the unbounded variables of the returned context 
+        (e.g., for verify_solution). 
+        """
+        task = self._solve_task(json_statements, max_tokens=max_tokens)
+        return (task.exe_context, task.variable_solution)
+
+    async def asolve_json_statements_to_variables (
+            self, 
+            json_statements :List, 
+            max_tokens :int=None 
+    ) -> Tuple[ExecutionContext, Dict[Variable, str]]: 
+        task = await self._asolve_task(json_statements, max_tokens=max_tokens)
+        return (task.exe_context, task.variable_solution)
+
+    def solve_and_verify_json_statements (
+            self, 
+            json_statements :List, 
+            max_tokens :int=None, 
+            exe_context :ExecutionContext=None # the interpreted json_statements, if the caller already has them 
+    ) -> Tuple[Dict, VerificationResult]: 
+        """
+        Solve the puzzle, then check the answer against the interpreted constraints (no extra LLM round trip). 
+        """
+        task = self._prepare_task(json_statements, max_tokens=max_tokens, exe_context=exe_context)
+        if (task.solution is None): 
+            self._finish_task(task, self._complete_task(task, max_tokens=max_tokens))
+        return (task.solution, task.verify())
+
+    async def asolve_and_verify_json_statements (
+            self, 
+            json_statements :List, 
+            max_tokens :int=None, 
+            exe_context :ExecutionContext=None
+    ) -> Tuple[Dict, VerificationResult]: 
+        task = self._prepare_task(json_statements, max_tokens=max_tokens, exe_context=exe_context)
+        if (task.solution is None): 
+            self._finish_task(task, await self._acomplete_task(task, max_tokens=max_tokens))
+        return (task.solution, task.verify())
 
-        # parase ChatGPT's answer 
-        saying_lines = chatgpt_saying.split('\n')
-        saying_lines = list(map(lambda x: x.strip(), saying_lines))
-        saying_lines = list(filter(lambda x: len(x) > 0, saying_lines)) 
+    def _sampling_inputs (self, task :SolveTask, temperature :float, max_tokens :int) -> Tuple[List, Dict]: 
+        request_inputs = self._request_inputs(task.prompt, task.prompt_context)
+        messages = self.prompt_template.invoke(request_inputs).to_messages() 
+        llm_kwargs = {"temperature": temperature, "callbacks": self.llm_callbacks}
+        if ("response_format" in request_inputs): 
+            llm_kwargs["response_format"] = request_inputs["response_format"]
+        if (max_tokens is not None): 
+            llm_kwargs["max_tokens"] = max_tokens 
+        return (messages, llm_kwargs)
 
-        var_name_2_str_val = {} 
-        for saying in saying_lines: 
-            i = saying.find('=') 
-            if (i > 0): 
-                var_name = saying[0:i].strip() 
-                val = saying[i+1:].strip().strip('"') 
-                var_name_2_str_val[var_name] = val 
+    def _sample_candidates (self, task :SolveTask, n_candidates :int, temperature :float, max_tokens :int) -> List[str]: 
+        messages, llm_kwargs = self._sampling_inputs(task, temperature, max_tokens)
+
+        priority = get_rate_limit_priority() 
+
+        def generate (n_requests :int, **n_kwargs) -> Any: 
+            for _ in range(n_requests): 
+                self.acquire_rate_limit(messages, max_tokens=max_tokens, n=n_kwargs.get("n", 1), priority=priority)
+            return self.llm.generate([messages] * n_requests, **n_kwargs, **llm_kwargs)
+
+        # one request for n candidates; a backend returning fewer gets the rest as a batch of single samples 
+        llm_result = self.resilient_caller.call(lambda: generate(1, n=n_candidates))
+        chatgpt_sayings = [generation.text for generation in llm_result.generations[0]]
+        n_missing = n_candidates - len(chatgpt_sayings)
+        if (n_missing > 0): 
+            llm_results = self.resilient_caller.call(lambda: generate(n_missing))
+            chatgpt_sayings += [generations[0].text for generations in llm_results.generations]
+        return chatgpt_sayings[:n_candidates]
+
+    async def _asample_candidates (self, task :SolveTask, n_candidates :int, temperature :float, max_tokens :int) -> List[str]: 
+        messages, llm_kwargs = self._sampling_inputs(task, temperature, max_tokens)
+
+        async def agenerate (n_requests :int, **n_kwargs) -> Any: 
+            for _ in range(n_requests): 
+                await self.aacquire_rate_limit(messages, max_tokens=max_tokens, n=n_kwargs.get("n", 1))
+            return await self.llm.agenerate([messages] * n_requests, **n_kwargs, **llm_kwargs)
+
+        llm_result = await self.resilient_caller.acall(lambda: agenerate(1, n=n_candidates))
+        chatgpt_sayings = [generation.text for generation in llm_result.generations[0]]
+        n_missing = n_candidates - len(chatgpt_sayings)
+        if (n_missing > 0): 
+            llm_results = await self.resilient_caller.acall(lambda: agenerate(n_missing))
+            chatgpt_sayings += [generations[0].text for generations in llm_results.generations]
+        return chatgpt_sayings[:n_candidates]
+
+    def _finish_candidates (self, task :SolveTask, chatgpt_sayings :List[str]) -> Tuple[Dict, VerificationResult]: 
+        with self.instrumentation.span(PHASE_PARSE, n_candidates=len(chatgpt_sayings)): 
+            task.solution, result = task.select_candidate(chatgpt_sayings)
+        if (self.cache is not None and result.is_valid): 
+            self.cache.put(task.cache_key, solution_to_cache_value(task.solution, task.exe_context.unbounded_variables))
+        return (task.solution, result)
+
+    def solve_with_candidates (
+            self, 
+            json_statements :List, 
+            n_candidates :int=DEFAULT_N_CANDIDATES, 
+            temperature :float=DEFAULT_SAMPLING_TEMPERATURE, 
+            max_tokens :int=None 
+    ) -> Tuple[Dict, VerificationResult]: 
+        """
+        Sample n_candidates answers (at the given temperature) in one round trip, verify each of them, 
+        and return the first valid one, or else the best ranked one (see SolveTask.select_candidate). 
+        Only a valid answer is cached. 
+        """
+        with self.instrumentation.span(PHASE_SOLVE, n_candidates=n_candidates): 
+            task = self._prepare_task(json_statements, max_tokens=max_tokens)
+            if (task.solution is not None): 
+                return (task.solution, task.verify())
+            return self._finish_candidates(task, self._sample_candidates(task, n_candidates, temperature, max_tokens))
+
+    async def asolve_with_candidates (
+            self, 
+            json_statements :List, 
+            n_candidates :int=DEFAULT_N_CANDIDATES, 
+            temperature :float=DEFAULT_SAMPLING_TEMPERATURE, 
+            max_tokens :int=None 
+    ) -> Tuple[Dict, VerificationResult]: 
+        with self.instrumentation.span(PHASE_SOLVE, n_candidates=n_candidates): 
+            task = self._prepare_task(json_statements, max_tokens=max_tokens)
+            if (task.solution is not None): 
+                return (task.solution, task.verify())
+            return self._finish_candidates(task, await self._asample_candidates(task, n_candidates, temperature, max_tokens))
+
+    def _streaming_parser (self, task :SolveTask) -> Union[StreamingSayingParser, StreamingJSONAnswerParser]: 
+        if (self.answer_format == ANSWER_FORMAT_JSON): 
+            return StreamingJSONAnswerParser(task.exe_context.unbounded_variables)
+        return StreamingSayingParser([str(v) for v in task.exe_context.unbounded_variables])
+
+    def _get_streaming_llm (self, request_inputs :Dict, max_tokens :int=None) -> Runnable: 
+        llm = self.get_llm(max_tokens)
+        return (llm.bind(response_format=request_inputs["response_format"]) if ("response_format" in request_inputs) else llm)
+
+    def stream_json_statements (
+            self, 
+            json_statements :List, 
+            max_tokens :int=None
+    ) -> Iterator[Tuple[str, str]]: 
+        """
+        Yield the (var name, value) answers as the completion streams in. 
+        The generation is cancelled as soon as every unbounded variable has a value. 
+        """
+        task = self._prepare_task(json_statements, max_tokens=max_tokens)
+        if (task.solution is not None): 
+            yield from task.solution.items() 
+            return 
+
+        saying_parser = self._streaming_parser(task)
+        # stream from the chat model itself: closing a chain's stream drains it 
+        request_inputs = self._request_inputs(task.prompt, task.prompt_context)
+        messages = self.prompt_template.invoke(request_inputs).to_messages() 
+        self.acquire_rate_limit(messages, max_tokens=max_tokens)
+        chunks = self._get_streaming_llm(request_inputs, max_tokens).stream(messages)
+        try: 
+            for chunk in chunks: 
+                yield from saying_parser.feed(chunk.content)
+                if (saying_parser.is_complete): 
+                    break 
+            else: 
+                yield from saying_parser.close() 
+        finally: 
+            chunks.close() # stops the generation if it is still running 
+
+        self._accept_solution(task, saying_parser.solution)
+
+    async def astream_json_statements (
+            self, 
+            json_statements :List, 
+            max_tokens :int=None
+    ) -> AsyncIterator[Tuple[str, str]]: 
+        task = self._prepare_task(json_statements, max_tokens=max_tokens)
+        if (task.solution is not None): 
+            for var_name_val in task.solution.items(): 
+                yield var_name_val 
+            return 
 
-        # return 
-        return var_name_2_str_val 
+        saying_parser = self._streaming_parser(task)
+        request_inputs = self._request_inputs(task.prompt, task.prompt_context)
+        messages = (await self.prompt_template.ainvoke(request_inputs)).to_messages() 
+        await self.aacquire_rate_limit(messages, max_tokens=max_tokens)
+        chunks = self._get_streaming_llm(request_inputs, max_tokens).astream(messages)
+        try: 
+            is_stopped = False 
+            async for chunk in chunks: 
+                for var_name_val in saying_parser.feed(chunk.content): 
+                    yield var_name_val 
+                if (saying_parser.is_complete): 
+                    is_stopped = True 
+                    break 
+            if (not is_stopped): 
+                for var_name_val in saying_parser.close(): 
+                    yield var_name_val 
+        finally: 
+            await chunks.aclose() 
+
+        self._accept_solution(task, saying_parser.solution)
+
+    def solve_json_statements_streaming (
+            self, 
+            json_statements :List, 
+            max_tokens :int=None 
+    ) -> Dict: 
+        """
+        Same as solve_json_statements, but the generation stops once every unbounded variable is answered. 
+        """
+        return dict(self.stream_json_statements(json_statements, max_tokens=max_tokens))
+
+    async def asolve_json_statements_streaming (
+            self, 
+            json_statements :List, 
+            max_tokens :int=None 
+    ) -> Dict: 
+        return {
+            var_name: val 
+            async for var_name, val in self.astream_json_statements(json_statements, max_tokens=max_tokens)
+        }
+
+    def _start_repair_loop (self, task :SolveTask, max_attempts :int, max_total_tokens :int) -> RepairLoop: 
+        if (task.prompt is None): # served from the cache; the repair turns still need the original prompts 
+            self._render_task(task)
+        return RepairLoop(task=task, max_attempts=max_attempts, max_total_tokens=max_total_tokens)
+
+    def _finish_repair_loop (self, repair_loop :RepairLoop) -> Tuple[Dict, VerificationResult]: 
+        repair_loop.task.solution = repair_loop.best_solution 
+        if (self.cache is not None and repair_loop.best_result.is_valid): # a known-invalid answer is not served again 
+            self.cache.put(repair_loop.task.cache_key, solution_to_cache_value(repair_loop.best_solution, repair_loop.task.exe_context.unbounded_variables))
+        return (repair_loop.best_solution, repair_loop.best_result)
+
+    def solve_and_repair_json_statements (
+            self, 
+            json_statements :List, 
+            max_attempts :int=DEFAULT_MAX_REPAIR_ATTEMPTS, 
+            max_total_tokens :int=None 
+    ) -> Tuple[Dict, VerificationResult]: 
+        """
+        Generate-verify-repair: while the answer violates some relations, ask the LLM to fix only those. 
+        Stops after max_attempts LLM calls or when the next call would exceed max_total_tokens (estimated), 
+        the first one included (then the answer is empty). 
+        Returns the best answer (fewest violated relations) and its verification result. 
+        """
+        task = self._prepare_task(json_statements)
+        repair_loop = self._start_repair_loop(task, max_attempts, max_total_tokens)
+
+        request_text = "".join(task.request_prompts)
+        if (task.solution is None and repair_loop.fits_budget(request_text)): 
+            repair_loop.accept(self._complete_task(task), request_text=request_text)
+        else: 
+            task.solution = (task.solution or {})
+            repair_loop.accept(None)
+
+        repair_inputs_list = repair_loop.next_repair_inputs() 
+        while (repair_inputs_list is not None): 
+            self.instrumentation.count(COUNTER_RETRIES)
+            chatgpt_sayings = self.answer_repair_llm_chain.batch(repair_inputs_list, config={"max_concurrency": self.max_concurrency})
+            repair_loop.accept("\n".join(chatgpt_sayings), request_text=get_requests_text(repair_inputs_list))
+            repair_inputs_list = repair_loop.next_repair_inputs() 
+
+        return self._finish_repair_loop(repair_loop)
+
+    async def asolve_and_repair_json_statements (
+            self, 
+            json_statements :List, 
+            max_attempts :int=DEFAULT_MAX_REPAIR_ATTEMPTS, 
+            max_total_tokens :int=None 
+    ) -> Tuple[Dict, VerificationResult]: 
+        task = self._prepare_task(json_statements)
+        repair_loop = self._start_repair_loop(task, max_attempts, max_total_tokens)
+
+        request_text = "".join(task.request_prompts)
+        if (task.solution is None and repair_loop.fits_budget(request_text)): 
+            repair_loop.accept(await self._acomplete_task(task), request_text=request_text)
+        else: 
+            task.solution = (task.solution or {})
+            repair_loop.accept(None)
+
+        repair_inputs_list = repair_loop.next_repair_inputs() 
+        while (repair_inputs_list is not None): 
+            self.instrumentation.count(COUNTER_RETRIES)
+            chatgpt_sayings = await self.answer_repair_llm_chain.abatch(repair_inputs_list, config={"max_concurrency": self.max_concurrency})
+            repair_loop.accept("\n".join(chatgpt_sayings), request_text=get_requests_text(repair_inputs_list))
+            repair_inputs_list = repair_loop.next_repair_inputs() 
+
+        return self._finish_repair_loop(repair_loop)
+
+    def _prepare_tasks (self, json_statements_list :List[List], max_tokens :int=None) -> List[Union[SolveTask, Exception]]:
+        tasks = []
+        for json_statements in json_statements_list:
+            try:
+                tasks.append(self._prepare_task(json_statements, max_tokens=max_tokens))
+            except Exception as ex:
+                tasks.append(ex)
+        return tasks
+
+    def _pending_batch_inputs (self, tasks :List[Union[SolveTask, Exception]]) -> List[Dict]: 
+        return [
+            request_inputs 
+            for task in tasks 
+            if (isinstance(task, SolveTask) and task.solution is None)
+            for request_inputs in self._task_inputs(task)
+        ]
+
+    def _merge_batch_results (
+            self, 
+            tasks :List[Union[SolveTask, Exception]],
+            chatgpt_sayings :List[Union[str, Exception]]
+    ) -> List[Union[Dict, Exception]]:
+        results = []
+        sayings = iter(chatgpt_sayings)
+        for task in tasks:
+            if (isinstance(task, Exception)):
+                results.append(task)
+                continue
+
+            if (task.solution is not None): # cached 
+                results.append(task.solution)
+                continue
+
+            task_sayings = [next(sayings) for _ in task.request_prompts]
+            task_exceptions = [saying for saying in task_sayings if (isinstance(saying, Exception))]
+            if (len(task_exceptions) > 0):
+                results.append(task_exceptions[0])
+            else:
+                results.append(self._finish_task(task, "\n".join(task_sayings)))
+        return results
+
+    def solve_many (
+            self, 
+            json_statements_list :List[List],
+            max_concurrency :int=DEFAULT_MAX_CONCURRENCY,
+            max_tokens :int=None
+    ) -> List[Union[Dict, Exception]]:
+        tasks = self._prepare_tasks(json_statements_list, max_tokens=max_tokens)
+        with rate_limit_priority(PRIORITY_BATCH): # the interactive requests go first 
+            chatgpt_sayings = self.get_answer_chain(max_tokens).batch(
+                self._pending_batch_inputs(tasks),
+                config={"max_concurrency": max(1, max_concurrency)},
+                return_exceptions=True
+            )
+        return self._merge_batch_results(tasks, chatgpt_sayings)
+
+    async def asolve_many (
+            self, 
+            json_statements_list :List[List],
+            max_concurrency :int=DEFAULT_MAX_CONCURRENCY,
+            max_tokens :int=None
+    ) -> List[Union[Dict, Exception]]:
+        tasks = self._prepare_tasks(json_statements_list, max_tokens=max_tokens)
+        with rate_limit_priority(PRIORITY_BATCH): 
+            chatgpt_sayings = await self.get_answer_chain(max_tokens).abatch(
+                self._pending_batch_inputs(tasks),
+                config={"max_concurrency": max(1, max_concurrency)},
+                return_exceptions=True
+            )
+        return self._merge_batch_results(tasks, chatgpt_sayings)
+
+    # ----
+    # Packing: several small puzzles per request 
+    # ----
+    def _plan_packed_requests (
+            self, 
+            tasks :List[Union[SolveTask, Exception]], 
+            max_prompt_tokens :int, 
+            max_puzzles_per_pack :int
+    ) -> List[List[SolveTask]]: 
+        pending_tasks = [
+            task for task in tasks 
+            if (isinstance(task, SolveTask) and task.solution is None)
+        ]
+        for task in pending_tasks: 
+            if (len(task.exe_context.unbounded_variables) == 0): # nothing to ask 
+                task.solution = {} 
+        pending_tasks = [task for task in pending_tasks if (task.solution is None)]
+
+        packs = plan_packs(
+            [task.prompt_context for task in pending_tasks], 
+            max_prompt_tokens=max_prompt_tokens, 
+            max_completion_tokens=self.default_max_tokens, 
+            max_puzzles_per_pack=max_puzzles_per_pack
+        )
+        return [[pending_tasks[i_task] for i_task in pack] for pack in packs]
+
+    def _merge_packed_results (
+            self, 
+            tasks :List[Union[SolveTask, Exception]], 
+            packed_tasks :List[List[SolveTask]], 
+            chatgpt_sayings :List[Union[str, Exception]]
+    ) -> List[Union[Dict, Exception]]: 
+        task_id_2_result = {} 
+        for pack, chatgpt_saying in zip(packed_tasks, chatgpt_sayings): 
+            if (isinstance(chatgpt_saying, Exception)): 
+                pack_results = [chatgpt_saying] * len(pack)
+            else: 
+                pack_results = parse_packed_saying(chatgpt_saying, n_puzzles=len(pack))
+
+            for task, result in zip(pack, pack_results): 
+                if (not isinstance(result, Exception)): # verified per puzzle, so a truncated or mixed-up pack answer is not cached 
+                    result = self._accept_solution(task, result)
+                task_id_2_result[id(task)] = result 
+
+        return [
+            (task if isinstance(task, Exception) else task_id_2_result.get(id(task), task.solution))
+            for task in tasks 
+        ]
+
+    def solve_many_packed (
+            self, 
+            json_statements_list :List[List],
+            max_prompt_tokens :int=DEFAULT_MAX_PACK_PROMPT_TOKENS,
+            max_puzzles_per_pack :int=DEFAULT_MAX_PUZZLES_PER_PACK,
+            max_concurrency :int=DEFAULT_MAX_CONCURRENCY
+    ) -> List[Union[Dict, Exception]]:
+        """
+        Like solve_many, but several small puzzles share one request (and one copy of the instructions). 
+        The puzzles are grouped by plan_packs under max_prompt_tokens, and the completion budget of the client. 
+        A puzzle the LLM skipped in its packed answer gets a MissingPackedAnswerError. 
+        The packed prompts are answered in the text format, whatever the answer format of the client. 
+        """
+        tasks = self._prepare_tasks(json_statements_list)
+        packed_tasks = self._plan_packed_requests(tasks, max_prompt_tokens, max_puzzles_per_pack)
+        with rate_limit_priority(PRIORITY_BATCH): 
+            chatgpt_sayings = self.llm_chain.batch(
+                [{"statements": generate_packed_prompt([task.prompt_context for task in pack])} for pack in packed_tasks],
+                config={"max_concurrency": max(1, max_concurrency)},
+                return_exceptions=True
+            )
+        return self._merge_packed_results(tasks, packed_tasks, chatgpt_sayings)
+
+    async def asolve_many_packed (
+            self, 
+            json_statements_list :List[List],
+            max_prompt_tokens :int=DEFAULT_MAX_PACK_PROMPT_TOKENS,
+            max_puzzles_per_pack :int=DEFAULT_MAX_PUZZLES_PER_PACK,
+            max_concurrency :int=DEFAULT_MAX_CONCURRENCY
+    ) -> List[Union[Dict, Exception]]:
+        tasks = self._prepare_tasks(json_statements_list)
+        packed_tasks = self._plan_packed_requests(tasks, max_prompt_tokens, max_puzzles_per_pack)
+        with rate_limit_priority(PRIORITY_BATCH): 
+            chatgpt_sayings = await self.llm_chain.abatch(
+                [{"statements": generate_packed_prompt([task.prompt_context for task in pack])} for pack in packed_tasks],
+                config={"max_concurrency": max(1, max_concurrency)},
+                return_exceptions=True
+            )
+        return self._merge_packed_results(tasks, packed_tasks, chatgpt_sayings)
 
-    
\ No newline at end of file
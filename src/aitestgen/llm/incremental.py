@@ -0,0 +1,185 @@
+import json
+from collections import OrderedDict
+from typing import Any, Dict, List, Tuple
+
+from ..ir.node import Expression, Constant, Variable, Statement, AssignStatement
+from ..ir.interpreter import ExecutionContext, interpret_json_statement
+from ..ir.slicing import slice_execution_context
+from ..ir.simplify import simplify_execution_context
+from ..solver.symbolic import SAT, UNSAT, UnsatisfiableConstraintsError, solve_symbolically
+from .json_2_prompt import generate_prompt_from_execution_context
+from .client import ChatGPTClient, SolveTask
+from ..instrumentation import PHASE_SOLVE, PHASE_RENDER, PHASE_PARSE
+
+import logging
+logging.basicConfig(level=logging.INFO)
+
+# ====
+# Globals
+# ====
+DEFAULT_MAX_COMPONENT_ANSWERS = 1024
+
+# ====
+# Canonical form of a component
+# ====
+def canonicalize_component (component :ExecutionContext) -> Tuple[str, Dict[Variable, str]]:
+    """
+    The component's statements with the variables renamed in first-use order (v0, v1, ...),
+    so that a component keeps its key when an edit elsewhere shifts its variable ids.
+    Returns the canonical key and the variable -> canonical name mapping.
+    """
+    var_2_canonical = {}
+
+    def canonicalize (expr :Expression) -> Any:
+        if (isinstance(expr, Variable)):
+            if (expr not in var_2_canonical):
+                var_2_canonical[expr] = f"v{len(var_2_canonical)}"
+            return ["var", var_2_canonical[expr]]
+        elif (isinstance(expr, Constant)):
+            return expr.value
+        return [expr.operator] + [(canonicalize(opd) if isinstance(opd, Expression) else opd) for opd in expr.operands]
+
+    def canonicalize_statement (stat :Statement) -> List:
+        if (isinstance(stat, AssignStatement)): # the assigned variable is not part of the body
+            return [stat.keyword, canonicalize(stat.variable), canonicalize(stat.expression)]
+        return [stat.keyword] + [canonicalize(content) for content in stat.body]
+
+    canonical_statements = [canonicalize_statement(stat) for stat in component.executed_statements]
+    canonical_unbounded = [canonicalize(var) for var in component.unbounded_variables]
+    return (json.dumps([canonical_statements, canonical_unbounded]), var_2_canonical)
+
+# ====
+# Incremental solver
+# ====
+class IncrementalSolver :
+    """
+    Re-solves an edited puzzle with the least work:
+    the interpretation restarts after the longest unchanged prefix of statements,
+    and only the components (see slice_execution_context) that were not answered before are sent to the LLM.
+    Only the answers that verify are remembered; a wrong answer is asked again on the next solve.
+
+    The components are solved through the client's answer chain, answer format and instrumentation,
+    but not its cache: the remembered component answers take its place.
+
+    An IncrementalSolver follows one puzzle through its edits; it is not meant to be shared between threads.
+    """
+    def __init__ (self, client :ChatGPTClient, max_component_answers :int=DEFAULT_MAX_COMPONENT_ANSWERS):
+        self.client = client
+        self.max_component_answers = max_component_answers
+
+        self.json_statements = []
+        self.exe_contexts = [ExecutionContext()] # the context after the first i statements
+        self.component_answers = OrderedDict() # canonical key -> {canonical name: value}, LRU
+
+        # what the last solve reused
+        self.n_reused_statements = 0
+        self.n_reused_components = 0
+        self.n_queried_components = 0
+
+    def interpret (self, json_statements :List) -> ExecutionContext:
+        n_common = 0
+        for old_stat, new_stat in zip(self.json_statements, json_statements):
+            if (old_stat != new_stat):
+                break
+            n_common += 1
+
+        exe_contexts = self.exe_contexts[:n_common + 1]
+        for json_stat in json_statements[n_common:]:
+            exe_contexts.append(interpret_json_statement(json_obj=json_stat, exe_context=exe_contexts[-1]))
+
+        self.json_statements = list(json_statements)
+        self.exe_contexts = exe_contexts
+        self.n_reused_statements = n_common
+        return exe_contexts[-1]
+
+    def _remember (self, key :str, component :ExecutionContext, var_2_canonical :Dict[Variable, str], component_solution :Dict):
+        self.component_answers[key] = {
+            var_2_canonical[var]: component_solution[str(var)]
+            for var in component.unbounded_variables if (str(var) in component_solution)
+        }
+        self.component_answers.move_to_end(key)
+        while (len(self.component_answers) > self.max_component_answers):
+            self.component_answers.popitem(last=False)
+
+    def _plan (self, json_statements :List) -> Tuple[Dict, List]:
+        """
+        Interpret the puzzle, fill in the remembered (or symbolically solved) component answers,
+        and return them with the components left for the LLM.
+        """
+        exe_context = self.interpret(json_statements)
+
+        solution = {}
+        llm_pending = [] # [(task, key, var_2_canonical)]
+        self.n_reused_components = 0
+        for component in slice_execution_context(exe_context):
+            if (len(component.unbounded_variables) == 0):
+                continue
+
+            key, var_2_canonical = canonicalize_component(component)
+            if (key in self.component_answers):
+                self.component_answers.move_to_end(key)
+                answer = self.component_answers[key]
+                solution.update({
+                    str(var): answer[var_2_canonical[var]]
+                    for var in component.unbounded_variables if (var_2_canonical[var] in answer)
+                })
+                self.n_reused_components += 1
+                continue
+
+            task = SolveTask(exe_context=component, answer_format=self.client.answer_format)
+            if (self.client.simplify):
+                task.prompt_context = simplify_execution_context(component)
+
+            if (self.client.use_symbolic_solver):
+                symbolic_solution = solve_symbolically(component)
+                if (symbolic_solution.status == SAT):
+                    component_solution = symbolic_solution.to_solution()
+                    self._remember(key, component, var_2_canonical, component_solution)
+                    solution.update(component_solution)
+                    continue
+                elif (symbolic_solution.status == UNSAT):
+                    raise UnsatisfiableConstraintsError(symbolic_solution.reason)
+
+            llm_pending.append((task, key, var_2_canonical))
+
+        self.n_queried_components = len(llm_pending)
+        return (solution, llm_pending)
+
+    def _llm_inputs (self, llm_pending :List) -> List[Dict]:
+        with self.client.instrumentation.span(PHASE_RENDER):
+            for task, _, _ in llm_pending:
+                task.prompt = generate_prompt_from_execution_context(task.prompt_context, answer_format=self.client.answer_format)
+        return [self.client._task_inputs(task)[0] for task, _, _ in llm_pending]
+
+    def _finish (self, solution :Dict, llm_pending :List, chatgpt_sayings :List[str]) -> Dict:
+        for (task, key, var_2_canonical), chatgpt_saying in zip(llm_pending, chatgpt_sayings):
+            with self.client.instrumentation.span(PHASE_PARSE):
+                task.solution = task.parse_leniently(chatgpt_saying)
+            if (task.verify().is_valid):
+                self._remember(key, task.exe_context, var_2_canonical, task.solution)
+            solution.update(task.solution)
+        return solution
+
+    def solve (self, json_statements :List) -> Dict:
+        with self.client.instrumentation.span(PHASE_SOLVE):
+            solution, llm_pending = self._plan(json_statements)
+            if (len(llm_pending) == 0):
+                return solution
+
+            chatgpt_sayings = self.client.get_answer_chain().batch(
+                self._llm_inputs(llm_pending),
+                config={"max_concurrency": self.client.max_concurrency}
+            )
+            return self._finish(solution, llm_pending, chatgpt_sayings)
+
+    async def asolve (self, json_statements :List) -> Dict:
+        with self.client.instrumentation.span(PHASE_SOLVE):
+            solution, llm_pending = self._plan(json_statements)
+            if (len(llm_pending) == 0):
+                return solution
+
+            chatgpt_sayings = await self.client.get_answer_chain().abatch(
+                self._llm_inputs(llm_pending),
+                config={"max_concurrency": self.client.max_concurrency}
+            )
+            return self._finish(solution, llm_pending, chatgpt_sayings)
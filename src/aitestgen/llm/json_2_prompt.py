@@ -1,5 +1,6 @@
+import json 
 from typing import List 
-from ..ir.node import Statement
+from ..ir.node import Statement, Variable
 from ..ir.interpreter import ExecutionContext, interpret_json_statement
 
 import logging
@@ -10,6 +11,11 @@ logging.basicConfig(level=logging.INFO)
 # ====
 SYSTEM_MESSAGE = "You are a rational thinker. You will be given a relation system of string variables, and find possible texts for the unknown variables." 
 
+# the formats of the LLM's answer 
+ANSWER_FORMAT_TEXT = "text" # one '<var> = "<value>"' line per variable 
+ANSWER_FORMAT_JSON = "json" # one JSON object, {"<var>": "<value>", ...} (see .structured) 
+ANSWER_FORMATS = [ANSWER_FORMAT_TEXT, ANSWER_FORMAT_JSON]
+
 # ====
 # Json statement execution 
 # ====
@@ -42,41 +48,75 @@ def dump_execution_context_to_sentences (exe_context :ExecutionContext) -> List[
 # Generate LLM prompt from Json statements 
 # ====
 def generate_prompt_from_json_statements (json_statements :List) -> str: 
-    final_prompt = "" 
-
     # "Execute" the json statement 
     exe_context = execute_json_statements(json_statements)
-    assert(isinstance(exe_context, ExecutionContext))
+    return generate_prompt_from_execution_context(exe_context)
+
+# ====
+# Describe the variables and the relations of an execution context 
+# ====
+def generate_system_description (exe_context :ExecutionContext) -> str: 
+    description = "" 
 
-    # if there is no unbound variables, why are we here? 
-    if (len(exe_context.unbounded_variables) == 0): 
-        return f"No task for you since there is no unbounded variables."
-    
-    unbound_vars = exe_context.unbounded_variables
-    
     # the "system" instruction/message 
     all_vars = list(exe_context.store.keys()) 
     all_vars_sent = (
-        'There is only one variable, {}, in the system. '.format(str(all_vars[0]))
-        if (len(all_vars) == 1) 
-        else 'Here are the variables in the system: {}. '.format(', '.join([str(v) for v in all_vars]))
+        '' # e.g., all the assignments were simplified away 
+        if (len(all_vars) == 0) 
+        else (
+            'There is only one variable, {}, in the system. '.format(str(all_vars[0]))
+            if (len(all_vars) == 1) 
+            else 'Here are the variables in the system: {}. '.format(', '.join([str(v) for v in all_vars]))
+        )
     )
 
-    final_prompt += all_vars_sent
+    description += all_vars_sent
 
     # generate sentences from the context 
     exe_context_sents = dump_execution_context_to_sentences(exe_context) 
     exe_context_sents = list(map(lambda s: f"- {s.strip()}", exe_context_sents))
 
-    final_prompt += """
+    description += """
 Here are the relations among the string variables. 
 {}
 """.format("\n".join(exe_context_sents))
 
+    return description 
+
+# ====
+# The answer template 
+# ====
+def generate_answer_template (unbound_vars :List[Variable], answer_format :str=ANSWER_FORMAT_TEXT) -> str: 
+    assert(answer_format in ANSWER_FORMATS), f"Unknown answer format: {answer_format}"
+
+    if (answer_format == ANSWER_FORMAT_JSON): 
+        return json.dumps({str(v): "<answer>" for v in unbound_vars})
+    return '\n'.join(['{} = <answer> '.format(str(v)) for v in unbound_vars])
+
+def generate_answer_instruction (answer_format :str=ANSWER_FORMAT_TEXT) -> str: 
+    if (answer_format == ANSWER_FORMAT_JSON): 
+        return "You must answer with only a JSON object in the following format: "
+    return "You must answer in brief in the following format: "
+
+# ====
+# Generate LLM prompt from an execution context 
+# ====
+def generate_prompt_from_execution_context (exe_context :ExecutionContext, answer_format :str=ANSWER_FORMAT_TEXT) -> str: 
+    final_prompt = "" 
+
+    assert(isinstance(exe_context, ExecutionContext))
+
+    # if there is no unbound variables, why are we here? 
+    if (len(exe_context.unbounded_variables) == 0): 
+        return f"No task for you since there is no unbounded variables."
+    
+    unbound_vars = exe_context.unbounded_variables
+    
+    # the variables and the relations 
+    final_prompt += generate_system_description(exe_context)
+
     # the request passage 
-    answer_template_sent = '\n'.join(
-        ['{} = <answer> '.format(str(v)) for v in unbound_vars]
-    )
+    answer_template_sent = generate_answer_template(unbound_vars, answer_format)
 
     unbound_vars_sent = (
         '' 
@@ -91,15 +131,34 @@ Here are the relations among the string variables.
     final_prompt += f"""
 You must respect the afore given constraints. 
 You must only provide concrete examples as brief answers. 
-You must answer in brief in the following format: 
+{generate_answer_instruction(answer_format)}
 {answer_template_sent}
 
 {unbound_vars_sent}
 """
 
-    # DEBUG 
-    # print(final_prompt)
-
     # return 
     return final_prompt 
 
+
+
+# ====
+# Generate the repair prompt for an answer violating some relations 
+# ====
+def generate_repair_prompt (exe_context :ExecutionContext, violated_statements :List[Statement], answer_format :str=ANSWER_FORMAT_TEXT) -> str: 
+    violated_sents = [f"- {stat.to_natural_language().strip()}" for stat in violated_statements]
+
+    answer_template_sent = generate_answer_template(exe_context.unbounded_variables, answer_format)
+
+    return f"""Your answer violates the following relations. 
+{chr(10).join(violated_sents)}
+
+Fix your answer. {generate_answer_instruction(answer_format)}
+{answer_template_sent}
+"""
+
+# ====
+# Rough token count (about 4 characters per token for English text) 
+# ====
+def estimate_token_count (text :str) -> int: 
+    return (len(text) + 3) // 4 
@@ -0,0 +1,146 @@
+import re
+from typing import Dict, List, Union
+
+from ..ir.interpreter import ExecutionContext
+from .json_2_prompt import generate_system_description, estimate_token_count
+from .saying import parse_llm_saying
+
+import logging
+logging.basicConfig(level=logging.INFO)
+
+# ====
+# Globals
+# ====
+DEFAULT_MAX_PACK_PROMPT_TOKENS = 2048
+DEFAULT_MAX_PUZZLES_PER_PACK = 16
+ANSWER_TOKENS_PER_VARIABLE = 16 # "foo_0 = "www.example.net"" and the line break
+PUZZLE_HEADER_TOKENS = 4
+
+PUZZLE_HEADER_PATTERN = re.compile(r"^\s*\[puzzle (\d+)\]\s*$", flags=re.MULTILINE)
+
+# ====
+# Errors
+# ====
+class MissingPackedAnswerError (Exception):
+    pass
+
+# ====
+# Generate one prompt for several puzzles
+# ====
+def puzzle_header (i_puzzle :int) -> str:
+    return f"[puzzle {i_puzzle}]"
+
+def generate_packed_prompt (exe_contexts :List[ExecutionContext]) -> str:
+    """
+    One prompt for several independent puzzles.
+    Each puzzle is a block under its own "[puzzle k]" header (k from 1), which namespaces its variables,
+    and the answer is requested in the same blocks so that it can be split back per puzzle (see parse_packed_saying).
+    """
+    assert(len(exe_contexts) > 0)
+    for exe_context in exe_contexts:
+        assert(isinstance(exe_context, ExecutionContext))
+        assert(len(exe_context.unbounded_variables) > 0), "Puzzles without unbounded variables should not be packed"
+
+    final_prompt = (
+        f"There are {len(exe_contexts)} independent relation systems below, each under its own [puzzle k] header. "
+        "A variable only belongs to the system of its header, even if another system has a variable of the same name. \n"
+    )
+
+    # the per puzzle variables and relations
+    for i_puzzle, exe_context in enumerate(exe_contexts, start=1):
+        final_prompt += "\n{}\n{}".format(puzzle_header(i_puzzle), generate_system_description(exe_context))
+
+    # the request passage
+    answer_template_sent = '\n'.join([
+        '{}\n{}'.format(
+            puzzle_header(i_puzzle),
+            '\n'.join(['{} = <answer> '.format(str(v)) for v in exe_context.unbounded_variables])
+        )
+        for i_puzzle, exe_context in enumerate(exe_contexts, start=1)
+    ])
+
+    final_prompt += f"""
+You must respect the afore given constraints of each system.
+You must only provide concrete examples as brief answers.
+You must answer every system in brief in the following format, including the [puzzle k] headers:
+{answer_template_sent}
+
+Now, find the possible texts for the unknown string variables of every system.
+"""
+
+    return final_prompt
+
+# ====
+# Split the LLM's answer back per puzzle
+# ====
+def parse_packed_saying (llm_saying :str, n_puzzles :int) -> List[Union[Dict, MissingPackedAnswerError]]:
+    """
+    The answer of every puzzle of a packed prompt, in order.
+    A puzzle whose block is missing from the answer gets a MissingPackedAnswerError instead.
+    """
+    headers = list(PUZZLE_HEADER_PATTERN.finditer(llm_saying))
+
+    i_puzzle_2_section = {}
+    for header, next_header in zip(headers, headers[1:] + [None]):
+        i_puzzle = int(header.group(1))
+        section = llm_saying[header.end():(len(llm_saying) if next_header is None else next_header.start())]
+        # a repeated block extends the previous one
+        i_puzzle_2_section[i_puzzle] = i_puzzle_2_section.get(i_puzzle, "") + "\n" + section
+
+    return [
+        (
+            parse_llm_saying(i_puzzle_2_section[i_puzzle])
+            if (i_puzzle in i_puzzle_2_section)
+            else MissingPackedAnswerError(f"No answer for {puzzle_header(i_puzzle)} of the packed request")
+        )
+        for i_puzzle in range(1, n_puzzles + 1)
+    ]
+
+# ====
+# Size heuristic
+# ====
+def estimate_packed_prompt_tokens (exe_context :ExecutionContext) -> int:
+    """
+    The (estimated) prompt tokens one puzzle adds to a packed prompt: its block and its answer template.
+    """
+    answer_template = '\n'.join(['{} = <answer> '.format(str(v)) for v in exe_context.unbounded_variables])
+    return 2 * PUZZLE_HEADER_TOKENS + estimate_token_count(generate_system_description(exe_context)) + estimate_token_count(answer_template)
+
+def estimate_packed_completion_tokens (exe_context :ExecutionContext) -> int:
+    return PUZZLE_HEADER_TOKENS + ANSWER_TOKENS_PER_VARIABLE * len(exe_context.unbounded_variables)
+
+def plan_packs (
+        exe_contexts :List[ExecutionContext],
+        max_prompt_tokens :int=DEFAULT_MAX_PACK_PROMPT_TOKENS,
+        max_completion_tokens :int=None,
+        max_puzzles_per_pack :int=DEFAULT_MAX_PUZZLES_PER_PACK
+) -> List[List[int]]:
+    """
+    Greedily group the puzzles (by index, in order) into packs
+    whose estimated prompt and completion tokens stay under the budgets.
+    A puzzle exceeding a budget on its own still gets a pack of its own.
+    """
+    assert(max_puzzles_per_pack >= 1)
+
+    packs = []
+    pack, pack_prompt_tokens, pack_completion_tokens = [], 0, 0
+    for i_puzzle, exe_context in enumerate(exe_contexts):
+        prompt_tokens = estimate_packed_prompt_tokens(exe_context)
+        completion_tokens = estimate_packed_completion_tokens(exe_context)
+
+        fits = (
+            len(pack) < max_puzzles_per_pack
+            and pack_prompt_tokens + prompt_tokens <= max_prompt_tokens
+            and (max_completion_tokens is None or pack_completion_tokens + completion_tokens <= max_completion_tokens)
+        )
+        if (len(pack) > 0 and not fits):
+            packs.append(pack)
+            pack, pack_prompt_tokens, pack_completion_tokens = [], 0, 0
+
+        pack.append(i_puzzle)
+        pack_prompt_tokens += prompt_tokens
+        pack_completion_tokens += completion_tokens
+
+    if (len(pack) > 0):
+        packs.append(pack)
+    return packs
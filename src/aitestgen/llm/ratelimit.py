@@ -0,0 +1,318 @@
+import re
+import time
+import asyncio
+import threading
+import contextvars
+from contextlib import contextmanager
+from itertools import count
+from typing import Any, Callable, Dict, Iterator, Mapping, Tuple, Union
+from uuid import UUID
+
+from langchain_core.callbacks import BaseCallbackHandler
+from langchain_core.outputs import LLMResult
+
+import logging
+logging.basicConfig(level=logging.INFO)
+
+# ====
+# Globals
+# ====
+PRIORITY_INTERACTIVE = 0
+PRIORITY_BATCH = 1
+
+DEFAULT_MIN_POLL_SECONDS = 0.01
+DEFAULT_RATE_LIMITED_PAUSE_SECONDS = 1.0
+
+# the lane of the requests made in the current context (thread or asyncio task)
+_priority = contextvars.ContextVar("aitestgen_rate_limit_priority", default=PRIORITY_INTERACTIVE)
+
+@contextmanager
+def rate_limit_priority (priority :int) -> Iterator[None]:
+    """
+    Schedule the LLM requests made in the enclosed block (and in the tasks and threads it starts) in the given lane.
+    """
+    token = _priority.set(priority)
+    try:
+        yield
+    finally:
+        _priority.reset(token)
+
+def get_rate_limit_priority () -> int:
+    return _priority.get()
+
+# ====
+# Token bucket
+# ====
+class TokenBucket :
+    """
+    Holds at most capacity units and refills at refill_per_second. Not thread-safe (see RateLimitScheduler).
+    """
+    def __init__ (self, capacity :float, refill_per_second :float, now :float):
+        assert(capacity > 0 and refill_per_second > 0)
+
+        self.capacity = capacity
+        self.refill_per_second = refill_per_second
+        self.level = capacity
+        self.updated_at = now
+
+    @classmethod
+    def per_minute (cls, limit :float, now :float) -> "TokenBucket":
+        return cls(capacity=limit, refill_per_second=limit / 60.0, now=now)
+
+    def refill (self, now :float):
+        self.level = min(self.capacity, self.level + (now - self.updated_at) * self.refill_per_second)
+        self.updated_at = now
+
+    def time_until (self, amount :float, now :float) -> float:
+        self.refill(now)
+        amount = min(amount, self.capacity) # a request larger than the bucket waits for a full bucket
+        return (0.0 if self.level >= amount else (amount - self.level) / self.refill_per_second)
+
+    def consume (self, amount :float):
+        self.level -= min(amount, self.capacity)
+
+    def set_limit_per_minute (self, limit :float, now :float):
+        self.refill(now)
+        self.capacity = limit
+        self.refill_per_second = limit / 60.0
+        self.level = min(self.level, self.capacity)
+
+    def set_remaining (self, remaining :float, now :float):
+        self.refill(now)
+        self.level = min(self.level, remaining)
+
+# ====
+# Rate-limit headers
+# ====
+_DURATION_PATTERN = re.compile(r"(\d+(?:\.\d+)?)(ms|h|m|s)")
+_DURATION_UNIT_SECONDS = {"h": 3600.0, "m": 60.0, "s": 1.0, "ms": 0.001}
+
+def parse_reset_duration (duration :str) -> Union[float, None]:
+    """
+    The seconds of a reset duration such as "1s", "6m0s" or "20ms".
+    """
+    matches = _DURATION_PATTERN.findall(duration.strip())
+    if (len(matches) == 0):
+        try:
+            return float(duration)
+        except ValueError:
+            return None
+    return sum([float(value) * _DURATION_UNIT_SECONDS[unit] for value, unit in matches])
+
+def _header_number (headers :Mapping[str, str], name :str) -> Union[float, None]:
+    try:
+        return float(headers[name])
+    except (KeyError, TypeError, ValueError):
+        return None
+
+def retry_after_seconds (headers :Mapping[str, str]) -> Union[float, None]:
+    """
+    The wait requested by a rate-limited response: retry-after-ms, retry-after, or the latest rate-limit reset.
+    """
+    headers = {str(name).lower(): value for name, value in headers.items()}
+    retry_after_ms = _header_number(headers, "retry-after-ms")
+    if (retry_after_ms is not None):
+        return retry_after_ms / 1000.0
+    retry_after = _header_number(headers, "retry-after")
+    if (retry_after is not None):
+        return retry_after
+
+    resets = [parse_reset_duration(str(headers[name])) for name in ["x-ratelimit-reset-requests", "x-ratelimit-reset-tokens"] if (name in headers)]
+    resets = [reset for reset in resets if (reset is not None)]
+    return (max(resets) if len(resets) > 0 else None)
+
+# ====
+# Scheduler
+# ====
+class RateLimitScheduler :
+    """
+    Admits the LLM requests within a requests-per-minute and a tokens-per-minute budget (token buckets),
+    serving the interactive lane before the batch lane, and in arrival order within a lane.
+
+    A request costs its estimated prompt tokens plus its max completion tokens, as the providers count them.
+    The limits that are not given are learned from the x-ratelimit-* response headers (see update_from_headers),
+    and a rate-limited (429) response pauses every request until its retry-after (see pause).
+    The scheduler can be shared by threads and event loops: the waiters poll instead of being notified.
+    """
+    def __init__ (
+            self,
+            requests_per_minute :float=None,
+            tokens_per_minute :float=None,
+            min_poll_seconds :float=DEFAULT_MIN_POLL_SECONDS,
+            clock :Callable[[], float]=time.monotonic
+    ):
+        self.clock = clock
+        self.min_poll_seconds = min_poll_seconds
+
+        now = clock()
+        self.request_bucket = (None if requests_per_minute is None else TokenBucket.per_minute(requests_per_minute, now))
+        self.token_bucket = (None if tokens_per_minute is None else TokenBucket.per_minute(tokens_per_minute, now))
+        self.paused_until = now
+
+        self._lock = threading.Lock()
+        self._seq = count()
+        self._pending = {} # (priority, seq) -> tokens
+
+        # stats
+        self.n_granted = 0
+        self.n_delayed = 0
+        self.n_rate_limited = 0
+        self.total_wait_seconds = 0.0
+
+    # ----
+    # Admission
+    # ----
+    def _time_until (self, n_tokens :int, now :float) -> float:
+        wait = max(0.0, self.paused_until - now)
+        if (self.request_bucket is not None):
+            wait = max(wait, self.request_bucket.time_until(1, now))
+        if (self.token_bucket is not None):
+            wait = max(wait, self.token_bucket.time_until(n_tokens, now))
+        return wait
+
+    def _enqueue (self, n_tokens :int, priority :int) -> Tuple[int, int]:
+        ticket = ((get_rate_limit_priority() if priority is None else priority), next(self._seq))
+        with self._lock:
+            self._pending[ticket] = n_tokens
+        return ticket
+
+    def _discard (self, ticket :Tuple[int, int]):
+        with self._lock:
+            self._pending.pop(ticket, None)
+
+    def _try_acquire (self, ticket :Tuple[int, int]) -> float:
+        """
+        Admit the request if it is the first in line and within the budgets,
+        otherwise return how long to wait before trying again.
+        """
+        with self._lock:
+            now = self.clock()
+            head = min(self._pending)
+            wait = self._time_until(self._pending[head], now)
+            if (head != ticket):
+                return max(self.min_poll_seconds, wait)
+            if (wait > 0):
+                return wait
+
+            n_tokens = self._pending.pop(ticket)
+            if (self.request_bucket is not None):
+                self.request_bucket.consume(1)
+            if (self.token_bucket is not None):
+                self.token_bucket.consume(n_tokens)
+            self.n_granted += 1
+            return 0.0
+
+    def _on_delayed (self, wait_seconds :float):
+        with self._lock:
+            self.n_delayed += 1
+            self.total_wait_seconds += wait_seconds
+
+    def acquire (self, n_tokens :int=0, priority :int=None):
+        """
+        Block until the request (of n_tokens, in the lane of priority or else of the context) is admitted.
+        """
+        time_start = self.clock()
+        ticket = self._enqueue(n_tokens, priority)
+        is_delayed = False
+        try:
+            while (True):
+                delay = self._try_acquire(ticket)
+                if (delay <= 0):
+                    break
+                is_delayed = True
+                time.sleep(delay)
+        finally:
+            self._discard(ticket) # a no-op once admitted
+        if (is_delayed):
+            self._on_delayed(self.clock() - time_start)
+
+    async def aacquire (self, n_tokens :int=0, priority :int=None):
+        time_start = self.clock()
+        ticket = self._enqueue(n_tokens, priority)
+        is_delayed = False
+        try:
+            while (True):
+                delay = self._try_acquire(ticket)
+                if (delay <= 0):
+                    break
+                is_delayed = True
+                await asyncio.sleep(delay)
+        finally:
+            self._discard(ticket)
+        if (is_delayed):
+            self._on_delayed(self.clock() - time_start)
+
+    # ----
+    # Adaptation
+    # ----
+    def pause (self, seconds :float):
+        """
+        Hold every request for the given seconds, e.g., after a rate-limited response.
+        """
+        with self._lock:
+            self.n_rate_limited += 1
+            self.paused_until = max(self.paused_until, self.clock() + seconds)
+
+    def update_from_headers (self, headers :Mapping[str, str]):
+        """
+        Follow the limits and the remaining budgets reported by the provider (the OpenAI x-ratelimit-* headers).
+        """
+        headers = {str(name).lower(): value for name, value in headers.items()}
+        with self._lock:
+            now = self.clock()
+            for kind in ["requests", "tokens"]:
+                bucket = (self.request_bucket if kind == "requests" else self.token_bucket)
+                limit = _header_number(headers, f"x-ratelimit-limit-{kind}")
+                if (limit is not None and limit > 0):
+                    if (bucket is None):
+                        bucket = TokenBucket.per_minute(limit, now)
+                        if (kind == "requests"):
+                            self.request_bucket = bucket
+                        else:
+                            self.token_bucket = bucket
+                    elif (bucket.capacity != limit):
+                        bucket.set_limit_per_minute(limit, now)
+
+                remaining = _header_number(headers, f"x-ratelimit-remaining-{kind}")
+                if (bucket is not None and remaining is not None):
+                    bucket.set_remaining(remaining, now)
+
+    def stats (self) -> Dict:
+        with self._lock:
+            return {
+                "granted": self.n_granted,
+                "delayed": self.n_delayed,
+                "rate_limited": self.n_rate_limited,
+                "total_wait_seconds": self.total_wait_seconds,
+                "waiting": len(self._pending),
+                "requests_per_minute": (None if self.request_bucket is None else self.request_bucket.capacity),
+                "tokens_per_minute": (None if self.token_bucket is None else self.token_bucket.capacity)
+            }
+
+# ====
+# Feedback from the responses (as a langchain callback)
+# ====
+class RateLimitCallbackHandler (BaseCallbackHandler):
+    """
+    Feeds the rate-limit headers of every response to the scheduler, and pauses it on the rate-limited responses.
+    The headers are only available if the chat model reports them (ChatOpenAI(include_response_headers=True)).
+    """
+    def __init__ (self, scheduler :RateLimitScheduler):
+        super().__init__()
+        self.scheduler = scheduler
+
+    def on_llm_end (self, response :LLMResult, *, run_id :UUID, **kwargs :Any) -> Any:
+        for generations in response.generations:
+            for generation in generations:
+                response_metadata = getattr(getattr(generation, "message", None), "response_metadata", None) or {}
+                if (response_metadata.get("headers")):
+                    self.scheduler.update_from_headers(response_metadata["headers"])
+
+    def on_llm_error (self, error :BaseException, *, run_id :UUID, **kwargs :Any) -> Any:
+        response = getattr(error, "response", None)
+        if (getattr(error, "status_code", getattr(response, "status_code", None)) != 429):
+            return
+        headers = (getattr(response, "headers", None) or {})
+        self.scheduler.update_from_headers(headers)
+        retry_after = retry_after_seconds(headers)
+        self.scheduler.pause(DEFAULT_RATE_LIMITED_PAUSE_SECONDS if retry_after is None else retry_after)
@@ -0,0 +1,139 @@
+import os
+import hashlib
+import threading
+from typing import Any, Tuple
+
+import httpx
+
+from .client import ChatGPTClient
+
+import logging
+logging.basicConfig(level=logging.INFO)
+
+# ====
+# Globals
+# ====
+DEFAULT_MAX_CONNECTIONS = 32
+DEFAULT_MAX_KEEPALIVE_CONNECTIONS = 16
+DEFAULT_KEEPALIVE_EXPIRY = 60.0 # seconds
+DEFAULT_TIMEOUT = 60.0 # seconds
+
+def hash_api_key (openai_api_key :str) -> str:
+    """
+    The registry keys never hold the API keys themselves.
+    """
+    return hashlib.sha256(openai_api_key.encode("utf-8")).hexdigest()
+
+# ====
+# Client registry
+# ====
+class ClientRegistry :
+    """
+    Hands out one shared ChatGPTClient per (API key hash, model, endpoint, client settings),
+    so that the chains and the keep-alive HTTP connections are reused across calls, sessions and threads.
+
+    All the clients of a registry share one connection pool (httpx.Client) with the given limits,
+    and one async connection pool (httpx.AsyncClient), which should be used from a single event loop.
+    """
+    def __init__ (
+            self,
+            max_connections :int=DEFAULT_MAX_CONNECTIONS,
+            max_keepalive_connections :int=DEFAULT_MAX_KEEPALIVE_CONNECTIONS,
+            keepalive_expiry :float=DEFAULT_KEEPALIVE_EXPIRY,
+            timeout :float=DEFAULT_TIMEOUT
+    ):
+        self.limits = httpx.Limits(
+            max_connections=max_connections,
+            max_keepalive_connections=max_keepalive_connections,
+            keepalive_expiry=keepalive_expiry
+        )
+        self.timeout = timeout
+
+        self._lock = threading.Lock()
+        self._clients = {} # registry key -> ChatGPTClient
+        self._http_client = None
+        self._http_async_client = None
+
+    def _get_http_clients (self) -> Tuple[httpx.Client, httpx.AsyncClient]:
+        if (self._http_client is None):
+            self._http_client = httpx.Client(limits=self.limits, timeout=self.timeout)
+            self._http_async_client = httpx.AsyncClient(limits=self.limits, timeout=self.timeout)
+        return (self._http_client, self._http_async_client)
+
+    def get_client (
+            self,
+            openai_api_key :str=None,
+            model :str='gpt-3.5-turbo',
+            endpoint_url :str=None,
+            **client_kwargs :Any
+    ) -> ChatGPTClient:
+        """
+        The shared client for the given settings, created on first use.
+        client_kwargs are the other ChatGPTClient arguments (e.g., default_max_tokens, cache); they are part of the key.
+        """
+        if (type(openai_api_key) is not str):
+            openai_api_key = os.environ.get('OPENAI_API_KEY')
+        assert(type(openai_api_key) is str)
+
+        registry_key = (hash_api_key(openai_api_key), model, endpoint_url, tuple(sorted(client_kwargs.items())))
+
+        with self._lock:
+            if (registry_key not in self._clients):
+                http_client, http_async_client = self._get_http_clients()
+                self._clients[registry_key] = ChatGPTClient(
+                    openai_api_key=openai_api_key,
+                    model=model,
+                    endpoint_url=endpoint_url,
+                    http_client=http_client,
+                    http_async_client=http_async_client,
+                    **client_kwargs
+                )
+            return self._clients[registry_key]
+
+    def __len__ (self) -> int:
+        with self._lock:
+            return len(self._clients)
+
+    def _drop (self) -> Tuple[httpx.Client, httpx.AsyncClient]:
+        with self._lock:
+            self._clients.clear()
+            http_clients = (self._http_client, self._http_async_client)
+            self._http_client, self._http_async_client = None, None
+            return http_clients
+
+    def close (self):
+        """
+        Drop the clients and close the connection pools.
+        The async pool can only be closed from its event loop (see aclose); otherwise its connections are dropped with it.
+        """
+        http_client, _ = self._drop()
+        if (http_client is not None):
+            http_client.close()
+
+    async def aclose (self):
+        """
+        Drop the clients and close both connection pools, on the event loop of the async pool.
+        """
+        http_client, http_async_client = self._drop()
+        if (http_client is not None):
+            http_client.close()
+            await http_async_client.aclose()
+
+# ====
+# The process-wide registry
+# ====
+_DEFAULT_REGISTRY = None
+_DEFAULT_REGISTRY_LOCK = threading.Lock()
+
+def get_default_registry () -> ClientRegistry:
+    global _DEFAULT_REGISTRY
+    with _DEFAULT_REGISTRY_LOCK:
+        if (_DEFAULT_REGISTRY is None):
+            _DEFAULT_REGISTRY = ClientRegistry()
+        return _DEFAULT_REGISTRY
+
+def get_shared_client (*args, **kwargs) -> ChatGPTClient:
+    """
+    ClientRegistry.get_client of the process-wide registry.
+    """
+    return get_default_registry().get_client(*args, **kwargs)
@@ -0,0 +1,225 @@
+import os
+import json
+import random
+import asyncio
+import hashlib
+import threading
+import time
+from typing import Any, Dict, List, Union
+
+from langchain_core.language_models import BaseChatModel
+from langchain_core.messages import AIMessage, BaseMessage
+from langchain_core.outputs import ChatGeneration, ChatResult
+
+from .client import ChatGPTClient
+
+import logging
+logging.basicConfig(level=logging.INFO)
+
+# ====
+# Errors
+# ====
+class ReplayMissError (KeyError):
+    pass
+
+# ====
+# Recording keys
+# ====
+def get_model_params (llm :BaseChatModel) -> Dict:
+    """
+    The settings of a chat model that shape its completions: its model name and temperature, when it has them.
+    """
+    identifying_params = llm._identifying_params
+    model_params = {
+        "model": identifying_params.get("model_name", identifying_params.get("model")),
+        "temperature": identifying_params.get("temperature")
+    }
+    return {k: v for k, v in model_params.items() if (v is not None)}
+
+def compute_recording_key (messages :List[BaseMessage], model_params :Dict=None, **llm_kwargs) -> str:
+    """
+    The key of a completion: the messages (role and content), the model-level settings (see get_model_params)
+    and the per-call settings (e.g., max_tokens, response_format).
+    """
+    recording_key_obj = {
+        "messages": [[message.type, message.content] for message in messages],
+        "model": ({} if model_params is None else model_params),
+        "settings": {k: v for k, v in sorted(llm_kwargs.items()) if (v is not None)}
+    }
+    return hashlib.sha256(json.dumps(recording_key_obj, sort_keys=True).encode("utf-8")).hexdigest()
+
+# ====
+# On-disk store
+# ====
+class RecordingStore :
+    """
+    An append-only JSONL file of {"key": ..., "completion": ...} records (and the prompt, if store_prompts).
+    The completion is a string, or the list of the strings of a call with several generations (n > 1).
+    The whole store is loaded in memory; the last record of a key wins.
+    """
+    def __init__ (self, path :Union[str, os.PathLike], store_prompts :bool=False):
+        self.path = path
+        self.store_prompts = store_prompts
+
+        self._lock = threading.Lock()
+        self._key_2_completion = {}
+        if (os.path.exists(path)):
+            with open(path, "r") as f:
+                for line in f:
+                    try:
+                        record = json.loads(line)
+                        self._key_2_completion[record["key"]] = record["completion"]
+                    except (json.JSONDecodeError, KeyError): # a torn last line of a killed run
+                        pass
+
+    def get (self, key :str) -> Union[str, List[str], None]:
+        with self._lock:
+            return self._key_2_completion.get(key)
+
+    def put (self, key :str, completion :Union[str, List[str]], prompt :str=None):
+        record = {"key": key, "completion": completion}
+        if (self.store_prompts and prompt is not None):
+            record["prompt"] = prompt
+
+        with self._lock:
+            self._key_2_completion[key] = completion
+            with open(self.path, "a") as f:
+                f.write(json.dumps(record) + "\n")
+
+    def __len__ (self) -> int:
+        with self._lock:
+            return len(self._key_2_completion)
+
+def _dump_messages (messages :List[BaseMessage]) -> str:
+    return "\n".join([f"[{message.type}] {message.content}" for message in messages])
+
+def _to_chat_result (completion :Union[str, List[str]]) -> ChatResult:
+    completions = (completion if isinstance(completion, list) else [completion])
+    return ChatResult(generations=[ChatGeneration(message=AIMessage(content=content)) for content in completions])
+
+def _to_completion (chat_result :ChatResult) -> Union[str, List[str]]:
+    completions = [generation.message.content for generation in chat_result.generations]
+    return (completions[0] if len(completions) == 1 else completions)
+
+# ====
+# Recording
+# ====
+class RecordingChatModel (BaseChatModel):
+    """
+    Forwards every call to llm and records the completion in the store, keyed by the settings of llm too.
+    The result of llm is returned as is, with all its generations and their usage metadata.
+    """
+    llm :BaseChatModel
+    store :Any # RecordingStore
+
+    @property
+    def _llm_type (self) -> str:
+        return "recording"
+
+    def _generate (self, messages :List[BaseMessage], stop :Any=None, run_manager :Any=None, **kwargs) -> ChatResult:
+        chat_result = self.llm._generate(messages, stop=stop, run_manager=run_manager, **kwargs)
+        self.store.put(compute_recording_key(messages, model_params=get_model_params(self.llm), **kwargs), _to_completion(chat_result), prompt=_dump_messages(messages))
+        return chat_result
+
+    async def _agenerate (self, messages :List[BaseMessage], stop :Any=None, run_manager :Any=None, **kwargs) -> ChatResult:
+        chat_result = await self.llm._agenerate(messages, stop=stop, run_manager=run_manager, **kwargs)
+        self.store.put(compute_recording_key(messages, model_params=get_model_params(self.llm), **kwargs), _to_completion(chat_result), prompt=_dump_messages(messages))
+        return chat_result
+
+# ====
+# Replay
+# ====
+class ReplayChatModel (BaseChatModel):
+    """
+    Serves the recorded completions, after latency_seconds plus a jitter in [0, jitter_seconds).
+    The jitter is drawn from the recording key and the seed, so a replay is deterministic.
+    model_params are the settings of the recorded chat model (see get_model_params), which are part of the keys.
+    A prompt that was not recorded is answered by fallback (e.g., aitestgen.llm.stub.StubChatModel) if given,
+    and raises ReplayMissError otherwise.
+    """
+    store :Any # RecordingStore
+    model_params :Dict = {}
+    latency_seconds :float = 0.0
+    jitter_seconds :float = 0.0
+    seed :int = 0
+    fallback :Union[BaseChatModel, None] = None
+    n_hits :int = 0
+    n_misses :int = 0
+
+    @property
+    def _llm_type (self) -> str:
+        return "replay"
+
+    def _lookup (self, messages :List[BaseMessage], **kwargs) -> Dict:
+        key = compute_recording_key(messages, model_params=self.model_params, **kwargs)
+        completion = self.store.get(key)
+        if (completion is None):
+            self.n_misses += 1
+            if (self.fallback is None):
+                raise ReplayMissError(f"No recorded completion for {key}")
+        else:
+            self.n_hits += 1
+
+        delay = self.latency_seconds + self.jitter_seconds * random.Random(f"{self.seed}:{key}").random()
+        return {"completion": completion, "delay": delay}
+
+    def _generate (self, messages :List[BaseMessage], stop :Any=None, run_manager :Any=None, **kwargs) -> ChatResult:
+        replayed = self._lookup(messages, **kwargs)
+        time.sleep(replayed["delay"])
+        if (replayed["completion"] is None):
+            return self.fallback._generate(messages, stop=stop, run_manager=run_manager, **kwargs)
+        return _to_chat_result(replayed["completion"])
+
+    async def _agenerate (self, messages :List[BaseMessage], stop :Any=None, run_manager :Any=None, **kwargs) -> ChatResult:
+        replayed = self._lookup(messages, **kwargs)
+        await asyncio.sleep(replayed["delay"])
+        if (replayed["completion"] is None):
+            return await self.fallback._agenerate(messages, stop=stop, run_manager=run_manager, **kwargs)
+        return _to_chat_result(replayed["completion"])
+
+# ====
+# Clients
+# ====
+class RecordingLLMClient (ChatGPTClient):
+    """
+    A ChatGPTClient (same arguments) that records every completion of its chat model into store_path.
+    """
+    def __init__ (self, store_path :Union[str, os.PathLike], store_prompts :bool=False, **client_kwargs) -> None:
+        super().__init__(**client_kwargs)
+
+        self.store = RecordingStore(store_path, store_prompts=store_prompts)
+        self.llm = RecordingChatModel(llm=self.llm, store=self.store)
+        self.build_llm_chains()
+
+class ReplayLLMClient (ChatGPTClient):
+    """
+    A ChatGPTClient that serves the completions recorded in store_path, without any network access.
+    Use the same client settings (e.g., model, default_max_tokens) as the recording,
+    since they shape the prompts and the cache keys.
+    model_params are the settings of the recorded chat model (see get_model_params);
+    by default, those of the ChatOpenAI model that the client settings build.
+    """
+    def __init__ (
+            self,
+            store_path :Union[str, os.PathLike],
+            latency_seconds :float=0.0,
+            jitter_seconds :float=0.0,
+            seed :int=0,
+            fallback :BaseChatModel=None,
+            model_params :Dict=None,
+            **client_kwargs
+    ) -> None:
+        self.store = RecordingStore(store_path)
+        super().__init__(
+            llm=ReplayChatModel(
+                store=self.store,
+                latency_seconds=latency_seconds,
+                jitter_seconds=jitter_seconds,
+                seed=seed,
+                fallback=fallback
+            ),
+            **client_kwargs
+        )
+        self.llm.model_params = (
+            {"model": self.model, "temperature": self.temperature} if (model_params is None) else model_params
+        )
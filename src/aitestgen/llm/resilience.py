@@ -0,0 +1,290 @@
+import time
+import random
+import asyncio
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED
+from concurrent.futures import wait as wait_futures
+from typing import Any, Awaitable, Callable, Tuple, Union
+
+import openai
+
+from ..instrumentation import Instrumentation, COUNTER_RETRIES
+
+import logging
+logging.basicConfig(level=logging.INFO)
+
+# ====
+# Globals
+# ====
+COUNTER_HEDGES = "hedges"
+COUNTER_DEADLINES = "deadlines_exceeded"
+
+DEFAULT_RETRYABLE_EXCEPTIONS = (
+    TimeoutError, # including DeadlineExceededError
+    ConnectionError,
+    openai.APITimeoutError,
+    openai.APIConnectionError,
+    openai.RateLimitError,
+    openai.InternalServerError
+)
+
+# ====
+# Errors
+# ====
+class DeadlineExceededError (TimeoutError):
+    pass
+
+# ====
+# Policies
+# ====
+class RetryPolicy :
+    """
+    Exponential backoff with full jitter: the n-th retry waits a random time in [0, min(max_backoff, initial_backoff * multiplier^n)).
+    """
+    def __init__ (
+            self,
+            max_attempts :int=3,
+            initial_backoff :float=0.5, # seconds
+            max_backoff :float=8.0, # seconds
+            multiplier :float=2.0,
+            retryable_exceptions :Tuple[type, ...]=DEFAULT_RETRYABLE_EXCEPTIONS
+    ):
+        assert(max_attempts >= 1)
+
+        self.max_attempts = max_attempts
+        self.initial_backoff = initial_backoff
+        self.max_backoff = max_backoff
+        self.multiplier = multiplier
+        self.retryable_exceptions = retryable_exceptions
+
+    def is_retryable (self, ex :BaseException) -> bool:
+        return isinstance(ex, self.retryable_exceptions)
+
+    def backoff (self, i_retry :int, rng :random.Random=random) -> float:
+        return rng.uniform(0, min(self.max_backoff, self.initial_backoff * (self.multiplier ** i_retry)))
+
+    # the policies are part of the client settings, e.g., in the keys of the client registry
+    def _key (self) -> Tuple:
+        return (self.max_attempts, self.initial_backoff, self.max_backoff, self.multiplier, self.retryable_exceptions)
+
+    def __eq__ (self, other :Any) -> bool:
+        return isinstance(other, RetryPolicy) and self._key() == other._key()
+
+    def __hash__ (self) -> int:
+        return hash(self._key())
+
+class HedgePolicy :
+    """
+    Send a duplicate request when the first one is slower than the given percentile of the recent latencies
+    (or than initial_delay until min_samples latencies are known), and take whichever answer comes first.
+    """
+    def __init__ (
+            self,
+            percentile :float=95.0,
+            max_hedges :int=1,
+            initial_delay :float=2.0, # seconds
+            min_delay :float=0.05, # seconds
+            min_samples :int=20,
+            window :int=256
+    ):
+        assert(0 < percentile <= 100 and max_hedges >= 1)
+
+        self.percentile = percentile
+        self.max_hedges = max_hedges
+        self.initial_delay = initial_delay
+        self.min_delay = min_delay
+        self.min_samples = min_samples
+        self.window = window
+
+    def _key (self) -> Tuple:
+        return (self.percentile, self.max_hedges, self.initial_delay, self.min_delay, self.min_samples, self.window)
+
+    def __eq__ (self, other :Any) -> bool:
+        return isinstance(other, HedgePolicy) and self._key() == other._key()
+
+    def __hash__ (self) -> int:
+        return hash(self._key())
+
+# ====
+# Latency tracking
+# ====
+class LatencyTracker :
+    """
+    The latencies of the recent successful calls.
+    """
+    def __init__ (self, window :int=256):
+        self._lock = threading.Lock()
+        self._latencies = deque(maxlen=window)
+
+    def record (self, latency :float):
+        with self._lock:
+            self._latencies.append(latency)
+
+    def percentile (self, percentile :float) -> Union[float, None]:
+        with self._lock:
+            latencies = sorted(self._latencies)
+        if (len(latencies) == 0):
+            return None
+        return latencies[min(len(latencies) - 1, int(len(latencies) * percentile / 100.0))]
+
+    def __len__ (self) -> int:
+        with self._lock:
+            return len(self._latencies)
+
+# ====
+# Resilient calls
+# ====
+class ResilientCaller :
+    """
+    Runs a call with a per-attempt deadline (timeout, in seconds), optional hedging, and retries of the retryable errors.
+    A timed-out or lost hedged sync call cannot be interrupted: its thread finishes in the background and its result is dropped.
+    """
+    def __init__ (
+            self,
+            timeout :float=None,
+            retry_policy :RetryPolicy=None,
+            hedge_policy :HedgePolicy=None,
+            instrumentation :Instrumentation=None,
+            seed :int=None
+    ):
+        self.timeout = timeout
+        self.retry_policy = retry_policy
+        self.hedge_policy = hedge_policy
+        self.instrumentation = (Instrumentation() if instrumentation is None else instrumentation)
+
+        self.latency_tracker = LatencyTracker(window=(256 if hedge_policy is None else hedge_policy.window))
+        self._rng = random.Random(seed)
+        self._executor = None
+        self._executor_lock = threading.Lock()
+
+    @property
+    def is_trivial (self) -> bool:
+        return (self.timeout is None and self.retry_policy is None and self.hedge_policy is None)
+
+    def hedge_delay (self) -> float:
+        if (len(self.latency_tracker) < self.hedge_policy.min_samples):
+            return self.hedge_policy.initial_delay
+        return max(self.hedge_policy.min_delay, self.latency_tracker.percentile(self.hedge_policy.percentile))
+
+    def _next_wait (self, elapsed :float, n_hedges :int) -> Tuple[Union[float, None], bool]:
+        """
+        How long to wait for the in-flight requests, and whether a hedge is due at the end of the wait.
+        """
+        remaining = (None if self.timeout is None else self.timeout - elapsed)
+        if (self.hedge_policy is None or n_hedges >= self.hedge_policy.max_hedges):
+            return (remaining, False)
+
+        until_hedge = max(0.0, self.hedge_delay() * (n_hedges + 1) - elapsed)
+        if (remaining is not None and remaining <= until_hedge):
+            return (remaining, False)
+        return (until_hedge, True)
+
+    def _on_attempt_failed (self, ex :BaseException, i_attempt :int) -> float:
+        """
+        Re-raise ex if it is final, otherwise return the backoff before the next attempt.
+        """
+        if (self.retry_policy is None or i_attempt + 1 >= self.retry_policy.max_attempts or not self.retry_policy.is_retryable(ex)):
+            raise ex
+        self.instrumentation.count(COUNTER_RETRIES, error=type(ex).__name__)
+        return self.retry_policy.backoff(i_attempt, self._rng)
+
+    # ----
+    # Sync
+    # ----
+    def _get_executor (self) -> ThreadPoolExecutor:
+        with self._executor_lock:
+            if (self._executor is None):
+                self._executor = ThreadPoolExecutor(thread_name_prefix="aitestgen-resilient")
+            return self._executor
+
+    def _attempt (self, fn :Callable[[], Any]) -> Any:
+        time_start = time.perf_counter()
+        if (self.timeout is None and self.hedge_policy is None):
+            result = fn()
+            self.latency_tracker.record(time.perf_counter() - time_start)
+            return result
+
+        executor = self._get_executor()
+        futures = [executor.submit(fn)]
+        n_hedges = 0
+        try:
+            while (True):
+                wait_time, is_hedge_due = self._next_wait(time.perf_counter() - time_start, n_hedges)
+                if (wait_time is not None and wait_time <= 0 and not is_hedge_due):
+                    self.instrumentation.count(COUNTER_DEADLINES)
+                    raise DeadlineExceededError(f"No answer within {self.timeout} seconds")
+
+                done, _ = wait_futures(futures, timeout=wait_time, return_when=FIRST_COMPLETED)
+                for future in done:
+                    if (future.exception() is None):
+                        self.latency_tracker.record(time.perf_counter() - time_start)
+                        return future.result()
+
+                futures = [future for future in futures if (not future.done())]
+                if (len(futures) == 0):
+                    raise list(done)[0].exception()
+
+                if (len(done) == 0 and is_hedge_due):
+                    self.instrumentation.count(COUNTER_HEDGES)
+                    futures.append(executor.submit(fn))
+                    n_hedges += 1
+        finally:
+            for future in futures:
+                future.cancel()
+
+    def call (self, fn :Callable[[], Any]) -> Any:
+        if (self.is_trivial):
+            return fn()
+
+        i_attempt = 0
+        while (True):
+            try:
+                return self._attempt(fn)
+            except Exception as ex:
+                time.sleep(self._on_attempt_failed(ex, i_attempt))
+                i_attempt += 1
+
+    # ----
+    # Async
+    # ----
+    async def _aattempt (self, make_coro :Callable[[], Awaitable]) -> Any:
+        time_start = time.perf_counter()
+        tasks = [asyncio.ensure_future(make_coro())]
+        n_hedges = 0
+        try:
+            while (True):
+                wait_time, is_hedge_due = self._next_wait(time.perf_counter() - time_start, n_hedges)
+                if (wait_time is not None and wait_time <= 0 and not is_hedge_due):
+                    self.instrumentation.count(COUNTER_DEADLINES)
+                    raise DeadlineExceededError(f"No answer within {self.timeout} seconds")
+
+                done, _ = await asyncio.wait(tasks, timeout=wait_time, return_when=asyncio.FIRST_COMPLETED)
+                for task in done:
+                    if (task.exception() is None):
+                        self.latency_tracker.record(time.perf_counter() - time_start)
+                        return task.result()
+
+                tasks = [task for task in tasks if (not task.done())]
+                if (len(tasks) == 0):
+                    raise list(done)[0].exception()
+
+                if (len(done) == 0 and is_hedge_due):
+                    self.instrumentation.count(COUNTER_HEDGES)
+                    tasks.append(asyncio.ensure_future(make_coro()))
+                    n_hedges += 1
+        finally:
+            for task in tasks:
+                task.cancel() # the losers (and the timed-out requests) are cancelled
+
+    async def acall (self, make_coro :Callable[[], Awaitable]) -> Any:
+        if (self.is_trivial):
+            return await make_coro()
+
+        i_attempt = 0
+        while (True):
+            try:
+                return await self._aattempt(make_coro)
+            except Exception as ex:
+                await asyncio.sleep(self._on_attempt_failed(ex, i_attempt))
+                i_attempt += 1
@@ -0,0 +1,69 @@
+from typing import Dict, List, Tuple, Union
+
+import logging
+logging.basicConfig(level=logging.INFO)
+
+# ====
+# Parse the LLM's answer
+# ====
+def parse_llm_saying_line (saying :str) -> Union[Tuple[str, str], None]:
+    i = saying.find('=')
+    if (i > 0):
+        var_name = saying[0:i].strip()
+        val = saying[i+1:].strip().strip('"')
+        return (var_name, val)
+    return None
+
+def parse_llm_saying (llm_saying :str) -> Dict:
+    saying_lines = llm_saying.split('\n')
+    saying_lines = list(map(lambda x: x.strip(), saying_lines))
+    saying_lines = list(filter(lambda x: len(x) > 0, saying_lines))
+
+    var_name_2_str_val = {}
+    for saying in saying_lines:
+        var_name_val = parse_llm_saying_line(saying)
+        if (var_name_val is not None):
+            var_name, val = var_name_val
+            var_name_2_str_val[var_name] = val
+
+    return var_name_2_str_val
+
+class StreamingSayingParser :
+    """
+    Incremental parse_llm_saying: feed the chunks of a streamed answer and get the (var name, value) pairs as soon as their lines end.
+    The last value is held back until its line break or the end of the stream (see close),
+    since a quote ending a chunk may be followed by more of the value.
+    """
+    def __init__ (self, expected_var_names :List[str]):
+        self.expected_var_names = set(expected_var_names)
+        self.solution = {}
+        self._line = ""
+
+    @property
+    def is_complete (self) -> bool:
+        return self.expected_var_names.issubset(self.solution.keys())
+
+    def _parse_line (self, line :str) -> List[Tuple[str, str]]:
+        var_name_val = parse_llm_saying_line(line.strip())
+        if (var_name_val is None):
+            return []
+        self.solution[var_name_val[0]] = var_name_val[1]
+        return [var_name_val]
+
+    def feed (self, chunk :str) -> List[Tuple[str, str]]:
+        answered = []
+
+        lines = (self._line + chunk).split('\n')
+        for line in lines[:-1]:
+            answered += self._parse_line(line)
+        self._line = lines[-1]
+
+        return answered
+
+    def close (self) -> List[Tuple[str, str]]:
+        answered = self._parse_line(self._line)
+        self._line = ""
+        return answered
+
+def dump_solution_to_saying (solution :Dict) -> str: 
+    return "\n".join([f'{var_name} = "{val}"' for var_name, val in solution.items()])
@@ -0,0 +1,127 @@
+import json
+from typing import Any, Dict, List, Tuple
+
+from ..ir.node import Variable
+
+import logging
+logging.basicConfig(level=logging.INFO)
+
+# ====
+# Globals
+# ====
+RESPONSE_FORMAT_NAME = "answer"
+
+# ====
+# Errors
+# ====
+class AnswerFormatError (Exception):
+    pass
+
+# ====
+# The JSON schema of an answer
+# ====
+def build_answer_schema (unbounded_variables :List[Variable]) -> Dict:
+    """
+    An object with exactly one string per unbounded variable (as the strict structured outputs require).
+    """
+    return {
+        "type": "object",
+        "properties": {str(v): {"type": "string"} for v in unbounded_variables},
+        "required": [str(v) for v in unbounded_variables],
+        "additionalProperties": False
+    }
+
+def build_response_format (unbounded_variables :List[Variable]) -> Dict:
+    """
+    The response_format of an OpenAI chat completion request constrained to the answer schema.
+    """
+    return {
+        "type": "json_schema",
+        "json_schema": {
+            "name": RESPONSE_FORMAT_NAME,
+            "strict": True,
+            "schema": build_answer_schema(unbounded_variables)
+        }
+    }
+
+# ====
+# Parse the LLM's JSON answer
+# ====
+_decoder = json.JSONDecoder()
+
+def _answer_value (val :Any) -> str:
+    return (val if isinstance(val, str) else json.dumps(val))
+
+def parse_json_answer (llm_saying :str, unbounded_variables :List[Variable]) -> Dict[Variable, str]:
+    """
+    The values of the unbounded variables in the JSON object(s) of the answer, in one pass over the text.
+    The text around the objects (e.g., code fences) is skipped, the objects of a sliced puzzle's answers are merged,
+    and the keys that are not unbounded variables are ignored.
+    Raises AnswerFormatError if the answer holds no JSON object.
+    """
+    var_name_2_var = {str(v): v for v in unbounded_variables}
+
+    solution = {}
+    is_found = False
+    i = llm_saying.find('{')
+    while (i >= 0):
+        try:
+            obj, end = _decoder.raw_decode(llm_saying, i)
+        except ValueError:
+            i = llm_saying.find('{', i + 1)
+            continue
+
+        if (isinstance(obj, dict)):
+            is_found = True
+            for var_name, val in obj.items():
+                if (var_name in var_name_2_var and val is not None):
+                    solution[var_name_2_var[var_name]] = _answer_value(val)
+        i = llm_saying.find('{', end)
+
+    if (not is_found):
+        raise AnswerFormatError(f"No JSON object in the answer: {llm_saying[:80]!r}")
+    return solution
+
+def dump_solution_to_json_answer (solution :Dict) -> str:
+    return json.dumps({str(var): val for var, val in solution.items()})
+
+class StreamingJSONAnswerParser :
+    """
+    The JSON counterpart of StreamingSayingParser: the answers are only complete with their object,
+    so they are all returned at once, as soon as the object closes with every expected variable.
+    """
+    def __init__ (self, unbounded_variables :List[Variable]):
+        self.unbounded_variables = unbounded_variables
+        self.solution = {}
+        self._saying = ""
+        self._is_parsed = False
+
+    @property
+    def is_complete (self) -> bool:
+        return self._is_parsed
+
+    def _parse (self) -> List[Tuple[str, str]]:
+        try:
+            solution = parse_json_answer(self._saying, self.unbounded_variables)
+        except AnswerFormatError:
+            return []
+        self.solution = {str(var): val for var, val in solution.items()}
+        return list(self.solution.items())
+
+    def feed (self, chunk :str) -> List[Tuple[str, str]]:
+        self._saying += chunk
+        if (self._is_parsed or '}' not in chunk):
+            return []
+
+        answered = self._parse()
+        if (len(answered) < len(self.unbounded_variables)): # an unclosed object, or a partial answer so far
+            self.solution = {}
+            return []
+        self._is_parsed = True
+        return answered
+
+    def close (self) -> List[Tuple[str, str]]:
+        if (self._is_parsed):
+            return []
+        self._is_parsed = True
+        return self._parse()
@@ -0,0 +1,90 @@
+import re
+import json
+import time
+import asyncio
+from typing import Any, AsyncIterator, Iterator, List
+
+from langchain_core.language_models import BaseChatModel
+from langchain_core.messages import AIMessage, AIMessageChunk, BaseMessage
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
+
+from .json_2_prompt import estimate_token_count
+
+import logging
+logging.basicConfig(level=logging.INFO)
+
+# ====
+# Globals
+# ====
+ANSWER_TEMPLATE_PATTERN = re.compile(r"^(\[puzzle \d+\](?=\n\S+ = <answer>)|\S+ = <answer>)", flags=re.MULTILINE)
+
+# ====
+# Offline chat model
+# ====
+class StubChatModel (BaseChatModel):
+    """
+    An offline stand-in for the OpenAI chat model, for benchmarks and tests.
+
+    Answers every "<var> = <answer>" line of the prompt's answer template with the same value
+    (keeping the "[puzzle k]" headers of packed prompts), or every variable of the response_format's schema
+    with a JSON object, after latency_seconds,
+    plus latency_per_chunk_seconds per streamed chunk of chunk_size characters.
+    """
+    answer :str = "www.example.net"
+    latency_seconds :float = 0.0
+    latency_per_chunk_seconds :float = 0.0
+    chunk_size :int = 4
+    n_calls :int = 0
+
+    @property
+    def _llm_type (self) -> str:
+        return "stub"
+
+    def _say (self, messages :List[BaseMessage], **kwargs) -> str:
+        self.n_calls += 1
+        response_format = kwargs.get("response_format")
+        if (response_format is not None): # a JSON answer with the properties of the schema
+            return json.dumps({var_name: self.answer for var_name in response_format["json_schema"]["schema"]["properties"]})
+
+        template_lines = ANSWER_TEMPLATE_PATTERN.findall(messages[-1].content)
+        return "\n".join([
+            (line if line.startswith("[puzzle") else '{} = "{}"'.format(line.split(" = ")[0], self.answer))
+            for line in template_lines
+        ])
+
+    def _chunks (self, saying :str) -> List[str]:
+        return [saying[i:i+self.chunk_size] for i in range(0, len(saying), self.chunk_size)]
+
+    def _to_chat_result (self, messages :List[BaseMessage], saying :str) -> ChatResult:
+        # the token usage, as reported by the OpenAI chat models
+        input_tokens = sum([estimate_token_count(str(message.content)) for message in messages])
+        output_tokens = estimate_token_count(saying)
+        message = AIMessage(
+            content=saying,
+            usage_metadata={"input_tokens": input_tokens, "output_tokens": output_tokens, "total_tokens": input_tokens + output_tokens}
+        )
+        return ChatResult(generations=[ChatGeneration(message=message)])
+
+    def _generate (self, messages :List[BaseMessage], stop :Any=None, run_manager :Any=None, **kwargs) -> ChatResult:
+        saying = self._say(messages, **kwargs)
+        time.sleep(self.latency_seconds + self.latency_per_chunk_seconds * len(self._chunks(saying)))
+        return self._to_chat_result(messages, saying)
+
+    async def _agenerate (self, messages :List[BaseMessage], stop :Any=None, run_manager :Any=None, **kwargs) -> ChatResult:
+        saying = self._say(messages, **kwargs)
+        await asyncio.sleep(self.latency_seconds + self.latency_per_chunk_seconds * len(self._chunks(saying)))
+        return self._to_chat_result(messages, saying)
+
+    def _stream (self, messages :List[BaseMessage], stop :Any=None, run_manager :Any=None, **kwargs) -> Iterator[ChatGenerationChunk]:
+        saying = self._say(messages, **kwargs)
+        time.sleep(self.latency_seconds)
+        for chunk in self._chunks(saying):
+            time.sleep(self.latency_per_chunk_seconds)
+            yield ChatGenerationChunk(message=AIMessageChunk(content=chunk))
+
+    async def _astream (self, messages :List[BaseMessage], stop :Any=None, run_manager :Any=None, **kwargs) -> AsyncIterator[ChatGenerationChunk]:
+        saying = self._say(messages, **kwargs)
+        await asyncio.sleep(self.latency_seconds)
+        for chunk in self._chunks(saying):
+            await asyncio.sleep(self.latency_per_chunk_seconds)
+            yield ChatGenerationChunk(message=AIMessageChunk(content=chunk))
@@ -0,0 +1,421 @@
+import json
+import asyncio
+import hashlib
+from http import HTTPStatus
+from typing import Any, Awaitable, Callable, Dict, List, Tuple, Union
+
+from .llm.client import ChatGPTClient, DEFAULT_MAX_CONCURRENCY
+from .llm.json_2_prompt import execute_json_statements
+from .llm.registry import ClientRegistry
+from .solver.symbolic import UnsatisfiableConstraintsError
+from .instrumentation import StatsInstrument
+
+import logging
+logging.basicConfig(level=logging.INFO)
+
+# ====
+# Globals
+# ====
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8080
+DEFAULT_MAX_QUEUE_SIZE = 256
+DEFAULT_MAX_BODY_BYTES = 8 * 1024 * 1024
+RETRY_AFTER_SECONDS = 1
+
+# ====
+# Errors
+# ====
+class ServiceOverloadedError (Exception):
+    pass
+
+class InvalidPuzzleError (ValueError):
+    pass
+
+def check_puzzle (json_statements :List):
+    """
+    Raise InvalidPuzzleError if the puzzle cannot be interpreted; the errors of a valid puzzle's solve are not the caller's.
+    """
+    try:
+        execute_json_statements(json_statements)
+    except Exception as ex:
+        raise InvalidPuzzleError(f"Invalid puzzle: {ex!r}") from ex
+
+# ====
+# Singleflight
+# ====
+class SingleFlight :
+    """
+    Coalesces the concurrent calls with the same key: the first call runs, the others wait for its result.
+    A key is forgotten as soon as its call finishes, so nothing is cached.
+    """
+    def __init__ (self):
+        self._key_2_future = {}
+        self.n_coalesced = 0
+
+    def __len__ (self) -> int:
+        return len(self._key_2_future)
+
+    def __contains__ (self, key :str) -> bool:
+        return (key in self._key_2_future)
+
+    def join (self, key :str, make_coro :Callable[[], Awaitable]) -> asyncio.Future:
+        """
+        The future of the call with the key, started now (synchronously) unless one is in flight.
+        """
+        future = self._key_2_future.get(key)
+        if (future is not None):
+            self.n_coalesced += 1
+        else:
+            future = asyncio.ensure_future(make_coro())
+            self._key_2_future[key] = future
+            future.add_done_callback(lambda _: self._key_2_future.pop(key, None))
+        return future
+
+    async def do (self, key :str, make_coro :Callable[[], Awaitable]) -> Any:
+        # a cancelled waiter must not cancel the call the others wait for
+        return await asyncio.shield(self.join(key, make_coro))
+
+def compute_request_key (json_statements :List, max_tokens :int=None) -> str:
+    """
+    Only the identical puzzles are coalesced: alpha-equivalent ones name their variables differently.
+    """
+    key_material = json.dumps({"statements": json_statements, "max_tokens": max_tokens}, sort_keys=True, separators=(',', ':'))
+    return hashlib.sha256(key_material.encode("utf-8")).hexdigest()
+
+# ====
+# Solve service
+# ====
+class SolveService :
+    """
+    Solves the puzzles with max_concurrency workers that take them from a queue of at most max_queue_size puzzles.
+    A puzzle that does not fit in the queue is rejected (ServiceOverloadedError) instead of waiting,
+    and the identical puzzles in flight share one solve.
+    The aggregates of stats_instrument (the one the client reports to, if any) are part of the stats.
+    """
+    def __init__ (
+            self,
+            client :ChatGPTClient,
+            max_concurrency :int=DEFAULT_MAX_CONCURRENCY,
+            max_queue_size :int=DEFAULT_MAX_QUEUE_SIZE,
+            stats_instrument :StatsInstrument=None
+    ):
+        assert(max_concurrency >= 1 and max_queue_size >= 1)
+
+        self.client = client
+        self.max_concurrency = max_concurrency
+        self.max_queue_size = max_queue_size
+        self.stats_instrument = stats_instrument
+
+        self.single_flight = SingleFlight()
+        self._queue = None
+        self._workers = []
+        self.n_rejected = 0
+
+    @property
+    def queue_size (self) -> int:
+        return (0 if self._queue is None else self._queue.qsize())
+
+    def start (self):
+        """
+        Start the workers (on the running event loop).
+        """
+        if (self._queue is None):
+            self._queue = asyncio.Queue(maxsize=self.max_queue_size)
+            self._workers = [asyncio.create_task(self._work()) for _ in range(self.max_concurrency)]
+
+    async def close (self):
+        for worker in self._workers:
+            worker.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        self._workers = []
+
+        # fail the puzzles still waiting
+        while (self._queue is not None and not self._queue.empty()):
+            _, _, future = self._queue.get_nowait()
+            if (not future.done()):
+                future.set_exception(ServiceOverloadedError("The service is shutting down"))
+        self._queue = None
+
+    async def _work (self):
+        while (True):
+            json_statements, max_tokens, future = await self._queue.get()
+            try:
+                if (not future.done()): # the waiters may be gone
+                    solution = await self.client.asolve_json_statements(json_statements, max_tokens=max_tokens)
+                    if (not future.done()):
+                        future.set_result(solution)
+            except asyncio.CancelledError:
+                if (not future.done()):
+                    future.cancel()
+                raise
+            except Exception as ex:
+                if (not future.done()):
+                    future.set_exception(ex)
+            finally:
+                self._queue.task_done()
+
+    def _enqueue (self, json_statements :List, max_tokens :int) -> asyncio.Future:
+        future = asyncio.get_running_loop().create_future()
+        try:
+            self._queue.put_nowait((json_statements, max_tokens, future))
+        except asyncio.QueueFull:
+            self.n_rejected += 1
+            raise ServiceOverloadedError(f"The queue is full ({self.max_queue_size} puzzles)")
+        return future
+
+    def _admit (self, json_statements :List, max_tokens :int) -> asyncio.Future:
+        key = compute_request_key(json_statements, max_tokens)
+        return self.single_flight.join(key, lambda: self._enqueue(json_statements, max_tokens))
+
+    async def solve (self, json_statements :List, max_tokens :int=None) -> Dict:
+        self.start()
+        check_puzzle(json_statements)
+        return await asyncio.shield(self._admit(json_statements, max_tokens))
+
+    async def solve_many (self, json_statements_list :List[List], max_tokens :int=None) -> List[Union[Dict, Exception]]:
+        """
+        All or nothing admission: the batch is rejected unless its new (valid) puzzles all fit in the queue.
+        The results are in the order of the puzzles, an Exception for each failed one.
+        """
+        self.start()
+        checked = []
+        for json_statements in json_statements_list:
+            try:
+                check_puzzle(json_statements)
+                checked.append(None)
+            except InvalidPuzzleError as ex:
+                checked.append(ex)
+
+        new_keys = {
+            compute_request_key(json_statements, max_tokens)
+            for json_statements, error in zip(json_statements_list, checked) if (error is None)
+        }
+        new_keys = [key for key in new_keys if (key not in self.single_flight)]
+        if (len(new_keys) > self.max_queue_size - self._queue.qsize()):
+            self.n_rejected += 1
+            raise ServiceOverloadedError(f"No room for {len(new_keys)} puzzles in the queue")
+
+        # enqueued before yielding to the event loop, so no other request takes the room in between
+        futures = [
+            (self._admit(json_statements, max_tokens) if (error is None) else None)
+            for json_statements, error in zip(json_statements_list, checked)
+        ]
+        results = await asyncio.gather(*[asyncio.shield(future) for future in futures if (future is not None)], return_exceptions=True)
+        results = iter(results)
+        return [(next(results) if (future is not None) else error) for future, error in zip(futures, checked)]
+
+    def stats (self) -> Dict:
+        stats = {
+            "queue_size": self.queue_size,
+            "max_queue_size": self.max_queue_size,
+            "in_flight": len(self.single_flight),
+            "coalesced": self.single_flight.n_coalesced,
+            "rejected": self.n_rejected
+        }
+        if (self.stats_instrument is not None):
+            stats["instrumentation"] = self.stats_instrument.snapshot()
+        return stats
+
+# ====
+# HTTP
+# ====
+class _HTTPError (Exception):
+    def __init__ (self, status :HTTPStatus, message :str):
+        super().__init__(message)
+        self.status = status
+
+def error_to_status (ex :BaseException) -> HTTPStatus:
+    if (isinstance(ex, ServiceOverloadedError)):
+        return HTTPStatus.SERVICE_UNAVAILABLE
+    elif (isinstance(ex, UnsatisfiableConstraintsError)):
+        return HTTPStatus.UNPROCESSABLE_ENTITY
+    elif (isinstance(ex, InvalidPuzzleError)):
+        return HTTPStatus.BAD_REQUEST
+    elif (isinstance(ex, TimeoutError)):
+        return HTTPStatus.GATEWAY_TIMEOUT
+    return HTTPStatus.BAD_GATEWAY # the LLM call failed
+
+def error_to_json (ex :BaseException) -> Dict:
+    return {"error": (str(ex) or type(ex).__name__), "type": type(ex).__name__}
+
+class SolveServer :
+    """
+    A minimal HTTP/1.1 JSON API over a SolveService (keep-alive, no chunked request bodies):
+        GET  /healthz     -> {"status": "ok", ...queue stats, "instrumentation": {...}}
+        POST /solve       {"statements": [...], "max_tokens": 256} -> {"solution": {...}}
+        POST /solve_many  {"puzzles": [[...], ...], "max_tokens": 256} -> {"results": [{"solution": {...}} or {"error": ...}, ...]}
+    An overloaded service answers 503 with a Retry-After header.
+    The connection pools of registry (the one the service's clients come from, if any) are closed with the server.
+    """
+    def __init__ (self, service :SolveService, max_body_bytes :int=DEFAULT_MAX_BODY_BYTES, registry :ClientRegistry=None):
+        self.service = service
+        self.max_body_bytes = max_body_bytes
+        self.registry = registry
+        self._server = None
+
+        self.routes = {
+            ("GET", "/healthz"): self.handle_healthz,
+            ("POST", "/solve"): self.handle_solve,
+            ("POST", "/solve_many"): self.handle_solve_many
+        }
+
+    # ----
+    # Handlers
+    # ----
+    async def handle_healthz (self, body :Any) -> Dict:
+        return {"status": "ok", **self.service.stats()}
+
+    @staticmethod
+    def _max_tokens (body :Dict) -> Union[int, None]:
+        max_tokens = body.get("max_tokens")
+        if (max_tokens is not None and (type(max_tokens) is not int or max_tokens <= 0)):
+            raise _HTTPError(HTTPStatus.BAD_REQUEST, "max_tokens must be a positive integer")
+        return max_tokens
+
+    async def handle_solve (self, body :Any) -> Dict:
+        if (not isinstance(body, dict) or not isinstance(body.get("statements"), list)):
+            raise _HTTPError(HTTPStatus.BAD_REQUEST, 'Expected {"statements": [...]}')
+        return {"solution": await self.service.solve(body["statements"], max_tokens=self._max_tokens(body))}
+
+    async def handle_solve_many (self, body :Any) -> Dict:
+        if (not isinstance(body, dict) or not isinstance(body.get("puzzles"), list) or not all([isinstance(puzzle, list) for puzzle in body["puzzles"]])):
+            raise _HTTPError(HTTPStatus.BAD_REQUEST, 'Expected {"puzzles": [[...], ...]}')
+        results = await self.service.solve_many(body["puzzles"], max_tokens=self._max_tokens(body))
+        return {"results": [
+            (error_to_json(result) if isinstance(result, Exception) else {"solution": result})
+            for result in results
+        ]}
+
+    # ----
+    # Protocol
+    # ----
+    async def _read_request (self, reader :asyncio.StreamReader) -> Union[Tuple[str, str, Dict[str, str], bytes], None]:
+        request_line = await reader.readline()
+        if (not request_line):
+            return None
+        try:
+            method, target, _ = request_line.decode("latin-1").split(" ", 2)
+        except ValueError:
+            raise _HTTPError(HTTPStatus.BAD_REQUEST, "Malformed request line")
+
+        headers = {}
+        while (True):
+            line = await reader.readline()
+            if (line in [b"\r\n", b"\n", b""]):
+                break
+            name, _, value = line.decode("latin-1").partition(":")
+            headers[name.strip().lower()] = value.strip()
+
+        if ("chunked" in headers.get("transfer-encoding", "").lower()):
+            raise _HTTPError(HTTPStatus.NOT_IMPLEMENTED, "Chunked request bodies are not supported")
+        try:
+            content_length = int(headers.get("content-length", "0"))
+        except ValueError:
+            raise _HTTPError(HTTPStatus.BAD_REQUEST, "Invalid Content-Length")
+        if (content_length > self.max_body_bytes):
+            raise _HTTPError(HTTPStatus.REQUEST_ENTITY_TOO_LARGE, f"The body exceeds {self.max_body_bytes} bytes")
+
+        body = (await reader.readexactly(content_length) if content_length > 0 else b"")
+        return (method.upper(), target.split("?", 1)[0], headers, body)
+
+    async def _respond (self, method :str, path :str, body :bytes) -> Tuple[HTTPStatus, Dict]:
+        handler = self.routes.get((method, path))
+        if (handler is None):
+            if (any([route_path == path for _, route_path in self.routes])):
+                return (HTTPStatus.METHOD_NOT_ALLOWED, {"error": f"{method} is not allowed on {path}"})
+            return (HTTPStatus.NOT_FOUND, {"error": f"No such endpoint: {path}"})
+
+        try:
+            json_body = (json.loads(body) if len(body) > 0 else None)
+        except (json.JSONDecodeError, UnicodeDecodeError) as ex:
+            return (HTTPStatus.BAD_REQUEST, {"error": f"Invalid JSON: {ex}"})
+
+        try:
+            return (HTTPStatus.OK, await handler(json_body))
+        except _HTTPError as ex:
+            return (ex.status, {"error": str(ex)})
+        except Exception as ex:
+            return (error_to_status(ex), error_to_json(ex))
+
+    @staticmethod
+    def _encode_response (status :HTTPStatus, payload :Dict, keep_alive :bool) -> bytes:
+        body = json.dumps(payload).encode("utf-8")
+        headers = [
+            f"HTTP/1.1 {status.value} {status.phrase}",
+            "Content-Type: application/json",
+            f"Content-Length: {len(body)}",
+            f"Connection: {'keep-alive' if keep_alive else 'close'}"
+        ]
+        if (status == HTTPStatus.SERVICE_UNAVAILABLE):
+            headers.append(f"Retry-After: {RETRY_AFTER_SECONDS}")
+        return ("\r\n".join(headers) + "\r\n\r\n").encode("latin-1") + body
+
+    async def handle_connection (self, reader :asyncio.StreamReader, writer :asyncio.StreamWriter):
+        try:
+            while (True):
+                try:
+                    request = await self._read_request(reader)
+                except _HTTPError as ex:
+                    writer.write(self._encode_response(ex.status, {"error": str(ex)}, keep_alive=False))
+                    await writer.drain()
+                    break
+                if (request is None): # the client closed the connection
+                    break
+
+                method, path, headers, body = request
+                keep_alive = (headers.get("connection", "").lower() != "close")
+                status, payload = await self._respond(method, path, body)
+                writer.write(self._encode_response(status, payload, keep_alive))
+                await writer.drain()
+                if (not keep_alive):
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+    # ----
+    # Lifecycle
+    # ----
+    async def start (self, host :str=DEFAULT_HOST, port :int=DEFAULT_PORT) -> Tuple[str, int]:
+        """
+        Start listening (port 0 picks a free port) and return the bound address.
+        """
+        self.service.start()
+        self._server = await asyncio.start_server(self.handle_connection, host=host, port=port)
+        return self._server.sockets[0].getsockname()[:2]
+
+    async def close (self):
+        if (self._server is not None):
+            self._server.close()
+            await self._server.wait_closed()
+            self._server = None
+        await self.service.close()
+        if (self.registry is not None):
+            await self.registry.aclose()
+
+    async def serve_forever (self, host :str=DEFAULT_HOST, port :int=DEFAULT_PORT):
+        bound_host, bound_port = await self.start(host=host, port=port)
+        logging.info(f"aitestgen serving on http://{bound_host}:{bound_port}")
+        try:
+            await self._server.serve_forever()
+        finally:
+            await self.close()
+
+def run_server (
+        client :ChatGPTClient,
+        host :str=DEFAULT_HOST,
+        port :int=DEFAULT_PORT,
+        max_concurrency :int=DEFAULT_MAX_CONCURRENCY,
+        max_queue_size :int=DEFAULT_MAX_QUEUE_SIZE,
+        stats_instrument :StatsInstrument=None,
+        registry :ClientRegistry=None
+):
+    server = SolveServer(
+        SolveService(client, max_concurrency=max_concurrency, max_queue_size=max_queue_size, stats_instrument=stats_instrument),
+        registry=registry
+    )
+    try:
+        asyncio.run(server.serve_forever(host=host, port=port))
+    except KeyboardInterrupt:
+        pass
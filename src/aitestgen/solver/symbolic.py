@@ -0,0 +1,321 @@
+from itertools import count, product
+from typing import Any, Dict, Iterator, List
+
+from ..ir.node import Expression, Constant, Variable
+from ..ir.node import StringOperation, UnaryExpression, BinaryExpression
+from ..ir.node import AssertStatement
+from ..ir.interpreter import ExecutionContext
+from ..ir.evaluator import CompiledPuzzle, UnsatisfiableConstraintsError
+from ..ir.slicing import UnionFind
+
+import logging
+logging.basicConfig(level=logging.INFO)
+
+# ====
+# Globals
+# ====
+SAT = "sat"
+UNSAT = "unsat"
+UNKNOWN = "unknown"
+
+MAX_FILLER_ATTEMPTS = 256
+
+# ====
+# Errors
+# ====
+class _Unsupported (Exception):
+    """
+    The puzzle is outside of the fragment handled by the symbolic solver.
+    """
+    pass
+
+class _Unsatisfiable (Exception):
+    pass
+
+# ====
+# Result
+# ====
+class SymbolicSolution :
+    def __init__ (self, status :str, model :Dict[Variable, Any]=None, reason :str=None):
+        assert(status in [SAT, UNSAT, UNKNOWN])
+
+        self.status = status
+        self.model = model
+        self.reason = reason
+
+    def to_solution (self) -> Dict[str, Any]:
+        """
+        The model in the shape returned by the LLM clients (variable name -> value).
+        """
+        assert(self.status == SAT)
+        return {str(var): val for var, val in self.model.items()}
+
+    def __repr__ (self) -> str:
+        return f"SymbolicSolution(status={self.status}, reason={self.reason})"
+
+# ====
+# Terms: a value is either a constant or an unbounded variable
+# ====
+class _Term :
+    def __init__ (self, var :Variable=None, value :Any=None):
+        self.var = var
+        self.value = value
+
+    @property
+    def is_const (self) -> bool:
+        return self.var is None
+
+# ====
+# Per equivalence class constraints
+# ====
+class _VariableClass :
+    def __init__ (self):
+        self.const = None
+        self.has_const = False
+        self.prefixes = []
+        self.suffixes = []
+        self.neg_prefixes = []
+        self.neg_suffixes = []
+        self.neg_consts = []
+
+    def set_const (self, value :str):
+        if (self.has_const and self.const != value):
+            raise _Unsatisfiable(f"Conflicting values: {self.const!r} vs {value!r}")
+        self.const = value
+        self.has_const = True
+
+def _longest_compatible (affixes :List[str], is_prefix :bool) -> str:
+    longest = max(affixes, key=len, default="")
+    for affix in affixes:
+        if (not (longest.startswith(affix) if is_prefix else longest.endswith(affix))):
+            raise _Unsatisfiable(f"Incompatible {'prefixes' if is_prefix else 'suffixes'}: {affix!r} vs {longest!r}")
+    return longest
+
+def _filler_strings () -> Iterator[str]:
+    alphabet = "abcdefghijklmnopqrstuvwxyz"
+    yield ""
+    for length in count(1):
+        for chars in product(alphabet, repeat=length):
+            yield "".join(chars)
+
+# ====
+# The solver
+# ====
+class SymbolicSolver :
+    """
+    Solves the fragment made of equalities, startsWith and endsWith (possibly negated) over variables, copies and constants.
+
+    Equalities are merged with union-find; each class gets the longest of its prefixes and suffixes,
+    and the negated constraints are handled by inserting a filler between the prefix and the suffix.
+    Every SAT model is double-checked with the concrete evaluator.
+    """
+    def __init__ (self, exe_context :ExecutionContext):
+        self.exe_context = exe_context
+        self.unbounded_variables = list(exe_context.unbounded_variables)
+
+        self._assigned_terms = {} # assigned Variable -> _Term
+        self._union_find = UnionFind()
+        self._classes = {} # root Variable -> _VariableClass
+        self._neg_equalities = [] # [(Variable, Variable)]
+        self._pending = [] # [(kind, Variable, Variable or constant)]
+
+    # ----
+    # Resolution of expressions to terms
+    # ----
+    def _resolve (self, expr :Expression) -> _Term:
+        if (isinstance(expr, Constant)):
+            return _Term(value=expr.value)
+
+        elif (isinstance(expr, Variable)):
+            if (expr in self._assigned_terms):
+                return self._assigned_terms[expr]
+            if (expr in self.exe_context.store):
+                term = self._resolve(self.exe_context.store[expr])
+                self._assigned_terms[expr] = term
+                return term
+            return _Term(var=expr)
+
+        elif (isinstance(expr, StringOperation) and expr.operator == "subStr"):
+            opds = [self._resolve(opd) for opd in expr.operands]
+            if (all([opd.is_const for opd in opds])):
+                try:
+                    return _Term(value=StringOperation.operators["subStr"](*[opd.value for opd in opds]))
+                except Exception:
+                    raise _Unsupported(f"Ill-typed subStr: {expr}")
+
+        raise _Unsupported(f"Unsupported term: {expr}")
+
+    def _class_of (self, var :Variable) -> _VariableClass:
+        root = self._union_find.find(var)
+        if (root not in self._classes):
+            self._classes[root] = _VariableClass()
+        return self._classes[root]
+
+    # ----
+    # Collection of the constraints
+    # ----
+    def _collect_literal (self, expr :Expression, polarity :bool):
+        if (isinstance(expr, UnaryExpression) and expr.operator == "not"):
+            self._collect_literal(expr.operands[0], not polarity)
+
+        elif (isinstance(expr, Constant)):
+            if (type(expr.value) is not bool):
+                raise _Unsupported(f"Non-boolean assertion: {expr}")
+            if (expr.value != polarity):
+                raise _Unsatisfiable(f"Assertion of a false constant: {expr}")
+
+        elif (isinstance(expr, BinaryExpression) and expr.operator == "=="):
+            lhs, rhs = self._resolve(expr.operands[0]), self._resolve(expr.operands[1])
+            if (lhs.is_const and rhs.is_const):
+                if ((lhs.value == rhs.value) != polarity):
+                    raise _Unsatisfiable(f"False constant equality: {expr}")
+            elif (lhs.is_const or rhs.is_const):
+                var, value = ((rhs.var, lhs.value) if lhs.is_const else (lhs.var, rhs.value))
+                if (type(value) is not str):
+                    raise _Unsupported(f"Equality with a non-string constant: {expr}")
+                self._pending.append(("eq_const" if polarity else "neq_const", var, value))
+            else:
+                self._pending.append(("eq" if polarity else "neq", lhs.var, rhs.var))
+
+        elif (isinstance(expr, StringOperation) and expr.operator in ["startsWith", "endsWith"]):
+            subject, affix = self._resolve(expr.operands[0]), self._resolve(expr.operands[1])
+            if (not affix.is_const or type(affix.value) is not str):
+                raise _Unsupported(f"Non-constant affix: {expr}")
+            if (subject.is_const):
+                try:
+                    holds = StringOperation.operators[expr.operator](subject.value, affix.value)
+                except Exception:
+                    raise _Unsatisfiable(f"Ill-typed assertion: {expr}")
+                if (holds != polarity):
+                    raise _Unsatisfiable(f"False constant assertion: {expr}")
+            else:
+                kind = ("prefix" if expr.operator == "startsWith" else "suffix")
+                self._pending.append((kind if polarity else f"neg_{kind}", subject.var, affix.value))
+
+        else:
+            raise _Unsupported(f"Unsupported assertion: {expr}")
+
+    def _collect (self):
+        for stat in self.exe_context.executed_statements:
+            if (isinstance(stat, AssertStatement)):
+                self._collect_literal(stat.bool_expression, True)
+
+        # equalities first, so that the classes are final before attaching the other constraints
+        for kind, x, y in self._pending:
+            if (kind == "eq"):
+                self._union_find.union(x, y)
+
+        for kind, var, arg in self._pending:
+            if (kind == "eq"):
+                continue
+            elif (kind == "neq"):
+                self._neg_equalities.append((var, arg))
+                continue
+
+            var_class = self._class_of(var)
+            if (kind == "eq_const"):
+                var_class.set_const(arg)
+            elif (kind == "neq_const"):
+                var_class.neg_consts.append(arg)
+            elif (kind == "prefix"):
+                var_class.prefixes.append(arg)
+            elif (kind == "suffix"):
+                var_class.suffixes.append(arg)
+            elif (kind == "neg_prefix"):
+                var_class.neg_prefixes.append(arg)
+            elif (kind == "neg_suffix"):
+                var_class.neg_suffixes.append(arg)
+            else:
+                assert(False), f"Unknown constraint kind: {kind}"
+
+    # ----
+    # Value construction
+    # ----
+    def _satisfies_negations (self, var_class :_VariableClass, value :str, excluded_values :List[str]) -> bool:
+        return not (
+            any([value.startswith(neg_prefix) for neg_prefix in var_class.neg_prefixes])
+            or any([value.endswith(neg_suffix) for neg_suffix in var_class.neg_suffixes])
+            or (value in var_class.neg_consts)
+            or (value in excluded_values)
+        )
+
+    def _build_value (self, var_class :_VariableClass, excluded_values :List[str]) -> str:
+        prefix = _longest_compatible(var_class.prefixes, is_prefix=True)
+        suffix = _longest_compatible(var_class.suffixes, is_prefix=False)
+
+        if (var_class.has_const):
+            value = var_class.const
+            if (not (value.startswith(prefix) and value.endswith(suffix))):
+                raise _Unsatisfiable(f"{value!r} does not fit the prefix {prefix!r} and the suffix {suffix!r}")
+            if (not self._satisfies_negations(var_class, value, [])):
+                raise _Unsatisfiable(f"{value!r} violates a negated constraint")
+            if (value in excluded_values):
+                raise _Unsatisfiable(f"{value!r} must differ from an equal constant")
+            return value
+
+        # every value starts with the prefix and ends with the suffix
+        for neg_prefix in var_class.neg_prefixes:
+            if (prefix.startswith(neg_prefix)):
+                raise _Unsatisfiable(f"Prefix {prefix!r} contradicts the negated prefix {neg_prefix!r}")
+        for neg_suffix in var_class.neg_suffixes:
+            if (suffix.endswith(neg_suffix)):
+                raise _Unsatisfiable(f"Suffix {suffix!r} contradicts the negated suffix {neg_suffix!r}")
+
+        # the shortest candidates overlap the prefix and the suffix, then fillers are inserted in between
+        candidates = [
+            prefix + suffix[overlap:]
+            for overlap in range(min(len(prefix), len(suffix)), -1, -1)
+            if (prefix.endswith(suffix[:overlap]))
+        ]
+        for candidate in candidates:
+            if (self._satisfies_negations(var_class, candidate, excluded_values)):
+                return candidate
+
+        for filler, _ in zip(_filler_strings(), range(MAX_FILLER_ATTEMPTS)):
+            candidate = prefix + filler + suffix
+            if (self._satisfies_negations(var_class, candidate, excluded_values)):
+                return candidate
+
+        raise _Unsupported("No filler satisfies the negated constraints")
+
+    def _build_model (self) -> Dict[Variable, Any]:
+        for x, y in self._neg_equalities:
+            if (self._union_find.find(x) == self._union_find.find(y)):
+                raise _Unsatisfiable(f"{x} must both equal and differ from {y}")
+
+        root_2_value = {}
+        roots = []
+        for var in self.unbounded_variables:
+            root = self._union_find.find(var)
+            if (root not in roots):
+                roots.append(root)
+
+        # constant classes first: their values are forced
+        roots.sort(key=lambda root: (0 if self._class_of(root).has_const else 1))
+        for root in roots:
+            excluded_values = []
+            for x, y in self._neg_equalities:
+                for this, other in [(x, y), (y, x)]:
+                    other_root = self._union_find.find(other)
+                    if (self._union_find.find(this) == root and other_root in root_2_value):
+                        excluded_values.append(root_2_value[other_root])
+            root_2_value[root] = self._build_value(self._class_of(root), excluded_values)
+
+        return {var: root_2_value[self._union_find.find(var)] for var in self.unbounded_variables}
+
+    def solve (self) -> SymbolicSolution:
+        try:
+            self._collect()
+            model = self._build_model()
+        except _Unsatisfiable as ex:
+            return SymbolicSolution(status=UNSAT, reason=str(ex))
+        except _Unsupported as ex:
+            return SymbolicSolution(status=UNKNOWN, reason=str(ex))
+
+        result = CompiledPuzzle(self.exe_context).verify(model)
+        if (not result.is_valid):
+            return SymbolicSolution(status=UNKNOWN, reason=f"The model violates {len(result.violated)} relation(s)")
+        return SymbolicSolution(status=SAT, model=model)
+
+def solve_symbolically (exe_context :ExecutionContext) -> SymbolicSolution:
+    return SymbolicSolver(exe_context).solve()
@@ -3,11 +3,18 @@ import json
 import traceback 
 import pandas 
 
-from aitestgen.llm.client import ChatGPTClient 
+from aitestgen.llm.registry import ClientRegistry 
+from aitestgen.llm.resilience import RetryPolicy, DeadlineExceededError 
+from aitestgen.llm.incremental import IncrementalSolver 
 
 import logging
 logging.basicConfig(level=logging.INFO)
 
+# The clients (and their HTTP connection pools) are shared by all the sessions 
+@st.cache_resource
+def get_client_registry () -> ClientRegistry: 
+    return ClientRegistry() 
+
 # Display the title 
 st.title('AI Test Generation -- Demo')
 
@@ -47,17 +54,28 @@ if (go_generating):
         error_message = 'No OpenAI API Key provided...'
     
     else: 
-        gpt_client = ChatGPTClient(
-            openai_api_key=openai_api_key
+        gpt_client = get_client_registry().get_client(
+            openai_api_key=openai_api_key, 
+            timeout=30.0, 
+            retry_policy=RetryPolicy(max_attempts=3)
         )
 
+        # the session's solver only re-solves the statements and components changed since the last click 
+        incremental_solver = st.session_state.get("incremental_solver")
+        if (incremental_solver is None or incremental_solver.client is not gpt_client): 
+            incremental_solver = IncrementalSolver(gpt_client)
+            st.session_state["incremental_solver"] = incremental_solver
+
         try: 
-            gpt_solutions = gpt_client.solve_json_statements(json_statements=json_statements) 
+            gpt_solutions = incremental_solver.solve(json_statements) 
             st.session_state["solution"] = gpt_solutions
 
+        except DeadlineExceededError as ex: 
+            error_message = f"GPT did not answer in time, please try again... {ex}"
+
         except Exception as ex: 
             traceback.print_exc()
-            error_message = "Unexpected error occurred while calling GPT... {ex}"
+            error_message = f"Unexpected error occurred while calling GPT... {ex}"
         
 # display the error message 
 if (error_message is not None): 
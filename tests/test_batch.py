@@ -0,0 +1,157 @@
+import os 
+import json 
+import tempfile 
+from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from aitestgen import batch 
+from aitestgen.batch import run_batch 
+from aitestgen.cli import build_arg_parser 
+from aitestgen.llm.client import ChatGPTClient 
+from aitestgen.llm.json_2_prompt import ANSWER_FORMAT_JSON 
+
+from utils import EchoChatModel
+
+import logging
+logging.basicConfig(level=logging.INFO)
+
+PUZZLES = [
+    {"id": "p0", "statements": [["assert", ["startsWith", ["var", "abc"], "www"]]]}, 
+    [["assert", ["endsWith", ["var", "xyz"], ".net"]]], 
+    {"id": "p2", "statements": [["assert"]]}, 
+    {"id": "p3", "statements": [["assert", ["startsWith", ["var", "abc"], "www"]], ["assert", ["startsWith", ["var", "abc"], "ftp"]]]} 
+]
+
+def read_jsonl (path): 
+    with open(path, "r") as f: 
+        return [json.loads(line) for line in f]
+
+# ====
+# Tests for run_batch 
+# ====
+def test_run_batch_0 (): 
+    with tempfile.TemporaryDirectory() as tmp_dir: 
+        input_path = os.path.join(tmp_dir, "puzzles.jsonl")
+        output_path = os.path.join(tmp_dir, "solutions.jsonl")
+        with open(input_path, "w") as f: 
+            f.write("\n".join([json.dumps(puzzle) for puzzle in PUZZLES]))
+
+        llm = EchoChatModel() 
+        summary = run_batch(client=ChatGPTClient(llm=llm), input_path=input_path, output_path=output_path, max_concurrency=2, n_processes=2, use_symbolic_solver=True)
+        assert(summary.to_dict() == {"solved": 2, "failed": 2, "skipped": 0})
+        assert(llm.n_calls == 0) # the symbolic solver solved everything 
+
+        results = {result["id"]: result for result in read_jsonl(output_path)}
+        assert(results["p0"]["solution"] == {"abc_0": "www"})
+        assert(results["line:1"]["solution"] == {"xyz_0": ".net"})
+        assert("error" in results["p2"] and "error" in results["p3"])
+
+        # the resumed run skips all the completed puzzles 
+        summary = run_batch(client=ChatGPTClient(llm=llm), input_path=input_path, output_path=output_path)
+        assert(summary.to_dict() == {"solved": 0, "failed": 0, "skipped": 4})
+        assert(len(read_jsonl(output_path)) == 4)
+
+def test_run_batch_1 (): 
+    with tempfile.TemporaryDirectory() as tmp_dir: 
+        input_path = os.path.join(tmp_dir, "puzzles.jsonl")
+        output_path = os.path.join(tmp_dir, "solutions.jsonl")
+        with open(input_path, "w") as f: 
+            f.write("\n".join([json.dumps(puzzle) for puzzle in PUZZLES[:2]]))
+        with open(output_path + ".ckpt", "w") as f: 
+            f.write(json.dumps({"id": "p0"}) + "\n")
+
+        llm = EchoChatModel() 
+        summary = run_batch(client=ChatGPTClient(llm=llm), input_path=input_path, output_path=output_path, n_processes=1)
+        assert(summary.to_dict() == {"solved": 1, "failed": 0, "skipped": 1})
+        assert(llm.n_calls == 1)
+        assert(read_jsonl(output_path) == [{"id": "line:1", "solution": {"xyz_0": "www.example.net"}}])
+
+def test_run_batch_2 (): 
+    with tempfile.TemporaryDirectory() as tmp_dir: 
+        input_path = os.path.join(tmp_dir, "puzzles.jsonl")
+        output_path = os.path.join(tmp_dir, "solutions.jsonl")
+        with open(input_path, "w") as f: 
+            f.write("\n".join([json.dumps(puzzle) for puzzle in PUZZLES]))
+
+        llm = EchoChatModel() 
+        summary = run_batch(client=ChatGPTClient(llm=llm), input_path=input_path, output_path=output_path, n_processes=1, simplify=True)
+        assert(summary.to_dict() == {"solved": 2, "failed": 2, "skipped": 0})
+        assert(llm.n_calls == 2) # the unsatisfiable puzzle never reached the LLM 
+
+        results = {result["id"]: result for result in read_jsonl(output_path)}
+        assert(results["p3"]["error"].startswith("Unsatisfiable"))
+
+def test_run_batch_invalid_lines (): 
+    with tempfile.TemporaryDirectory() as tmp_dir: 
+        input_path = os.path.join(tmp_dir, "puzzles.jsonl")
+        output_path = os.path.join(tmp_dir, "solutions.jsonl")
+        with open(input_path, "w") as f: 
+            f.write("\n".join([
+                json.dumps({"id": "2", "statements": PUZZLES[0]["statements"]}), 
+                "{not json", 
+                json.dumps({"id": "p2"}), 
+                json.dumps(PUZZLES[1]) # an unlabeled line 3, not the puzzle "2" 
+            ]))
+
+        llm = EchoChatModel() 
+        summary = run_batch(client=ChatGPTClient(llm=llm), input_path=input_path, output_path=output_path, n_processes=1)
+        assert(summary.to_dict() == {"solved": 2, "failed": 2, "skipped": 0})
+
+        results = {result["id"]: result for result in read_jsonl(output_path)}
+        assert(sorted(results.keys()) == ["2", "line:1", "line:3", "p2"])
+        assert(results["line:1"]["error"].startswith("Invalid puzzle") and results["p2"]["error"].startswith("Invalid puzzle"))
+        assert("solution" in results["2"] and "solution" in results["line:3"])
+
+def test_run_batch_verified (): 
+    with tempfile.TemporaryDirectory() as tmp_dir: 
+        input_path = os.path.join(tmp_dir, "puzzles.jsonl")
+        output_path = os.path.join(tmp_dir, "solutions.jsonl")
+        with open(input_path, "w") as f: 
+            f.write("\n".join([json.dumps(puzzle) for puzzle in PUZZLES[:2]]))
+
+        # the answers are parsed in the client's format and verified: a wrong one is retried on resume 
+        llm = EchoChatModel(answer="ftp.example.net")
+        client = ChatGPTClient(llm=llm, answer_format=ANSWER_FORMAT_JSON)
+        summary = run_batch(client=client, input_path=input_path, output_path=output_path, n_processes=1)
+        assert(summary.to_dict() == {"solved": 1, "failed": 1, "skipped": 0})
+        results = {result["id"]: result for result in read_jsonl(output_path)}
+        assert(results["line:1"]["solution"] == {"xyz_0": "ftp.example.net"})
+        assert(results["p0"]["error"].startswith("Unverified answer"))
+
+        summary = run_batch(client=client, input_path=input_path, output_path=output_path, n_processes=1)
+        assert(summary.to_dict() == {"solved": 0, "failed": 1, "skipped": 1})
+        assert(llm.n_calls == 3)
+
+class BrokenPool (ThreadPoolExecutor): 
+    """
+    A process pool whose workers died. 
+    """
+    def __init__ (self, max_workers=None): 
+        super().__init__(max_workers=1)
+
+    def submit (self, *args, **kwargs): 
+        raise BrokenProcessPool("A process in the process pool was terminated abruptly")
+
+def test_run_batch_broken_pool (monkeypatch): 
+    with tempfile.TemporaryDirectory() as tmp_dir: 
+        input_path = os.path.join(tmp_dir, "puzzles.jsonl")
+        output_path = os.path.join(tmp_dir, "solutions.jsonl")
+        with open(input_path, "w") as f: 
+            f.write("\n".join([json.dumps(puzzle) for puzzle in PUZZLES[:2]]))
+
+        # the failures of the pool are not the puzzles' and are retried on resume 
+        with monkeypatch.context() as patch: 
+            patch.setattr(batch, "ProcessPoolExecutor", BrokenPool)
+            summary = run_batch(client=ChatGPTClient(llm=EchoChatModel()), input_path=input_path, output_path=output_path)
+        assert(summary.to_dict() == {"solved": 0, "failed": 2, "skipped": 0})
+        assert(all([result["error"].startswith("Preparation failed") for result in read_jsonl(output_path)]))
+
+        summary = run_batch(client=ChatGPTClient(llm=EchoChatModel()), input_path=input_path, output_path=output_path, n_processes=1)
+        assert(summary.to_dict() == {"solved": 2, "failed": 0, "skipped": 0})
+
+# ====
+# Tests for the CLI 
+# ====
+def test_cli_0 (): 
+    args = build_arg_parser().parse_args(["batch", "in.jsonl", "out.jsonl", "--concurrency", "4", "--symbolic", "--simplify"])
+    assert(args.command == "batch" and args.concurrency == 4 and args.symbolic and args.simplify)
+    assert(args.checkpoint is None and args.model == "gpt-3.5-turbo")
@@ -0,0 +1,77 @@
+import pytest 
+from aitestgen.instrumentation import Instrument, Instrumentation, StatsInstrument, OpenTelemetryInstrument 
+from aitestgen.llm.client import ChatGPTClient 
+from aitestgen.llm.cache import SolutionCache 
+from aitestgen.llm.stub import StubChatModel 
+
+from utils import get_fresh_exe_context
+
+import logging
+logging.basicConfig(level=logging.INFO)
+
+JSON_STATEMENTS = [
+    [":=", ["var", "xyz"], ["var", "abc"]], 
+    ["assert", ["startsWith", ["var", "xyz"], "www"]]
+]
+
+# ====
+# Tests for Instrumentation
+# ====
+def test_instrumentation_0 (): 
+    stats = StatsInstrument() 
+    instrumentation = Instrumentation([stats])
+
+    with instrumentation.span("foo", size=1) as span_attributes: 
+        span_attributes["bar"] = True 
+    with pytest.raises(ValueError): 
+        with instrumentation.span("foo"): 
+            raise ValueError() 
+    instrumentation.count("baz", 3)
+    instrumentation.count("baz")
+
+    snapshot = stats.snapshot() 
+    assert(snapshot["phases"]["foo"]["count"] == 2)
+    assert(snapshot["counters"] == {"baz": 4})
+
+    stats.reset() 
+    assert(stats.snapshot() == {"phases": {}, "counters": {}})
+
+def test_instrumentation_1 (): 
+    get_fresh_exe_context() 
+
+    class RecordingInstrument (Instrument): 
+        def __init__ (self): 
+            self.spans = [] 
+
+        def on_span_end (self, phase, start_time_ns, duration_seconds, attributes): 
+            self.spans.append((phase, dict(attributes)))
+
+    stats = StatsInstrument() 
+    recorder = RecordingInstrument() 
+    client = ChatGPTClient(llm=StubChatModel(), cache=SolutionCache(), instrumentation=Instrumentation([stats, recorder]))
+
+    client.solve_json_statements(JSON_STATEMENTS)
+    client.solve_json_statements(JSON_STATEMENTS)
+
+    snapshot = stats.snapshot() 
+    assert(snapshot["phases"]["solve"]["count"] == 2)
+    assert(snapshot["phases"]["interpret"]["count"] == 2)
+    assert(snapshot["phases"]["cache"]["count"] == 2)
+    assert(snapshot["phases"]["render"]["count"] == 1)
+    assert(snapshot["phases"]["llm"]["count"] == 1)
+    assert(snapshot["phases"]["parse"]["count"] == 1)
+    assert(snapshot["counters"]["cache_hits"] == 1)
+    assert(snapshot["counters"]["cache_misses"] == 1)
+    assert(snapshot["counters"]["llm_calls"] == 1)
+    assert(snapshot["counters"]["prompt_tokens"] > 0)
+    assert(snapshot["counters"]["completion_tokens"] > 0)
+
+    llm_spans = [attributes for phase, attributes in recorder.spans if (phase == "llm")]
+    assert(llm_spans[0]["reported_usage"])
+
+def test_instrumentation_2 (): 
+    try: 
+        import opentelemetry 
+    except ImportError: 
+        with pytest.raises(ImportError): 
+            OpenTelemetryInstrument() 
@@ -0,0 +1,66 @@
+from aitestgen.ir import node as ir_node 
+from aitestgen.ir.evaluator import CompiledPuzzle, verify_solution 
+from aitestgen.llm.json_2_prompt import execute_json_statements 
+
+from utils import get_fresh_exe_context
+
+import logging 
+logging.basicConfig(level=logging.INFO)
+
+# ====
+# Tests for the operator tables 
+# ====
+def test_string_operators_0 (): 
+    assert(ir_node.StringOperation.operators["startsWith"]("www.example.net", "www"))
+    assert(ir_node.StringOperation.operators["endsWith"]("www.example.net", ".net"))
+    assert(ir_node.StringOperation.operators["subStr"]("www.example.net", 4, None) == "example.net")
+
+# ====
+# Tests for CompiledPuzzle 
+# ====
+def test_compiled_puzzle_0 (): 
+    get_fresh_exe_context() 
+
+    exe_context = execute_json_statements([
+        [":=", ["var", "xyz"], ["var", "abc"]], 
+        ["assert", ["startsWith", ["var", "xyz"], "www"]], 
+        ["assert", ["endsWith", ["var", "xyz"], ".net"]]
+    ])
+    compiled_puzzle = CompiledPuzzle(exe_context)
+    abc = exe_context.unbounded_variables[0]
+
+    assert(compiled_puzzle.check({abc: "www.example.net"}) == [True, True])
+    assert(compiled_puzzle.check({str(abc): "www.example.com"}) == [True, False])
+
+    result = compiled_puzzle.verify({str(abc): "ftp.example.com"})
+    assert(not result.is_valid)
+    assert(len(result.violated) == 2 and len(result.satisfied) == 0)
+
+def test_compiled_puzzle_1 (): 
+    get_fresh_exe_context() 
+
+    exe_context = execute_json_statements([
+        [":=", ["var", "xyz"], ["subStr", ["var", "abc"], 4, None]], 
+        ["assert", ["==", ["var", "xyz"], "example.net"]], 
+        ["assert", ["not", ["startsWith", ["var", "pqr"], "www"]]]
+    ])
+    abc, pqr = exe_context.unbounded_variables 
+
+    result = verify_solution(exe_context, {abc: "www.example.net", pqr: "ftp"})
+    assert(result.is_valid)
+
+    # a missing variable violates the asserts depending on it, even under "not" 
+    result = verify_solution(exe_context, {abc: "www.example.net"})
+    assert(not result.is_valid)
+    assert(result.missing_variables == [pqr])
+    assert(result.violated == [exe_context.executed_statements[-1]])
+
+def test_compiled_puzzle_2 (): 
+    get_fresh_exe_context() 
+
+    # ill-typed operations are violations rather than exceptions 
+    exe_context = execute_json_statements([
+        ["assert", ["startsWith", 1, "www"]], 
+        ["assert", ["==", ["var", "abc"], 1]]
+    ])
+    assert(CompiledPuzzle(exe_context).check({exe_context.unbounded_variables[0]: 1}) == [False, True])
@@ -1,6 +1,8 @@
+from concurrent.futures import ThreadPoolExecutor
 from aitestgen.ir import node as ir_node 
 from aitestgen.ir.interpreter import ExecutionContext
 from aitestgen.ir.interpreter import interpret_json_expression, interpret_json_statement 
+from aitestgen.llm.json_2_prompt import generate_prompt_from_json_statements
 
 from utils import get_fresh_exe_context
 
@@ -103,4 +105,19 @@ def test_interpret_json_statement_2 ():
 
     json_stat = ["assert", ["startsWith", ["var", "abc"], "www"]]
     exe_context = interpret_json_statement(json_obj=json_stat, exe_context=exe_context)
-    assert(len(exe_context.unbounded_variables) == 1)
\ No newline at end of file
+    assert(len(exe_context.unbounded_variables) == 1)
+
+# ====
+# Tests for the per-context variable ids 
+# ====
+def test_variable_ids_0 (): 
+    json_statements = [
+        [":=", ["var", "xyz"], ["var", "abc"]], 
+        ["assert", ["startsWith", ["var", "xyz"], "www"]]
+    ]
+
+    # the names do not depend on the puzzles interpreted before, nor on the concurrency 
+    with ThreadPoolExecutor(max_workers=8) as executor: 
+        prompts = list(executor.map(generate_prompt_from_json_statements, [json_statements] * 64))
+    assert(len(set(prompts)) == 1)
+    assert("abc_1" in prompts[0])
@@ -0,0 +1,55 @@
+import json 
+from aitestgen.ir import node as ir_node 
+from aitestgen.ir.interpreter import interpret_json_expression 
+
+from utils import get_fresh_exe_context
+
+import logging 
+logging.basicConfig(level=logging.INFO)
+
+# ====
+# Tests for the immutable nodes 
+# ====
+def test_immutable_node_0 (): 
+    expr = ir_node.BinaryExpression(opt="==", lhs=ir_node.Constant("abc"), rhs=ir_node.Constant("abc"))
+    assert(isinstance(expr.operands, tuple))
+    assert(not hasattr(expr, "__dict__"))
+
+    for name in ["operator", "operands", "foo"]: 
+        try: 
+            setattr(expr, name, None)
+            assert(False), f"Expected AttributeError when setting {name}"
+        except AttributeError: 
+            pass 
+
+def test_statement_to_json_0 (): 
+    # the body of an assignment is its expression only, as before the nodes became immutable 
+    var, expr = ir_node.Variable("xyz", 1), ir_node.Variable("abc", 0)
+    stat = ir_node.AssignStatement(var=var, expr=expr)
+    assert(stat.body == (expr,))
+    assert(json.loads(stat.to_json()) == [":=", ["var", "abc_0"]])
+
+    stat = ir_node.AssertStatement(bool_expr=ir_node.BinaryExpression(opt="==", lhs=expr, rhs=ir_node.Constant("www")))
+    assert(stat.body == (stat.bool_expression,))
+
+# ====
+# Tests for NodeFactory 
+# ====
+def test_node_factory_0 (): 
+    node_factory = ir_node.NodeFactory() 
+    assert(node_factory.constant("abc") is node_factory.constant("abc"))
+    assert(node_factory.constant(1) is not node_factory.constant(True))
+    assert(node_factory.constant(0.0) is not node_factory.constant(-0.0))
+
+    var = ir_node.Variable(name="abc", var_id=0)
+    www = node_factory.constant("www")
+    assert(node_factory.string_operation("startsWith", [var, www]) is node_factory.string_operation("startsWith", [var, www]))
+    assert(node_factory.string_operation("startsWith", [var, www]) is not node_factory.string_operation("endsWith", [var, www]))
+
+def test_node_factory_1 (): 
+    exe_context = get_fresh_exe_context() 
+
+    # structurally equal subtrees of a puzzle are shared 
+    expr_0 = interpret_json_expression(["not", ["startsWith", ["var", "abc"], "www"]], exe_context=exe_context)
+    expr_1 = interpret_json_expression(["not", ["startsWith", ["var", "abc"], "www"]], exe_context=exe_context)
+    assert(expr_0 is expr_1)
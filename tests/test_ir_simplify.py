@@ -0,0 +1,112 @@
+import pytest
+
+from aitestgen.ir.simplify import simplify_execution_context
+from aitestgen.ir.evaluator import verify_solution
+from aitestgen.llm.json_2_prompt import execute_json_statements, generate_prompt_from_execution_context
+from aitestgen.llm.client import ChatGPTClient
+from aitestgen.solver.symbolic import UnsatisfiableConstraintsError
+from aitestgen.instrumentation import Instrumentation, StatsInstrument, PHASE_SIMPLIFY
+
+from utils import get_fresh_exe_context, EchoChatModel
+
+import logging
+logging.basicConfig(level=logging.INFO)
+
+def simplify (json_statements):
+    get_fresh_exe_context()
+    exe_context = execute_json_statements(json_statements)
+    return (exe_context, simplify_execution_context(exe_context))
+
+# ====
+# Tests for simplify_execution_context
+# ====
+def test_simplify_execution_context_0 ():
+    # copy propagation, then the dead assignment is dropped
+    exe_context, simplified = simplify([
+        [":=", ["var", "xyz"], ["var", "abc"]],
+        ["assert", ["startsWith", ["var", "xyz"], "www"]],
+        ["assert", ["endsWith", ["var", "xyz"], ".net"]]
+    ])
+    assert(len(simplified.store) == 0)
+    assert([str(stat.bool_expression) for stat in simplified.executed_statements] == [
+        '["startsWith", ["var", "abc_1"], "www"]',
+        '["endsWith", ["var", "abc_1"], ".net"]'
+    ])
+    assert([str(v) for v in simplified.unbounded_variables] == ["abc_1"])
+    assert(len(generate_prompt_from_execution_context(simplified)) < len(generate_prompt_from_execution_context(exe_context)))
+
+def test_simplify_execution_context_1 ():
+    # constant folding and the assertions folded to true
+    exe_context, simplified = simplify([
+        [":=", ["var", "xyz"], "www.example.net"],
+        [":=", ["var", "pqr"], ["subStr", ["var", "xyz"], 0, 3]],
+        ["assert", ["startsWith", ["var", "xyz"], ["var", "pqr"]]],
+        ["assert", ["==", ["var", "pqr"], "www"]],
+        ["assert", ["==", ["var", "abc"], ["var", "abc"]]],
+        ["assert", ["not", ["not", ["endsWith", ["var", "ijk"], ["subStr", ["var", "xyz"], 11, None]]]]]
+    ])
+    assert([str(stat.bool_expression) for stat in simplified.executed_statements] == ['["endsWith", ["var", "ijk_3"], ".net"]'])
+    assert([str(v) for v in simplified.unbounded_variables] == ["abc_2", "ijk_3"])
+
+def test_simplify_execution_context_2 ():
+    # duplicated assertions and the assignments only used by dead assignments
+    exe_context, simplified = simplify([
+        [":=", ["var", "xyz"], ["subStr", ["var", "abc"], 0, 3]],
+        [":=", ["var", "pqr"], ["subStr", ["var", "xyz"], 1, None]],
+        [":=", ["var", "ijk"], ["subStr", ["var", "abc"], 1, None]],
+        ["assert", ["startsWith", ["var", "ijk"], "ww"]],
+        ["assert", ["startsWith", ["var", "ijk"], "ww"]]
+    ])
+    assert([str(v) for v in simplified.store.keys()] == ["ijk_3"])
+    assert(len(simplified.executed_statements) == 2)
+
+    # an answer to the simplified context answers the original one
+    solution = {"abc_1": "www.example.net"}
+    assert(verify_solution(simplified, solution).is_valid)
+    assert(verify_solution(exe_context, solution).is_valid)
+
+@pytest.mark.parametrize("json_statements", [
+    [["assert", ["startsWith", ["subStr", "abc", 0, 2], "b"]]],
+    [["assert", ["startsWith", ["var", "abc"], "www"]], ["assert", ["startsWith", ["var", "abc"], "ftp"]]],
+    [["assert", ["endsWith", ["var", "abc"], ".net"]], ["assert", ["endsWith", ["var", "abc"], ".com"]]],
+    [["assert", ["==", ["var", "abc"], "www"]], ["assert", ["==", "ftp", ["var", "abc"]]]],
+    [["assert", ["==", ["var", "abc"], "www"]], ["assert", ["endsWith", ["var", "abc"], ".net"]]],
+    [[":=", ["var", "xyz"], ["var", "abc"]], ["assert", ["startsWith", ["var", "xyz"], "w"]], ["assert", ["not", ["startsWith", ["var", "abc"], "w"]]]]
+])
+def test_simplify_execution_context_unsat (json_statements):
+    with pytest.raises(UnsatisfiableConstraintsError):
+        simplify(json_statements)
+
+def test_simplify_execution_context_compatible_affixes ():
+    exe_context, simplified = simplify([
+        ["assert", ["startsWith", ["var", "abc"], "ww"]],
+        ["assert", ["startsWith", ["var", "abc"], "www."]],
+        ["assert", ["==", ["var", "abc"], "www.example.net"]],
+        ["assert", ["not", ["endsWith", ["var", "abc"], ".com"]]]
+    ])
+    assert(len(simplified.executed_statements) == 4)
+
+# ====
+# Tests for the simplification in ChatGPTClient
+# ====
+def test_client_simplify ():
+    get_fresh_exe_context()
+    stats = StatsInstrument()
+    llm = EchoChatModel()
+    chatgpt_client = ChatGPTClient(llm=llm, simplify=True, instrumentation=Instrumentation([stats]))
+
+    solution = chatgpt_client.solve_json_statements([
+        [":=", ["var", "xyz"], ["var", "abc"]],
+        ["assert", ["startsWith", ["var", "xyz"], "www"]]
+    ])
+    assert(solution == {"abc_1": "www.example.net"})
+    assert(stats.snapshot()["phases"][PHASE_SIMPLIFY]["count"] == 1)
+
+    # a trivially unsatisfiable puzzle never reaches the LLM
+    n_calls = llm.n_calls
+    with pytest.raises(UnsatisfiableConstraintsError):
+        chatgpt_client.solve_json_statements([
+            ["assert", ["startsWith", ["var", "abc"], "www"]],
+            ["assert", ["startsWith", ["var", "abc"], "ftp"]]
+        ])
+    assert(llm.n_calls == n_calls)
@@ -0,0 +1,51 @@
+import pytest 
+
+from aitestgen.ir.slicing import slice_execution_context 
+from aitestgen.ir.evaluator import UnsatisfiableConstraintsError 
+from aitestgen.llm.client import ChatGPTClient 
+from aitestgen.llm.json_2_prompt import execute_json_statements 
+
+from utils import get_fresh_exe_context, EchoChatModel
+
+import logging 
+logging.basicConfig(level=logging.INFO)
+
+# ====
+# Tests for slice_execution_context 
+# ====
+def test_slice_execution_context_0 (): 
+    get_fresh_exe_context() 
+
+    exe_context = execute_json_statements([
+        [":=", ["var", "xyz"], ["var", "abc"]], 
+        ["assert", ["startsWith", ["var", "pqr"], "ftp"]], 
+        ["assert", ["startsWith", ["var", "xyz"], "www"]], 
+        ["assert", ["==", "www", "www"]], 
+        ["assert", ["endsWith", ["var", "ijk"], ["var", "pqr"]]]
+    ])
+    components = slice_execution_context(exe_context)
+    assert(len(components) == 2)
+
+    component_0, component_1 = components 
+    assert([str(v) for v in component_0.unbounded_variables] == ["abc_1"])
+    assert([str(v) for v in component_0.store.keys()] == ["xyz_0"])
+    assert(len(component_0.executed_statements) == 2)
+
+    assert([str(v) for v in component_1.unbounded_variables] == ["pqr_2", "ijk_3"])
+    assert(len(component_1.store) == 0)
+    assert(len(component_1.executed_statements) == 2)
+
+def test_slice_execution_context_false_constant (): 
+    get_fresh_exe_context() 
+
+    json_statements = [
+        ["assert", ["==", "a", "b"]], 
+        ["assert", ["startsWith", ["var", "x"], "www"]]
+    ]
+    with pytest.raises(UnsatisfiableConstraintsError):
+        slice_execution_context(execute_json_statements(json_statements))
+
+    llm = EchoChatModel()
+    with pytest.raises(UnsatisfiableConstraintsError):
+        ChatGPTClient(llm=llm, slice_components=True).solve_json_statements(json_statements)
+    assert(llm.n_calls == 0)
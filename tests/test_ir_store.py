@@ -0,0 +1,80 @@
+from aitestgen.ir.store import PersistentList, VersionedStore
+from aitestgen.ir.interpreter import interpret_json_statement
+
+from utils import get_fresh_exe_context
+
+import logging 
+logging.basicConfig(level=logging.INFO)
+
+# ====
+# Tests for PersistentList
+# ====
+def test_persistent_list_0 (): 
+    plist = PersistentList() 
+    plist.append(1)
+    plist.append(2)
+
+    snapshot = plist.snapshot() 
+    plist.append(3) 
+    assert(list(plist) == [1, 2, 3])
+    assert(list(snapshot) == [1, 2])
+    assert(plist[-1] == 3 and snapshot[-1] == 2)
+    assert(plist[1:] == [2, 3])
+
+    # appending to an older snapshot must not leak into the newer one 
+    snapshot.append(4) 
+    assert(list(plist) == [1, 2, 3])
+    assert(list(snapshot) == [1, 2, 4])
+
+def test_persistent_list_1 (): 
+    plist = PersistentList(key_fn=lambda item: item[0]) 
+    plist.append(("a", 0))
+    plist.append(("b", 1))
+    snapshot = plist.snapshot() 
+    plist.append(("a", 2))
+
+    assert(plist.find_latest("a") == ("a", 2))
+    assert(snapshot.find_latest("a") == ("a", 0))
+    assert(snapshot.find_latest("c") is None)
+
+# ====
+# Tests for VersionedStore
+# ====
+def test_versioned_store_0 (): 
+    exe_context = get_fresh_exe_context() 
+
+    for json_stat in [
+        [":=", ["var", "xyz"], "a"], 
+        [":=", ["var", "abc"], "b"], 
+        [":=", ["var", "xyz"], "c"]
+    ]: 
+        exe_context = interpret_json_statement(json_obj=json_stat, exe_context=exe_context)
+
+    store = exe_context.store 
+    assert(isinstance(store, VersionedStore))
+    assert(len(store) == 3)
+
+    latest_var, latest_expr = store.read_latest("xyz")
+    assert(str(latest_var) == "xyz_2" and latest_expr.value == "c")
+    assert(store[latest_var].value == "c")
+    assert(store.read_latest("pqr") == (None, None))
+
+def test_versioned_store_1 (): 
+    exe_context_0 = get_fresh_exe_context() 
+    exe_context_1 = interpret_json_statement(json_obj=[":=", ["var", "xyz"], "a"], exe_context=exe_context_0)
+    exe_context_2 = interpret_json_statement(json_obj=[":=", ["var", "xyz"], "b"], exe_context=exe_context_1)
+
+    # earlier snapshots are not affected by later statements 
+    assert(len(exe_context_0.store) == 0 and len(exe_context_0.executed_statements) == 0)
+    assert(exe_context_1.read_latest_var("xyz")[1].value == "a")
+    assert(exe_context_2.read_latest_var("xyz")[1].value == "b")
+
+    # branching from an older snapshot 
+    exe_context_3 = interpret_json_statement(json_obj=[":=", ["var", "xyz"], "c"], exe_context=exe_context_1)
+    assert(exe_context_3.read_latest_var("xyz")[1].value == "c")
+    assert(exe_context_2.read_latest_var("xyz")[1].value == "b")
+    assert(len(exe_context_2.store) == 2 and len(exe_context_3.store) == 2)
+    # both branches allocate the same version, each bound to its own expression 
+    xyz_1 = exe_context_2.read_latest_var("xyz")[0]
+    assert(str(xyz_1) == "xyz_1" and str(exe_context_3.read_latest_var("xyz")[0]) == "xyz_1")
+    assert(exe_context_2.store[xyz_1].value == "b" and exe_context_3.store[xyz_1].value == "c")
@@ -0,0 +1,84 @@
+import io 
+import os 
+import json 
+import tempfile 
+import pytest 
+from aitestgen.ir.stream import iter_json_statements, execute_json_statements_stream 
+from aitestgen.llm.json_2_prompt import execute_json_statements, dump_execution_context_to_sentences 
+
+from utils import get_fresh_exe_context
+
+import logging 
+logging.basicConfig(level=logging.INFO)
+
+JSON_STATEMENTS = [
+    [":=", ["var", "xyz"], ["var", "abc"]], 
+    ["assert", ["startsWith", ["var", "xyz"], "wwé"]], 
+    [":=", ["var", "xyz"], ["subStr", ["var", "xyz"], 0, None]], 
+    ["assert", ["endsWith", ["var", "xyz"], ".net"]]
+]
+
+# ====
+# Tests for iter_json_statements 
+# ====
+def test_iter_json_statements_0 (): 
+    json_array = json.dumps(JSON_STATEMENTS, indent=2, ensure_ascii=False).encode("utf-8")
+    json_lines = "\n".join([json.dumps(json_stat) for json_stat in JSON_STATEMENTS]).encode("utf-8")
+
+    for content in [json_array, json_lines]: 
+        for chunk_size in [1, 3, 1024]: 
+            assert(list(iter_json_statements(io.BytesIO(content), chunk_size=chunk_size)) == JSON_STATEMENTS)
+
+    assert(list(iter_json_statements(io.BytesIO(b" [ ] "))) == [])
+    assert(list(iter_json_statements(io.BytesIO(b""))) == [])
+
+def test_iter_json_statements_malformed (): 
+    # an unterminated value fails once it exceeds max_value_size, without buffering the rest of the input 
+    content = b'[["assert", "' + b"x" * 4096 + b'"]]'
+    stream = io.BytesIO(content)
+    with pytest.raises(ValueError, match="exceeds 64 characters"): 
+        list(iter_json_statements(stream, chunk_size=16, max_value_size=64))
+    assert(stream.tell() < 128)
+
+    with pytest.raises(ValueError): 
+        list(iter_json_statements(io.BytesIO(b'[["assert", }]')))
+
+def test_iter_json_statements_1 (): 
+    with tempfile.TemporaryDirectory() as tmp_dir: 
+        path = os.path.join(tmp_dir, "statements.json")
+        with open(path, "w") as f: 
+            json.dump(JSON_STATEMENTS, f)
+        assert(list(iter_json_statements(path)) == JSON_STATEMENTS)
+
+# ====
+# Tests for execute_json_statements_stream 
+# ====
+def test_execute_json_statements_stream_0 (): 
+    get_fresh_exe_context() 
+    expected_sents = dump_execution_context_to_sentences(execute_json_statements(JSON_STATEMENTS))
+
+    get_fresh_exe_context() 
+    exe_context = execute_json_statements_stream(io.BytesIO(json.dumps(JSON_STATEMENTS).encode("utf-8")), keep_statements=True)
+    assert(dump_execution_context_to_sentences(exe_context) == expected_sents)
+
+    # without keep_statements, the context is compacted even without a callback 
+    get_fresh_exe_context() 
+    exe_context = execute_json_statements_stream(io.BytesIO(json.dumps(JSON_STATEMENTS).encode("utf-8")), compact_every=2)
+    assert(len(exe_context.executed_statements) == 0)
+
+def test_execute_json_statements_stream_1 (): 
+    get_fresh_exe_context() 
+    expected_sents = dump_execution_context_to_sentences(execute_json_statements(JSON_STATEMENTS))
+
+    # the statements are handed off and the context only keeps the live variables 
+    get_fresh_exe_context() 
+    sents = [] 
+    exe_context = execute_json_statements_stream(
+        io.BytesIO(json.dumps(JSON_STATEMENTS).encode("utf-8")), 
+        on_statement=lambda stat, _: sents.append(stat.to_natural_language()), 
+        compact_every=1
+    )
+    assert(sents == expected_sents)
+    assert(len(exe_context.executed_statements) == 0)
+    assert([str(v) for v in exe_context.store.keys()] == ["xyz_2"])
+    assert([str(v) for v in exe_context.unbounded_variables] == ["abc_1"])
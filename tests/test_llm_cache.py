@@ -0,0 +1,100 @@
+import os 
+import tempfile 
+from aitestgen.llm.cache import canonicalize_json_statements, compute_cache_key 
+from aitestgen.llm.cache import SolutionCache, SqliteSolutionCache 
+from aitestgen.llm.client import ChatGPTClient 
+
+from utils import get_fresh_exe_context, EchoChatModel
+
+import logging
+logging.basicConfig(level=logging.INFO)
+
+# ====
+# Tests for canonicalization 
+# ====
+def test_canonicalize_json_statements_0 (): 
+    canonical_statements, name_2_canonical = canonicalize_json_statements([
+        [":=", ["var", "xyz"], ["var", "abc"]], 
+        ["assert", ["startsWith", ["var", "xyz"], "var"]]
+    ])
+    assert(canonical_statements == [
+        [":=", ["var", "v0"], ["var", "v1"]], 
+        ["assert", ["startsWith", ["var", "v0"], "var"]]
+    ])
+    assert(name_2_canonical == {"xyz": "v0", "abc": "v1"})
+
+def test_compute_cache_key_0 (): 
+    key_0 = compute_cache_key([["assert", ["startsWith", ["var", "abc"], "www"]]], model="m", temperature=0.0)
+    key_1 = compute_cache_key([["assert", ["startsWith", ["var", "foo"], "www"]]], model="m", temperature=0.0)
+    key_2 = compute_cache_key([["assert", ["startsWith", ["var", "foo"], "www"]]], model="m", temperature=0.5)
+    assert(key_0 == key_1)
+    assert(key_1 != key_2)
+
+# ====
+# Tests for the cache tiers 
+# ====
+def test_solution_cache_0 (): 
+    cache = SolutionCache(max_entries=2) 
+    cache.put("a", ["1"])
+    cache.put("b", ["2"])
+    assert(cache.get("a") == ["1"]) # "a" becomes the most recently used 
+    cache.put("c", ["3"])
+    assert(cache.get("b") is None)
+    assert(cache.get("a") == ["1"] and cache.get("c") == ["3"])
+
+def test_solution_cache_1 (): 
+    cache = SolutionCache(ttl_seconds=0.0) 
+    cache.put("a", ["1"])
+    assert(cache.get("a") is None)
+
+def test_sqlite_solution_cache_0 (): 
+    with tempfile.TemporaryDirectory() as tmp_dir: 
+        path = os.path.join(tmp_dir, "solutions.sqlite")
+        disk_cache = SqliteSolutionCache(path, max_entries=2)
+        disk_cache.put("a", ["1"])
+        disk_cache.put("b", [None, "2"])
+        disk_cache.put("c", ["3"])
+        assert(len(disk_cache) == 2)
+        disk_cache.close() 
+
+        # a new in-memory tier is warmed up from the disk tier 
+        disk_cache = SqliteSolutionCache(path)
+        cache = SolutionCache(disk_cache=disk_cache)
+        assert(cache.get("b") == [None, "2"])
+        assert(len(cache) == 1)
+        disk_cache.close() 
+
+# ====
+# Tests for the cached client 
+# ====
+def test_cached_client_0 (): 
+    get_fresh_exe_context() 
+
+    llm = EchoChatModel() 
+    client = ChatGPTClient(llm=llm, cache=SolutionCache())
+
+    solution = client.solve_json_statements([
+        [":=", ["var", "xyz"], ["var", "abc"]], 
+        ["assert", ["startsWith", ["var", "xyz"], "www"]]
+    ])
+    assert(list(solution.values()) == ["www.example.net"])
+
+    # an alpha-equivalent puzzle is served from the cache, under the caller's variable names 
+    solution = client.solve_json_statements([
+        [":=", ["var", "pqr"], ["var", "foo"]], 
+        ["assert", ["startsWith", ["var", "pqr"], "www"]]
+    ])
+    assert(list(solution.values()) == ["www.example.net"])
+    assert(list(solution.keys()) == ["foo_1"])
+    assert(llm.n_calls == 1)
+
+def test_cached_client_invalid_answer (): 
+    get_fresh_exe_context() 
+
+    # a wrong answer is not cached 
+    llm = EchoChatModel(answer="ftp.example.net")
+    client = ChatGPTClient(llm=llm, cache=SolutionCache())
+    for _ in range(2): 
+        solution = client.solve_json_statements([["assert", ["startsWith", ["var", "abc"], "www"]]])
+        assert(solution == {"abc_0": "ftp.example.net"})
+    assert(llm.n_calls == 2 and len(client.cache) == 0)
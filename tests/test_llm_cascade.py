@@ -0,0 +1,155 @@
+import asyncio
+import pytest
+
+from aitestgen.cli import build_arg_parser
+from aitestgen.llm.client import ChatGPTClient
+from aitestgen.llm.cascade import CascadingClient, ShapeStats, puzzle_shape
+from aitestgen.llm.json_2_prompt import execute_json_statements
+from aitestgen.solver.symbolic import UnsatisfiableConstraintsError
+from aitestgen.instrumentation import Instrumentation, StatsInstrument, COUNTER_ESCALATIONS
+
+from utils import EchoChatModel
+
+import logging
+logging.basicConfig(level=logging.INFO)
+
+EASY_PUZZLE = [["assert", ["startsWith", ["var", "abc"], "ftp"]]]
+HARD_PUZZLE = [
+    [":=", ["var", "xyz"], ["subStr", ["var", "abc"], 0, 8]],
+    [":=", ["var", "pqr"], ["subStr", ["var", "xyz"], 4, None]],
+    ["assert", ["startsWith", ["var", "abc"], "www."]],
+    ["assert", ["==", ["var", "pqr"], "exam"]]
+]
+
+class FailingChatModel (EchoChatModel):
+    """
+    Raises the error on every call, like a timed out or failed API request.
+    """
+    error :Exception = TimeoutError("timed out")
+
+    def _say (self, messages, **kwargs):
+        super()._say(messages, **kwargs)
+        raise self.error
+
+def build_cascade (**kwargs):
+    cheap_llm = EchoChatModel(answer="ftp.example.net")
+    strong_llm = EchoChatModel(answer="www.example.net")
+    cascade = CascadingClient(
+        tiers=[ChatGPTClient(llm=cheap_llm, model="cheap"), ChatGPTClient(llm=strong_llm, model="strong")],
+        **kwargs
+    )
+    return (cascade, cheap_llm, strong_llm)
+
+# ====
+# Tests for puzzle_shape
+# ====
+def test_puzzle_shape_0 ():
+    shape = puzzle_shape(execute_json_statements(HARD_PUZZLE))
+    assert(shape == "substr_depth=2;n_vars=1;n_asserts=2;operators===,startsWith,subStr")
+
+    # names and constants do not matter
+    assert(puzzle_shape(execute_json_statements(EASY_PUZZLE)) == puzzle_shape(execute_json_statements(
+        [["assert", ["startsWith", ["var", "ijk"], "www"]]]
+    )))
+
+def test_shape_stats_0 ():
+    shape_stats = ShapeStats()
+    assert(shape_stats.success_rate("s", 0) is None)
+    shape_stats.record("s", 0, True)
+    shape_stats.record("s", 0, False)
+    assert(shape_stats.success_rate("s", 0) == 0.5)
+    assert(shape_stats.success_rate("s", 0, min_samples=3) is None)
+    assert(shape_stats.snapshot() == {"s": {0: {"attempts": 2, "solved": 1}}})
+
+# ====
+# Tests for CascadingClient
+# ====
+def test_cascading_client_0 ():
+    stats = StatsInstrument()
+    cascade, cheap_llm, strong_llm = build_cascade(instrumentation=Instrumentation([stats]))
+
+    # the cheap tier is enough
+    solution, result = cascade.solve_and_verify_json_statements(EASY_PUZZLE)
+    assert(solution == {"abc_0": "ftp.example.net"} and result.is_valid)
+    assert((cheap_llm.n_calls, strong_llm.n_calls) == (1, 0))
+
+    # the strong tier fixes the cheap tier's answer
+    solution, result = cascade.solve_and_verify_json_statements(HARD_PUZZLE)
+    assert(solution == {"abc_1": "www.example.net"} and result.is_valid)
+    assert((cheap_llm.n_calls, strong_llm.n_calls) == (2, 1))
+    assert(stats.snapshot()["counters"][COUNTER_ESCALATIONS] == 1)
+    assert(cascade.stats()["tiers"] == ["cheap", "strong"])
+
+def test_cascading_client_routing ():
+    cascade, cheap_llm, strong_llm = build_cascade(min_samples=2, probe_interval=3)
+    shape = puzzle_shape(execute_json_statements(HARD_PUZZLE))
+
+    solutions = [cascade.solve_json_statements(HARD_PUZZLE) for _ in range(2)]
+    assert(all([solution == {"abc_1": "www.example.net"} for solution in solutions]))
+    assert(cheap_llm.n_calls == 2 and cascade.first_tier(shape) == 1) # a known-hard shape
+
+    # the known-hard shape goes straight to the strong tier, but for a probe of the cheap tier now and then
+    results = asyncio.run(cascade.asolve_many([HARD_PUZZLE] * 3, max_concurrency=1))
+    assert(all([result == {"abc_1": "www.example.net"} for result in results]))
+    assert(cheap_llm.n_calls == 3)
+
+    # the other shapes still start with the cheap tier
+    assert(cascade.solve_json_statements(EASY_PUZZLE) == {"abc_0": "ftp.example.net"})
+    assert(strong_llm.n_calls == 5)
+
+def test_cascading_client_failure ():
+    stats = StatsInstrument()
+    failing_llm = FailingChatModel()
+    strong_llm = EchoChatModel(answer="www.example.net")
+    cascade = CascadingClient(
+        tiers=[ChatGPTClient(llm=failing_llm, model="cheap"), ChatGPTClient(llm=strong_llm, model="strong")],
+        instrumentation=Instrumentation([stats])
+    )
+    shape = puzzle_shape(execute_json_statements(HARD_PUZZLE))
+
+    # a failed call of the cheap tier is an unsolved attempt
+    solution, result = cascade.solve_and_verify_json_statements(HARD_PUZZLE)
+    assert(solution == {"abc_1": "www.example.net"} and result.is_valid)
+    results = asyncio.run(cascade.asolve_many([HARD_PUZZLE], max_concurrency=1))
+    assert(list(results[0].values()) == ["www.example.net"])
+    assert((failing_llm.n_calls, strong_llm.n_calls) == (2, 2))
+    assert(cascade.shape_stats.counts(shape, 0) == (2, 0))
+    assert(stats.snapshot()["counters"][COUNTER_ESCALATIONS] == 2)
+
+    # the last tier's failure is the puzzle's
+    cascade = CascadingClient(tiers=[ChatGPTClient(llm=FailingChatModel()), ChatGPTClient(llm=FailingChatModel(error=ConnectionError()))])
+    with pytest.raises(ConnectionError):
+        cascade.solve_json_statements(EASY_PUZZLE)
+
+def test_cascading_client_assertion ():
+    # an assertion of a tier's client escalates like its other failures
+    failing_llm = FailingChatModel(error=AssertionError("bad state"))
+    strong_llm = EchoChatModel(answer="www.example.net")
+    cascade = CascadingClient(tiers=[ChatGPTClient(llm=failing_llm, model="cheap"), ChatGPTClient(llm=strong_llm, model="strong")])
+    assert(cascade.solve_json_statements(HARD_PUZZLE) == {"abc_1": "www.example.net"})
+    assert((failing_llm.n_calls, strong_llm.n_calls) == (1, 1))
+
+    # an invalid puzzle is rejected before any tier is called
+    with pytest.raises(AssertionError):
+        cascade.solve_json_statements([["assert", ["foo", ["var", "abc"]]]])
+    with pytest.raises(AssertionError):
+        asyncio.run(cascade.asolve_json_statements([["bogus", 1]]))
+    assert((failing_llm.n_calls, strong_llm.n_calls) == (1, 1))
+
+def test_cascading_client_unsat ():
+    cheap_llm = EchoChatModel()
+    cascade = CascadingClient(tiers=[ChatGPTClient(llm=cheap_llm, simplify=True), ChatGPTClient(llm=EchoChatModel())])
+    with pytest.raises(UnsatisfiableConstraintsError):
+        cascade.solve_json_statements([
+            ["assert", ["startsWith", ["var", "abc"], "www"]],
+            ["assert", ["startsWith", ["var", "abc"], "ftp"]]
+        ])
+    assert(cheap_llm.n_calls == 0)
+
+# ====
+# Tests for the CLI
+# ====
+def test_cli_cascade ():
+    args = build_arg_parser().parse_args(["serve", "--model", "gpt-4o", "--cascade-model", "gpt-4o-mini"])
+    assert(args.model == "gpt-4o" and args.cascade_model == "gpt-4o-mini")
+    assert(build_arg_parser().parse_args(["serve"]).cascade_model is None)
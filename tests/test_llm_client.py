@@ -1,8 +1,14 @@
 import os 
+import asyncio 
+from typing import List 
 from dotenv import load_dotenv
-from aitestgen.llm.client import ChatGPTClient 
+from langchain_core.language_models import FakeListChatModel
+from langchain_core.messages import AIMessage
+from langchain_core.outputs import ChatGeneration, ChatResult
+from aitestgen.llm.client import ChatGPTClient, StreamingSayingParser, parse_llm_saying 
+from aitestgen.llm.cache import SolutionCache 
 
-from utils import get_fresh_exe_context
+from utils import get_fresh_exe_context, EchoChatModel
 
 import logging
 logging.basicConfig(level=logging.INFO)
@@ -56,4 +62,300 @@ def test_client_1 ():
 
     else:
         assert(False), f"Skipped because OPENAI_API_KEY is not set"
-        
\ No newline at end of file
+        
+# ====
+# Offline tests for the async and batched API 
+# ====
+def test_client_async_0 (): 
+    get_fresh_exe_context() 
+
+    client = ChatGPTClient(llm=EchoChatModel())
+    solution = asyncio.run(client.asolve_json_statements(
+        json_statements=[
+            [":=", ["var", "xyz"], ["var", "abc"]], 
+            ["assert", ["startsWith", ["var", "xyz"], "www"]]
+        ]
+    ))
+    assert(solution == {"abc_1": "www.example.net"})
+
+def test_client_many_0 (): 
+    get_fresh_exe_context() 
+
+    client = ChatGPTClient(llm=EchoChatModel())
+    json_statements_list = [
+        [["assert", ["startsWith", ["var", "abc"], "www"]]], 
+        [["assert"]], # invalid puzzle 
+        [["assert", ["endsWith", ["var", "xyz"], ".net"]]]
+    ]
+
+    for results in [
+        client.solve_many(json_statements_list, max_concurrency=2), 
+        asyncio.run(client.asolve_many(json_statements_list, max_concurrency=2))
+    ]: 
+        assert(len(results) == 3)
+        assert(list(results[0].values()) == ["www.example.net"] and list(results[0].keys())[0].startswith("abc_"))
+        assert(isinstance(results[1], Exception))
+        assert(list(results[2].keys())[0].startswith("xyz_"))
+
+def test_client_verify_0 (): 
+    get_fresh_exe_context() 
+
+    client = ChatGPTClient(llm=EchoChatModel())
+    solution, result = client.solve_and_verify_json_statements(
+        json_statements=[
+            [":=", ["var", "xyz"], ["var", "abc"]], 
+            ["assert", ["startsWith", ["var", "xyz"], "www"]], 
+            ["assert", ["endsWith", ["var", "xyz"], ".com"]]
+        ]
+    )
+    assert(solution == {"abc_1": "www.example.net"})
+    assert(len(result.satisfied) == 1 and len(result.violated) == 1)
+
+# ====
+# Offline tests for the generate-verify-repair loop 
+# ====
+REPAIR_PUZZLE = [
+    [":=", ["var", "xyz"], ["var", "abc"]], 
+    ["assert", ["startsWith", ["var", "xyz"], "www"]], 
+    ["assert", ["endsWith", ["var", "xyz"], ".net"]]
+]
+
+def test_client_repair_0 (): 
+    get_fresh_exe_context() 
+
+    llm = FakeListChatModel(responses=['abc_1 = "www.example.com"', 'abc_1 = "www.example.net"'])
+    client = ChatGPTClient(llm=llm)
+    solution, result = client.solve_and_repair_json_statements(json_statements=REPAIR_PUZZLE)
+    assert(solution == {"abc_1": "www.example.net"})
+    assert(result.is_valid)
+
+def test_client_repair_1 (): 
+    get_fresh_exe_context() 
+
+    # the attempt budget is respected and the best answer is kept 
+    llm = FakeListChatModel(responses=['abc_1 = "www.example.com"', 'abc_1 = "ftp"', 'abc_1 = "www.example.net"'])
+    client = ChatGPTClient(llm=llm)
+    solution, result = asyncio.run(client.asolve_and_repair_json_statements(json_statements=REPAIR_PUZZLE, max_attempts=2))
+    assert(solution == {"abc_1": "www.example.com"})
+    assert(len(result.violated) == 1)
+
+def test_client_repair_2 (): 
+    get_fresh_exe_context() 
+
+    # the token budget is respected, for the repair turns 
+    llm = FakeListChatModel(responses=['abc_1 = "www.example.com"', 'abc_1 = "www.example.net"'])
+    client = ChatGPTClient(llm=llm)
+    solution, result = client.solve_and_repair_json_statements(json_statements=REPAIR_PUZZLE, max_total_tokens=200)
+    assert(solution == {"abc_1": "www.example.com"})
+    assert(not result.is_valid)
+
+    # and for the first request 
+    llm = EchoChatModel() 
+    solution, result = ChatGPTClient(llm=llm).solve_and_repair_json_statements(json_statements=REPAIR_PUZZLE, max_total_tokens=10)
+    assert(solution == {} and result.missing_variables != [])
+    assert(llm.n_calls == 0)
+
+class PromptRecordingChatModel (EchoChatModel): 
+    """
+    Also records the text of the messages of every call. 
+    """
+    prompts :List[str] = [] 
+
+    def _say (self, messages, **kwargs): 
+        self.prompts.append("\n".join([message.content for message in messages]))
+        return super()._say(messages, **kwargs)
+
+def test_client_repair_slicing (): 
+    get_fresh_exe_context() 
+
+    # only the failing component is sent again 
+    llm = PromptRecordingChatModel(prompts=[])
+    client = ChatGPTClient(llm=llm, slice_components=True)
+    solution, result = client.solve_and_repair_json_statements(json_statements=[
+        ["assert", ["startsWith", ["var", "abc"], "www"]], 
+        ["assert", ["endsWith", ["var", "xyz"], ".org"]]
+    ], max_attempts=2)
+    assert(solution == {"abc_0": "www.example.net", "xyz_1": "www.example.net"})
+    assert(result.violated != [] and llm.n_calls == 3)
+    assert("xyz_1" in llm.prompts[-1] and "abc_0" not in llm.prompts[-1])
+
+def test_client_repair_cache (): 
+    get_fresh_exe_context() 
+
+    # only a valid answer of the repair loop is cached 
+    cache = SolutionCache() 
+    llm = FakeListChatModel(responses=['abc_1 = "www.example.com"', 'abc_1 = "www.example.net"'])
+    client = ChatGPTClient(llm=llm, cache=cache)
+    solution, result = client.solve_and_repair_json_statements(json_statements=REPAIR_PUZZLE, max_attempts=1)
+    assert(not result.is_valid and len(cache) == 0)
+    solution, result = client.solve_and_repair_json_statements(json_statements=REPAIR_PUZZLE, max_attempts=1)
+    assert(result.is_valid and len(cache) == 1)
+
+# ====
+# Offline tests for the sliced solving 
+# ====
+def test_client_slicing_0 (): 
+    get_fresh_exe_context() 
+
+    llm = EchoChatModel() 
+    client = ChatGPTClient(llm=llm, slice_components=True)
+    json_statements = [
+        ["assert", ["startsWith", ["var", "abc"], "www"]], 
+        ["assert", ["endsWith", ["var", "xyz"], ".net"]]
+    ]
+
+    solution = client.solve_json_statements(json_statements=json_statements)
+    assert(sorted([k.split("_")[0] for k in solution.keys()]) == ["abc", "xyz"])
+    assert(llm.n_calls == 2)
+
+    results = asyncio.run(client.asolve_many([json_statements, json_statements]))
+    assert(all([len(result) == 2 for result in results]))
+    assert(llm.n_calls == 6)
+
+# ====
+# Offline tests for the packed solving 
+# ====
+def test_client_packing_0 (): 
+    get_fresh_exe_context() 
+
+    llm = EchoChatModel() 
+    client = ChatGPTClient(llm=llm)
+    json_statements_list = [
+        [["assert", ["startsWith", ["var", "abc"], "www"]]], 
+        [["assert", ["endsWith", ["var", "abc"], ".net"]], ["assert", ["startsWith", ["var", "xyz"], "www"]]], 
+        [[":=", ["var", "abc"], "foo"]], 
+        [["assert"]]
+    ]
+
+    results = client.solve_many_packed(json_statements_list, max_puzzles_per_pack=8)
+    assert(llm.n_calls == 1)
+    assert(results[0] == {"abc_0": "www.example.net"})
+    assert(results[1] == {"abc_0": "www.example.net", "xyz_1": "www.example.net"})
+    assert(results[2] == {})
+    assert(isinstance(results[3], Exception))
+
+    results = asyncio.run(client.asolve_many_packed(json_statements_list, max_puzzles_per_pack=1))
+    assert(llm.n_calls == 3)
+    assert(results[1] == {"abc_0": "www.example.net", "xyz_1": "www.example.net"})
+
+def test_client_packing_cache (): 
+    get_fresh_exe_context() 
+
+    # every puzzle's answer of a pack is verified before it is cached 
+    llm = PromptRecordingChatModel(prompts=[])
+    client = ChatGPTClient(llm=llm, cache=SolutionCache())
+    json_statements_list = [
+        [["assert", ["startsWith", ["var", "abc"], "www"]]], 
+        [["assert", ["endsWith", ["var", "xyz"], ".org"]]]
+    ]
+    client.solve_many_packed(json_statements_list)
+    assert(llm.n_calls == 1 and len(client.cache) == 1)
+
+    results = client.solve_many_packed(json_statements_list)
+    assert(results == [{"abc_0": "www.example.net"}, {"xyz_0": "www.example.net"}])
+    assert(llm.n_calls == 2 and "abc_0" not in llm.prompts[-1]) # only the wrong answer is asked again 
+
+# ====
+# Offline tests for the streaming solving 
+# ====
+def test_streaming_saying_parser_0 (): 
+    saying_parser = StreamingSayingParser(["abc_0", "xyz_0"])
+    assert(saying_parser.feed('abc_0 = "ww') == [])
+    assert(saying_parser.feed('w"') == []) # the closing quote may not be the last character of the value 
+    assert(saying_parser.feed('\nxyz_0 = foo') == [("abc_0", "www")])
+    assert(not saying_parser.is_complete)
+    assert(saying_parser.close() == [("xyz_0", "foo")])
+    assert(saying_parser.is_complete)
+    assert(saying_parser.solution == {"abc_0": "www", "xyz_0": "foo"})
+
+def test_streaming_saying_parser_split_quote (): 
+    # a chunk ends right after an embedded quote 
+    saying = 'abc_0 = "say "hi" now"\n'
+    saying_parser = StreamingSayingParser(["abc_0"])
+    assert(saying_parser.feed(saying[:14]) == [])
+    assert(saying_parser.feed(saying[14:]) == list(parse_llm_saying(saying).items()))
+    assert(saying_parser.solution == {"abc_0": 'say "hi" now'})
+
+def test_client_streaming_0 (): 
+    get_fresh_exe_context() 
+
+    llm = EchoChatModel(ramble="\nThe answer is correct because " + "blah " * 100)
+    client = ChatGPTClient(llm=llm)
+    json_statements = [
+        ["assert", ["startsWith", ["var", "abc"], "www"]], 
+        ["assert", ["endsWith", ["var", "xyz"], ".net"]]
+    ]
+
+    answers = list(client.stream_json_statements(json_statements, max_tokens=32))
+    assert(answers == [("abc_0", "www.example.net"), ("xyz_1", "www.example.net")])
+    # the ramble is not consumed 
+    assert(llm.n_streamed_chunks < 20)
+    assert(llm.call_kwargs[-1].get("max_tokens") == 32)
+
+    solution = asyncio.run(client.asolve_json_statements_streaming(json_statements))
+    assert(solution == {"abc_0": "www.example.net", "xyz_1": "www.example.net"})
+    assert(llm.n_streamed_chunks < 40)
+
+def test_client_max_tokens_0 (): 
+    llm = EchoChatModel() 
+    client = ChatGPTClient(llm=llm)
+    client.solve_json_statements([["assert", ["startsWith", ["var", "abc"], "www"]]], max_tokens=7)
+    assert(llm.call_kwargs[-1].get("max_tokens") == 7)
+    client.solve_json_statements([["assert", ["startsWith", ["var", "abc"], "www"]]])
+    assert("max_tokens" not in llm.call_kwargs[-1])
+
+# ====
+# Offline tests for the multi-candidate sampling 
+# ====
+class SamplingChatModel (EchoChatModel): 
+    """
+    Answers with the next values of answers, n of them per call if n is given. 
+    """
+    answers :List[str] = [] 
+    n_answered :int = 0 
+    supports_n :bool = True 
+
+    def _generate (self, messages, stop=None, run_manager=None, **kwargs): 
+        n = (kwargs.get("n", 1) if self.supports_n else 1)
+        generations = [] 
+        for _ in range(n): 
+            self.answer = self.answers[self.n_answered % len(self.answers)]
+            self.n_answered += 1 
+            generations.append(ChatGeneration(message=AIMessage(content=self._say(messages, **kwargs))))
+        return ChatResult(generations=generations)
+
+    async def _agenerate (self, messages, stop=None, run_manager=None, **kwargs): 
+        return self._generate(messages, stop=stop, **kwargs)
+
+SAMPLING_PUZZLE = [
+    ["assert", ["startsWith", ["var", "abc"], "www"]], 
+    ["assert", ["endsWith", ["var", "abc"], ".net"]]
+]
+
+def test_client_candidates_0 (): 
+    get_fresh_exe_context() 
+
+    llm = SamplingChatModel(answers=["ftp.example.org", "www.example.org", "www.example.net", "ftp.example.net"])
+    client = ChatGPTClient(llm=llm)
+
+    solution, result = client.solve_with_candidates(SAMPLING_PUZZLE, n_candidates=4, temperature=0.9)
+    assert(solution == {"abc_0": "www.example.net"})
+    assert(result.is_valid)
+    assert(llm.n_calls == 4 and llm.n_answered == 4)
+    assert(llm.call_kwargs[-1]["n"] == 4 and llm.call_kwargs[-1]["temperature"] == 0.9)
+
+    # no valid candidate: the best ranked one 
+    solution, result = client.solve_with_candidates(SAMPLING_PUZZLE, n_candidates=2)
+    assert(solution == {"abc_0": "www.example.org"})
+    assert(len(result.violated) == 1)
+
+def test_client_candidates_1 (): 
+    get_fresh_exe_context() 
+
+    # a backend without n: the candidates are sampled in a batch 
+    llm = SamplingChatModel(answers=["ftp.example.org", "www.example.net"], supports_n=False)
+    client = ChatGPTClient(llm=llm)
+
+    solution, result = asyncio.run(client.asolve_with_candidates(SAMPLING_PUZZLE, n_candidates=3))
+    assert(solution == {"abc_0": "www.example.net"})
+    assert(llm.n_answered == 3)
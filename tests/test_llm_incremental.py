@@ -0,0 +1,85 @@
+import asyncio 
+from aitestgen.llm.client import ChatGPTClient 
+from aitestgen.llm.incremental import IncrementalSolver, canonicalize_component 
+from aitestgen.llm.json_2_prompt import execute_json_statements 
+
+from utils import get_fresh_exe_context, EchoChatModel
+
+import logging
+logging.basicConfig(level=logging.INFO)
+
+PUZZLE = [
+    [":=", ["var", "xyz"], ["var", "abc"]], 
+    ["assert", ["startsWith", ["var", "xyz"], "www"]], 
+    ["assert", ["endsWith", ["var", "foo"], ".net"]], 
+    ["assert", ["endsWith", ["var", "bar"], "example.net"]]
+]
+
+# ====
+# Tests for canonicalize_component
+# ====
+def test_canonicalize_component_0 (): 
+    get_fresh_exe_context() 
+
+    key_0, var_2_canonical = canonicalize_component(execute_json_statements([["assert", ["startsWith", ["var", "abc"], "www"]]]))
+    key_1, _ = canonicalize_component(execute_json_statements([["assert", ["startsWith", ["var", "xyz"], "www"]]]))
+    key_2, _ = canonicalize_component(execute_json_statements([["assert", ["startsWith", ["var", "abc"], "ftp"]]]))
+    assert(key_0 == key_1)
+    assert(key_0 != key_2)
+    assert([(str(var), name) for var, name in var_2_canonical.items()] == [("abc_0", "v0")])
+
+# ====
+# Tests for IncrementalSolver
+# ====
+def test_incremental_solver_0 (): 
+    get_fresh_exe_context() 
+
+    llm = EchoChatModel() 
+    solver = IncrementalSolver(ChatGPTClient(llm=llm))
+
+    solution = solver.solve(PUZZLE)
+    assert(solution == {"abc_1": "www.example.net", "foo_2": "www.example.net", "bar_3": "www.example.net"})
+    assert(llm.n_calls == 3)
+    assert(solver.n_queried_components == 3)
+
+    # the same puzzle: nothing to ask 
+    assert(solver.solve(PUZZLE) == solution)
+    assert(llm.n_calls == 3)
+    assert(solver.n_reused_statements == 4 and solver.n_reused_components == 3)
+
+    # edit the last statement: only its component is asked for 
+    edited_puzzle = PUZZLE[:3] + [["assert", ["startsWith", ["var", "bar"], "www.ex"]]]
+    solution = asyncio.run(solver.asolve(edited_puzzle))
+    assert(solution == {"abc_1": "www.example.net", "foo_2": "www.example.net", "bar_3": "www.example.net"})
+    assert(llm.n_calls == 4)
+    assert(solver.n_reused_statements == 3)
+    assert(solver.n_reused_components == 2 and solver.n_queried_components == 1)
+
+    # insert a statement in front: the ids shift, but the components are remembered 
+    edited_puzzle = [["assert", ["endsWith", ["var", "baz"], ".org"]]] + edited_puzzle 
+    solution = solver.solve(edited_puzzle)
+    assert(sorted(solution.keys()) == ["abc_2", "bar_4", "baz_0", "foo_3"])
+    assert(llm.n_calls == 5)
+    assert(solver.n_reused_statements == 0)
+    assert(solver.n_reused_components == 3 and solver.n_queried_components == 1)
+
+def test_incremental_solver_1 (): 
+    get_fresh_exe_context() 
+
+    solver = IncrementalSolver(ChatGPTClient(llm=EchoChatModel()))
+    exe_context = solver.interpret(PUZZLE)
+    assert(len(solver.exe_contexts) == 5)
+    assert(solver.interpret(PUZZLE[:2]) is solver.exe_contexts[2])
+    assert(len(exe_context.executed_statements) == 4)
+
+def test_incremental_solver_invalid_answer (): 
+    get_fresh_exe_context() 
+
+    # a wrong answer is not remembered, so the next solve asks again 
+    llm = EchoChatModel(answer="zzz")
+    solver = IncrementalSolver(ChatGPTClient(llm=llm))
+    puzzle = [["assert", ["startsWith", ["var", "abc"], "www"]]]
+    assert(solver.solve(puzzle) == {"abc_0": "zzz"})
+    assert(solver.solve(puzzle) == {"abc_0": "zzz"})
+    assert(llm.n_calls == 2)
+    assert(solver.n_reused_components == 0 and solver.n_queried_components == 1)
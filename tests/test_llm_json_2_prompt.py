@@ -19,4 +19,14 @@ def test_generate_prompt_from_json_statements_0 ():
     )
 
     # logging.info(final_prompt)
-    
\ No newline at end of file
+    
+def test_generate_prompt_from_json_statements_1 (): 
+    get_fresh_exe_context() 
+
+    final_prompt = json_2_prompt.generate_prompt_from_json_statements(
+        json_statements=[
+            [":=", ["var", "xyz"], ["subStr", ["var", "abc"], 0, None]], 
+            ["assert", ["startsWith", ["var", "xyz"], "www"]]
+        ]
+    )
+    assert("variable xyz_0 is the sub-string of variable abc_1 starting from the 1st character" in final_prompt)
@@ -0,0 +1,61 @@
+from aitestgen.llm.json_2_prompt import execute_json_statements 
+from aitestgen.llm.packing import generate_packed_prompt, parse_packed_saying, plan_packs 
+from aitestgen.llm.packing import MissingPackedAnswerError 
+
+from utils import get_fresh_exe_context
+
+import logging
+logging.basicConfig(level=logging.INFO)
+
+# ====
+# Tests for generate_packed_prompt
+# ====
+def test_generate_packed_prompt_0 (): 
+    get_fresh_exe_context() 
+
+    exe_contexts = [
+        execute_json_statements([["assert", ["startsWith", ["var", "abc"], "www"]]]), 
+        execute_json_statements([["assert", ["endsWith", ["var", "abc"], ".net"]]])
+    ]
+    prompt = generate_packed_prompt(exe_contexts)
+    logging.info(prompt)
+
+    # one block per puzzle and one answer section per puzzle 
+    assert(prompt.count("[puzzle 1]") == 2)
+    assert(prompt.count("[puzzle 2]") == 2)
+    assert(prompt.count("abc_0 = <answer>") == 2)
+    assert(prompt.index("www") < prompt.index("[puzzle 2]"))
+
+# ====
+# Tests for parse_packed_saying
+# ====
+def test_parse_packed_saying_0 (): 
+    saying = """[puzzle 1]
+abc_0 = "www.google.com"
+
+[puzzle 2]
+abc_0 = "example.net"
+xyz_0 = "foo"
+"""
+    assert(parse_packed_saying(saying, n_puzzles=2) == [
+        {"abc_0": "www.google.com"}, 
+        {"abc_0": "example.net", "xyz_0": "foo"}
+    ])
+
+def test_parse_packed_saying_1 (): 
+    results = parse_packed_saying('[puzzle 2]\nabc_0 = "bar"', n_puzzles=2)
+    assert(isinstance(results[0], MissingPackedAnswerError))
+    assert(results[1] == {"abc_0": "bar"})
+
+# ====
+# Tests for plan_packs
+# ====
+def test_plan_packs_0 (): 
+    exe_contexts = [
+        execute_json_statements([["assert", ["startsWith", ["var", "abc"], "www"]]]) 
+        for _ in range(5)
+    ]
+    assert(plan_packs(exe_contexts, max_puzzles_per_pack=2) == [[0, 1], [2, 3], [4]])
+    assert(plan_packs(exe_contexts, max_prompt_tokens=1) == [[0], [1], [2], [3], [4]])
+    assert(plan_packs(exe_contexts, max_completion_tokens=50) == [[0, 1], [2, 3], [4]])
+    assert(plan_packs([]) == [])
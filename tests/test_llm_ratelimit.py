@@ -0,0 +1,166 @@
+import asyncio
+import pytest
+from types import SimpleNamespace
+from uuid import uuid4
+
+from langchain_core.messages import AIMessage
+from langchain_core.outputs import ChatGeneration, LLMResult
+
+from aitestgen.llm.client import ChatGPTClient
+from aitestgen.llm.ratelimit import TokenBucket, RateLimitScheduler, RateLimitCallbackHandler
+from aitestgen.llm.ratelimit import PRIORITY_INTERACTIVE, PRIORITY_BATCH, rate_limit_priority, get_rate_limit_priority
+from aitestgen.llm.ratelimit import parse_reset_duration, retry_after_seconds
+
+from utils import EchoChatModel
+
+import logging
+logging.basicConfig(level=logging.INFO)
+
+class FakeClock :
+    def __init__ (self):
+        self.now = 0.0
+
+    def __call__ (self) -> float:
+        return self.now
+
+# ====
+# Tests for TokenBucket
+# ====
+def test_token_bucket_0 ():
+    bucket = TokenBucket.per_minute(60, now=0.0)
+    assert(bucket.time_until(60, now=0.0) == 0.0)
+    bucket.consume(60)
+    assert(bucket.time_until(1, now=0.0) == pytest.approx(1.0))
+    assert(bucket.time_until(1, now=1.0) == 0.0)
+    assert(bucket.time_until(600, now=1.0) == pytest.approx(59.0)) # capped at the capacity
+
+    bucket.set_limit_per_minute(30, now=60.0)
+    assert(bucket.capacity == 30 and bucket.level == 30)
+    bucket.set_remaining(5, now=60.0)
+    assert(bucket.level == 5)
+
+# ====
+# Tests for RateLimitScheduler
+# ====
+def test_rate_limit_scheduler_budgets ():
+    clock = FakeClock()
+    scheduler = RateLimitScheduler(requests_per_minute=2, tokens_per_minute=600, clock=clock)
+    scheduler.acquire(100)
+    scheduler.acquire(100)
+
+    ticket = scheduler._enqueue(100, PRIORITY_INTERACTIVE)
+    assert(scheduler._try_acquire(ticket) == pytest.approx(30.0)) # no request left
+    clock.now = 30.0
+    assert(scheduler._try_acquire(ticket) == 0.0)
+    assert(scheduler.stats()["granted"] == 3)
+
+    scheduler = RateLimitScheduler(tokens_per_minute=600, clock=clock)
+    scheduler.acquire(550)
+    ticket = scheduler._enqueue(100, PRIORITY_INTERACTIVE)
+    assert(scheduler._try_acquire(ticket) == pytest.approx(5.0)) # 50 tokens left, 10 tokens per second
+
+def test_rate_limit_scheduler_priority ():
+    clock = FakeClock()
+    scheduler = RateLimitScheduler(requests_per_minute=1, clock=clock)
+    scheduler.acquire()
+
+    batch_ticket = scheduler._enqueue(0, PRIORITY_BATCH)
+    with rate_limit_priority(PRIORITY_INTERACTIVE):
+        interactive_ticket = scheduler._enqueue(0, None)
+    clock.now = 60.0
+    assert(scheduler._try_acquire(batch_ticket) > 0) # the interactive request goes first
+    assert(scheduler._try_acquire(interactive_ticket) == 0.0)
+    clock.now = 120.0
+    assert(scheduler._try_acquire(batch_ticket) == 0.0)
+
+def test_rate_limit_scheduler_pause ():
+    clock = FakeClock()
+    scheduler = RateLimitScheduler(clock=clock)
+    scheduler.pause(2.0)
+    ticket = scheduler._enqueue(0, None)
+    assert(scheduler._try_acquire(ticket) == pytest.approx(2.0))
+    clock.now = 2.0
+    assert(scheduler._try_acquire(ticket) == 0.0)
+    assert(scheduler.stats()["rate_limited"] == 1)
+
+def test_rate_limit_scheduler_headers ():
+    clock = FakeClock()
+    scheduler = RateLimitScheduler(tokens_per_minute=1000, clock=clock)
+    scheduler.update_from_headers({
+        "X-RateLimit-Limit-Requests": "500",
+        "X-RateLimit-Remaining-Requests": "499",
+        "x-ratelimit-limit-tokens": "2000",
+        "x-ratelimit-remaining-tokens": "100"
+    })
+    stats = scheduler.stats()
+    assert(stats["requests_per_minute"] == 500 and stats["tokens_per_minute"] == 2000)
+    assert(scheduler.request_bucket.level == 499 and scheduler.token_bucket.level == 100)
+
+def test_rate_limit_scheduler_async ():
+    async def run ():
+        scheduler = RateLimitScheduler(requests_per_minute=600) # 10 per second once the burst is spent
+        scheduler.request_bucket.level = 0
+        await asyncio.gather(*[scheduler.aacquire() for _ in range(2)])
+        stats = scheduler.stats()
+        assert(stats["granted"] == 2 and stats["delayed"] == 2 and stats["waiting"] == 0)
+        assert(stats["total_wait_seconds"] >= 0.2)
+
+    asyncio.run(run())
+
+def test_parse_rate_limit_headers ():
+    assert(parse_reset_duration("6m0s") == 360.0)
+    assert(parse_reset_duration("1.5s") == 1.5)
+    assert(parse_reset_duration("20ms") == pytest.approx(0.02))
+    assert(parse_reset_duration("1h2m") == 3720.0)
+    assert(parse_reset_duration("soon") is None)
+
+    assert(retry_after_seconds({"retry-after-ms": "250", "retry-after": "1"}) == 0.25)
+    assert(retry_after_seconds({"Retry-After": "3"}) == 3.0)
+    assert(retry_after_seconds({"x-ratelimit-reset-requests": "1s", "x-ratelimit-reset-tokens": "6m0s"}) == 360.0)
+    assert(retry_after_seconds({}) is None)
+
+# ====
+# Tests for RateLimitCallbackHandler
+# ====
+def test_rate_limit_callback_handler ():
+    clock = FakeClock()
+    scheduler = RateLimitScheduler(clock=clock)
+    handler = RateLimitCallbackHandler(scheduler)
+
+    message = AIMessage(content="abc_0 = \"www\"", response_metadata={"headers": {"x-ratelimit-limit-requests": "60"}})
+    handler.on_llm_end(LLMResult(generations=[[ChatGeneration(message=message)]]), run_id=uuid4())
+    assert(scheduler.stats()["requests_per_minute"] == 60)
+
+    handler.on_llm_error(ValueError("not a rate limit"), run_id=uuid4())
+    assert(scheduler.paused_until == 0.0)
+    rate_limited = SimpleNamespace(status_code=429, response=SimpleNamespace(status_code=429, headers={"retry-after": "5"}))
+    handler.on_llm_error(rate_limited, run_id=uuid4())
+    assert(scheduler.paused_until == 5.0)
+
+# ====
+# Tests for the rate limiting in ChatGPTClient
+# ====
+def test_client_rate_limiter ():
+    scheduler = RateLimitScheduler(requests_per_minute=600, tokens_per_minute=100000)
+    chatgpt_client = ChatGPTClient(llm=EchoChatModel(), rate_limiter=scheduler, default_max_tokens=64)
+
+    level = scheduler.token_bucket.level
+    solution = chatgpt_client.solve_json_statements([["assert", ["startsWith", ["var", "abc"], "www"]]])
+    assert(solution == {"abc_0": "www.example.net"})
+    assert(scheduler.stats()["granted"] == 1)
+    assert(level - scheduler.token_bucket.level > 64) # the prompt tokens and the completion budget
+
+    lanes = []
+    original_enqueue = scheduler._enqueue
+    def enqueue (n_tokens, priority):
+        lanes.append(get_rate_limit_priority() if priority is None else priority)
+        return original_enqueue(n_tokens, priority)
+    scheduler._enqueue = enqueue
+
+    results = chatgpt_client.solve_many([
+        [["assert", ["startsWith", ["var", "abc"], "ftp"]]],
+        [["assert", ["endsWith", ["var", "xyz"], ".net"]]]
+    ])
+    assert(all([isinstance(result, dict) for result in results]))
+    assert(lanes == [PRIORITY_BATCH, PRIORITY_BATCH])
+    assert(scheduler.stats()["granted"] == 3)
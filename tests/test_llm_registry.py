@@ -0,0 +1,47 @@
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
+from aitestgen.llm.registry import ClientRegistry, hash_api_key 
+
+import logging
+logging.basicConfig(level=logging.INFO)
+
+# ====
+# Tests for ClientRegistry
+# ====
+def test_client_registry_0 (): 
+    registry = ClientRegistry(max_connections=4, max_keepalive_connections=2)
+
+    client_0 = registry.get_client(openai_api_key="sk-test-0", model="gpt-4o-mini")
+    assert(registry.get_client(openai_api_key="sk-test-0", model="gpt-4o-mini") is client_0)
+    assert(registry.get_client(openai_api_key="sk-test-1", model="gpt-4o-mini") is not client_0)
+    assert(registry.get_client(openai_api_key="sk-test-0", model="gpt-4o") is not client_0)
+    assert(registry.get_client(openai_api_key="sk-test-0", model="gpt-4o-mini", default_max_tokens=64) is not client_0)
+    assert(len(registry) == 4)
+
+    # one connection pool for all the clients 
+    client_1 = registry.get_client(openai_api_key="sk-test-1", model="gpt-4o-mini")
+    assert(client_0.llm.http_client is client_1.llm.http_client)
+
+    # the keys are hashed 
+    assert(all(["sk-test" not in str(key) for key in registry._clients.keys()]))
+    assert(hash_api_key("sk-test-0") != hash_api_key("sk-test-1"))
+
+    registry.close() 
+    assert(len(registry) == 0)
+
+def test_client_registry_1 (): 
+    registry = ClientRegistry() 
+    with ThreadPoolExecutor(max_workers=8) as executor: 
+        clients = list(executor.map(lambda _: registry.get_client(openai_api_key="sk-test-0"), range(32)))
+    assert(all([client is clients[0] for client in clients]))
+    assert(len(registry) == 1)
+
+def test_client_registry_aclose (): 
+    registry = ClientRegistry() 
+    client = registry.get_client(openai_api_key="sk-test-0")
+    http_client, http_async_client = registry._http_client, registry._http_async_client
+
+    asyncio.run(registry.aclose())
+    assert(len(registry) == 0)
+    assert(http_client.is_closed and http_async_client.is_closed)
+    assert(registry.get_client(openai_api_key="sk-test-0") is not client) # new pools on next use 
@@ -0,0 +1,122 @@
+import os 
+import asyncio 
+import tempfile 
+import pytest 
+from langchain_core.messages import HumanMessage
+from langchain_core.outputs import ChatResult
+from langchain_openai.chat_models import ChatOpenAI
+from aitestgen.llm.replay import RecordingLLMClient, ReplayLLMClient, RecordingStore, ReplayMissError 
+from aitestgen.llm.replay import RecordingChatModel, ReplayChatModel, compute_recording_key, get_model_params 
+from aitestgen.llm.stub import StubChatModel 
+
+from utils import get_fresh_exe_context
+
+import logging
+logging.basicConfig(level=logging.INFO)
+
+PUZZLES = [
+    [["assert", ["startsWith", ["var", "abc"], "www"]]], 
+    [["assert", ["endsWith", ["var", "abc"], ".net"]], ["assert", ["startsWith", ["var", "xyz"], "ftp"]]]
+]
+
+# ====
+# Tests for the record/replay backend 
+# ====
+def test_record_replay_0 (): 
+    get_fresh_exe_context() 
+
+    with tempfile.TemporaryDirectory() as tmp_dir: 
+        store_path = os.path.join(tmp_dir, "recording.jsonl")
+
+        stub_llm = StubChatModel(answer="www.recorded.net")
+        recording_client = RecordingLLMClient(store_path, llm=stub_llm)
+        recorded = recording_client.solve_many(PUZZLES)
+        recorded.append(recording_client.solve_json_statements(PUZZLES[0], max_tokens=16))
+        assert(stub_llm.n_calls == 3)
+        assert(len(RecordingStore(store_path)) == 3)
+
+        replay_client = ReplayLLMClient(store_path, latency_seconds=0.01, jitter_seconds=0.01, model_params=get_model_params(stub_llm))
+        assert(replay_client.solve_many(PUZZLES) == recorded[:2])
+        assert(asyncio.run(replay_client.asolve_json_statements(PUZZLES[1])) == recorded[1])
+        assert(replay_client.solve_json_statements(PUZZLES[0], max_tokens=16) == recorded[2])
+        assert(replay_client.llm.n_hits == 4)
+
+        # unrecorded prompts 
+        with pytest.raises(ReplayMissError): 
+            replay_client.solve_json_statements([["assert", ["endsWith", ["var", "foo"], ".org"]]])
+
+        fallback_client = ReplayLLMClient(store_path, fallback=StubChatModel(answer="fallback.org"), model_params=get_model_params(stub_llm))
+        assert(fallback_client.solve_json_statements([["assert", ["endsWith", ["var", "foo"], ".org"]]]) == {"foo_0": "fallback.org"})
+        assert(fallback_client.llm.n_misses == 1)
+
+def test_replay_jitter_0 (): 
+    messages = [HumanMessage(content="abc_0 = <answer>")]
+    with tempfile.TemporaryDirectory() as tmp_dir: 
+        store = RecordingStore(os.path.join(tmp_dir, "recording.jsonl"))
+        store.put(compute_recording_key(messages), 'abc_0 = "www"')
+
+        def replay_delay (seed :int) -> float: 
+            return ReplayChatModel(store=store, latency_seconds=0.5, jitter_seconds=0.25, seed=seed)._lookup(messages)["delay"]
+
+        assert(0.5 <= replay_delay(0) < 0.75)
+        assert(replay_delay(0) == replay_delay(0))
+        assert(replay_delay(0) != replay_delay(1))
+
+class TwoAnswerChatModel (StubChatModel): 
+    """
+    Answers every call with two generations, as a call with n=2 does. 
+    """
+    def _generate (self, messages, stop=None, run_manager=None, **kwargs): 
+        chat_result = super()._generate(messages, stop=stop, run_manager=run_manager, **kwargs)
+        return ChatResult(generations=chat_result.generations * 2)
+
+def test_recording_chat_model_0 (): 
+    messages = [HumanMessage(content="abc_0 = <answer>")]
+    with tempfile.TemporaryDirectory() as tmp_dir: 
+        store = RecordingStore(os.path.join(tmp_dir, "recording.jsonl"))
+
+        # the wrapped model's result is forwarded intact 
+        message = RecordingChatModel(llm=StubChatModel(), store=store).invoke(messages)
+        assert(message.content == 'abc_0 = "www.example.net"')
+        assert(message.usage_metadata["output_tokens"] > 0)
+
+        # every generation is recorded, and replayed 
+        chat_result = RecordingChatModel(llm=TwoAnswerChatModel(), store=store)._generate(messages, n=2)
+        assert(len(chat_result.generations) == 2)
+        assert(store.get(compute_recording_key(messages, n=2)) == ['abc_0 = "www.example.net"'] * 2)
+        replayed = ReplayChatModel(store=RecordingStore(store.path))._generate(messages, n=2)
+        assert([generation.message.content for generation in replayed.generations] == ['abc_0 = "www.example.net"'] * 2)
+
+class NamedStubChatModel (StubChatModel): 
+    """
+    The stub chat model, identified as an OpenAI one. 
+    """
+    model_name :str = "gpt-4o-mini" 
+
+    @property
+    def _identifying_params (self): 
+        return {"model_name": self.model_name, "temperature": 0.0}
+
+def test_recording_key_model_0 (): 
+    get_fresh_exe_context() 
+    messages = [HumanMessage(content="abc_0 = <answer>")]
+    openai_llm = ChatOpenAI(model="gpt-4o-mini", temperature=0.0, api_key="sk-unused")
+    assert(get_model_params(openai_llm) == {"model": "gpt-4o-mini", "temperature": 0.0})
+
+    # the recordings of different models or temperatures do not collide 
+    keys = [
+        compute_recording_key(messages), 
+        compute_recording_key(messages, model_params=get_model_params(openai_llm)), 
+        compute_recording_key(messages, model_params={"model": "gpt-4o", "temperature": 0.0}), 
+        compute_recording_key(messages, model_params={"model": "gpt-4o-mini", "temperature": 1.0})
+    ]
+    assert(len(set(keys)) == len(keys))
+
+    with tempfile.TemporaryDirectory() as tmp_dir: 
+        store_path = os.path.join(tmp_dir, "recording.jsonl")
+        recorded = RecordingLLMClient(store_path, llm=NamedStubChatModel(), model="gpt-4o-mini").solve_json_statements(PUZZLES[0])
+
+        # by default, the replay is keyed by the chat model of the client settings 
+        assert(ReplayLLMClient(store_path, model="gpt-4o-mini").solve_json_statements(PUZZLES[0]) == recorded)
+        with pytest.raises(ReplayMissError): 
+            ReplayLLMClient(store_path, model="gpt-4o").solve_json_statements(PUZZLES[0])
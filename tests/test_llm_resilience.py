@@ -0,0 +1,121 @@
+import time 
+import asyncio 
+import random 
+import pytest 
+from typing import Any, List 
+from aitestgen.instrumentation import Instrumentation, StatsInstrument 
+from aitestgen.llm.client import ChatGPTClient 
+from aitestgen.llm.resilience import RetryPolicy, HedgePolicy, ResilientCaller, DeadlineExceededError 
+from aitestgen.llm.stub import StubChatModel 
+
+from utils import get_fresh_exe_context
+
+import logging
+logging.basicConfig(level=logging.INFO)
+
+JSON_STATEMENTS = [["assert", ["startsWith", ["var", "abc"], "www"]]]
+
+class ScriptedChatModel (StubChatModel): 
+    """
+    The i-th call waits script[i] seconds, or raises script[i] if it is an exception (the calls past the script are instant). 
+    """
+    script :List[Any] = [] 
+    n_steps :int = 0 
+
+    def _next_step (self) -> Any: 
+        i_step = self.n_steps 
+        self.n_steps += 1 
+        return (self.script[i_step] if i_step < len(self.script) else 0.0)
+
+    def _generate (self, messages, stop=None, run_manager=None, **kwargs): 
+        step = self._next_step() 
+        if (isinstance(step, Exception)): 
+            raise step 
+        time.sleep(step)
+        return super()._generate(messages, stop=stop, run_manager=run_manager, **kwargs)
+
+    async def _agenerate (self, messages, stop=None, run_manager=None, **kwargs): 
+        step = self._next_step() 
+        if (isinstance(step, Exception)): 
+            raise step 
+        await asyncio.sleep(step)
+        return await super()._agenerate(messages, stop=stop, run_manager=run_manager, **kwargs)
+
+def make_client (script :List[Any], stats :StatsInstrument, **client_kwargs) -> ChatGPTClient: 
+    return ChatGPTClient(
+        llm=ScriptedChatModel(script=script), 
+        instrumentation=Instrumentation([stats]), 
+        **client_kwargs
+    )
+
+# ====
+# Tests for the retry policy 
+# ====
+def test_retry_policy_0 (): 
+    retry_policy = RetryPolicy(initial_backoff=1.0, max_backoff=3.0)
+    rng = random.Random(0)
+    assert(all([0 <= retry_policy.backoff(0, rng) < 1.0 for _ in range(100)]))
+    assert(all([0 <= retry_policy.backoff(5, rng) < 3.0 for _ in range(100)]))
+    assert(retry_policy.is_retryable(ConnectionError()))
+    assert(not retry_policy.is_retryable(ValueError()))
+    assert(RetryPolicy() == RetryPolicy() and hash(RetryPolicy()) == hash(RetryPolicy()))
+
+def test_retry_0 (): 
+    get_fresh_exe_context() 
+
+    stats = StatsInstrument() 
+    client = make_client([ConnectionError("reset"), ConnectionError("reset")], stats, retry_policy=RetryPolicy(initial_backoff=0.01))
+    assert(client.solve_json_statements(JSON_STATEMENTS) == {"abc_0": "www.example.net"})
+    assert(stats.snapshot()["counters"]["retries"] == 2)
+
+    # non-retryable errors and exhausted attempts surface 
+    client = make_client([ValueError("bad")], StatsInstrument(), retry_policy=RetryPolicy(initial_backoff=0.01))
+    with pytest.raises(ValueError): 
+        client.solve_json_statements(JSON_STATEMENTS)
+    client = make_client([ConnectionError("reset")] * 3, StatsInstrument(), retry_policy=RetryPolicy(initial_backoff=0.01))
+    with pytest.raises(ConnectionError): 
+        asyncio.run(client.asolve_json_statements(JSON_STATEMENTS))
+
+# ====
+# Tests for the deadlines 
+# ====
+def test_deadline_0 (): 
+    get_fresh_exe_context() 
+
+    stats = StatsInstrument() 
+    client = make_client([1.0], stats, timeout=0.05)
+    with pytest.raises(DeadlineExceededError): 
+        asyncio.run(client.asolve_json_statements(JSON_STATEMENTS))
+
+    # a stalled call is retried 
+    client = make_client([1.0], stats, timeout=0.05, retry_policy=RetryPolicy(initial_backoff=0.01))
+    time_start = time.perf_counter() 
+    assert(client.solve_json_statements(JSON_STATEMENTS) == {"abc_0": "www.example.net"})
+    assert(time.perf_counter() - time_start < 0.5)
+    assert(stats.snapshot()["counters"]["deadlines_exceeded"] == 2)
+
+# ====
+# Tests for the hedging 
+# ====
+def test_hedging_0 (): 
+    get_fresh_exe_context() 
+
+    stats = StatsInstrument() 
+    hedge_policy = HedgePolicy(initial_delay=0.05)
+    client = make_client([1.0], stats, hedge_policy=hedge_policy)
+    time_start = time.perf_counter() 
+    assert(asyncio.run(client.asolve_json_statements(JSON_STATEMENTS)) == {"abc_0": "www.example.net"})
+    assert(time.perf_counter() - time_start < 0.5)
+
+    client = make_client([1.0], stats, hedge_policy=hedge_policy)
+    time_start = time.perf_counter() 
+    assert(client.solve_json_statements(JSON_STATEMENTS) == {"abc_0": "www.example.net"})
+    assert(time.perf_counter() - time_start < 0.5)
+    assert(stats.snapshot()["counters"]["hedges"] == 2)
+
+def test_hedge_delay_0 (): 
+    caller = ResilientCaller(hedge_policy=HedgePolicy(percentile=90, initial_delay=2.0, min_samples=10))
+    assert(caller.hedge_delay() == 2.0)
+    for i in range(100): 
+        caller.latency_tracker.record(i / 100)
+    assert(0.85 <= caller.hedge_delay() <= 0.95)
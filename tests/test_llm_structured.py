@@ -0,0 +1,140 @@
+import json
+import asyncio
+import pytest
+
+from langchain_core.language_models import FakeListChatModel
+
+from aitestgen.ir.evaluator import verify_solution
+from aitestgen.llm.client import ChatGPTClient
+from aitestgen.llm.ratelimit import RateLimitScheduler
+from aitestgen.llm.json_2_prompt import execute_json_statements, generate_prompt_from_execution_context, ANSWER_FORMAT_JSON, ANSWER_FORMAT_TEXT
+from aitestgen.llm.structured import AnswerFormatError, StreamingJSONAnswerParser
+from aitestgen.llm.structured import build_response_format, parse_json_answer, dump_solution_to_json_answer
+
+from utils import get_fresh_exe_context, EchoChatModel
+
+import logging
+logging.basicConfig(level=logging.INFO)
+
+def get_unbounded_variables (json_statements):
+    get_fresh_exe_context()
+    return execute_json_statements(json_statements).unbounded_variables
+
+PUZZLE_0 = [
+    ["assert", ["startsWith", ["var", "abc"], "www"]],
+    ["assert", ["endsWith", ["var", "xyz"], ".net"]]
+]
+
+# ====
+# Tests for the answer schema and the prompt
+# ====
+def test_build_response_format_0 ():
+    response_format = build_response_format(get_unbounded_variables(PUZZLE_0))
+    schema = response_format["json_schema"]["schema"]
+    assert(response_format["type"] == "json_schema" and response_format["json_schema"]["strict"])
+    assert(schema["properties"] == {"abc_0": {"type": "string"}, "xyz_1": {"type": "string"}})
+    assert(schema["required"] == ["abc_0", "xyz_1"] and schema["additionalProperties"] is False)
+
+def test_generate_prompt_json_0 ():
+    get_fresh_exe_context()
+    exe_context = execute_json_statements(PUZZLE_0)
+    prompt = generate_prompt_from_execution_context(exe_context, answer_format=ANSWER_FORMAT_JSON)
+    assert('{"abc_0": "<answer>", "xyz_1": "<answer>"}' in prompt)
+    assert("abc_0 = <answer>" not in prompt)
+
+# ====
+# Tests for parse_json_answer
+# ====
+def test_parse_json_answer_0 ():
+    abc, xyz = get_unbounded_variables(PUZZLE_0)
+
+    # the values the text format corrupts
+    solution = parse_json_answer(json.dumps({"abc_0": 'a = "b"\nc', "xyz_1": "x\\y"}), [abc, xyz])
+    assert(solution == {abc: 'a = "b"\nc', xyz: "x\\y"})
+
+    # code fences, unknown keys, and non-string values
+    solution = parse_json_answer('```json\n{"abc_0": 42, "pqr_9": "?", "xyz_1": null}\n```', [abc, xyz])
+    assert(solution == {abc: "42"})
+
+    # the objects of several components are merged, and a broken brace is skipped
+    solution = parse_json_answer('{"abc_0": "www"} and {oops\n{"xyz_1": ".net"}', [abc, xyz])
+    assert(solution == {abc: "www", xyz: ".net"})
+
+    # the answer round-trips
+    assert(parse_json_answer(dump_solution_to_json_answer(solution), [abc, xyz]) == solution)
+
+    with pytest.raises(AnswerFormatError):
+        parse_json_answer('abc_0 = "www"', [abc, xyz])
+
+def test_streaming_json_answer_parser_0 ():
+    abc, xyz = get_unbounded_variables(PUZZLE_0)
+
+    saying_parser = StreamingJSONAnswerParser([abc, xyz])
+    assert(saying_parser.feed('{"abc_0": "{www}", ') == []) # a brace in a value does not close the object
+    assert(not saying_parser.is_complete)
+    assert(saying_parser.feed('"xyz_1": ".net"} and more') == [("abc_0", "{www}"), ("xyz_1", ".net")])
+    assert(saying_parser.is_complete and saying_parser.close() == [])
+
+    saying_parser = StreamingJSONAnswerParser([abc, xyz])
+    saying_parser.feed('{"abc_0": "www"}')
+    assert(saying_parser.close() == [("abc_0", "www")]) # a partial answer is kept at the end
+
+# ====
+# Tests for the JSON answer format in ChatGPTClient
+# ====
+def test_client_json_0 ():
+    get_fresh_exe_context()
+    llm = EchoChatModel(ramble="\nThe answer is correct.")
+    client = ChatGPTClient(llm=llm, answer_format=ANSWER_FORMAT_JSON)
+
+    solution = client.solve_json_statements(PUZZLE_0)
+    assert(solution == {"abc_0": "www.example.net", "xyz_1": "www.example.net"})
+    assert(llm.call_kwargs[-1]["response_format"]["json_schema"]["schema"]["required"] == ["abc_0", "xyz_1"])
+
+    # the solution keyed by variables goes straight to the evaluator
+    exe_context, var_solution = client.solve_json_statements_to_variables(PUZZLE_0)
+    assert(list(var_solution.keys()) == list(exe_context.unbounded_variables))
+    assert(len(verify_solution(exe_context, var_solution).violated) == 0)
+
+    results = asyncio.run(client.asolve_many([PUZZLE_0, [["assert"]]], max_tokens=64))
+    assert(results[0] == solution and isinstance(results[1], AssertionError))
+    assert(llm.call_kwargs[-1]["max_tokens"] == 64)
+
+def test_client_json_1 ():
+    get_fresh_exe_context()
+
+    # every component gets its own schema
+    llm = EchoChatModel()
+    client = ChatGPTClient(llm=llm, answer_format=ANSWER_FORMAT_JSON, slice_components=True)
+    solution = client.solve_json_statements(PUZZLE_0)
+    assert(solution == {"abc_0": "www.example.net", "xyz_1": "www.example.net"})
+    assert(llm.n_calls == 2)
+    assert(sorted([list(kwargs["response_format"]["json_schema"]["schema"]["properties"]) for kwargs in llm.call_kwargs[-2:]]) == [["abc_0"], ["xyz_1"]])
+
+    # the streamed answer
+    client = ChatGPTClient(llm=llm, answer_format=ANSWER_FORMAT_JSON)
+    assert(client.solve_json_statements_streaming(PUZZLE_0) == solution)
+
+def test_client_json_repair_0 ():
+    get_fresh_exe_context()
+
+    llm = FakeListChatModel(responses=['{"abc_1": "www.example.com"}', 'not an answer', '{"abc_1": "www.example.net"}'])
+    client = ChatGPTClient(llm=llm, answer_format=ANSWER_FORMAT_JSON)
+    solution, result = client.solve_and_repair_json_statements(json_statements=[
+        [":=", ["var", "xyz"], ["var", "abc"]],
+        ["assert", ["startsWith", ["var", "xyz"], "www"]],
+        ["assert", ["endsWith", ["var", "xyz"], ".net"]]
+    ])
+    assert(solution == {"abc_1": "www.example.net"})
+    assert(result.is_valid)
+
+    client = ChatGPTClient(llm=FakeListChatModel(responses=['abc_0 = "www"']), answer_format=ANSWER_FORMAT_JSON)
+    with pytest.raises(AnswerFormatError):
+        client.solve_json_statements([["assert", ["startsWith", ["var", "abc"], "www"]]])
+
+def test_client_json_rate_limit_headers ():
+    # ChatOpenAI cannot report the response headers of the requests with a response_format
+    for answer_format, is_included in [(ANSWER_FORMAT_TEXT, True), (ANSWER_FORMAT_JSON, False)]:
+        client = ChatGPTClient(openai_api_key="sk-test", rate_limiter=RateLimitScheduler(), answer_format=answer_format)
+        assert(client.llm.include_response_headers == is_included)
+    assert(not ChatGPTClient(openai_api_key="sk-test").llm.include_response_headers)
@@ -0,0 +1,35 @@
+import time 
+import asyncio 
+from aitestgen.llm.client import ChatGPTClient 
+from aitestgen.llm.stub import StubChatModel 
+
+from utils import get_fresh_exe_context
+
+import logging
+logging.basicConfig(level=logging.INFO)
+
+# ====
+# Tests for StubChatModel
+# ====
+def test_stub_chat_model_0 (): 
+    get_fresh_exe_context() 
+
+    llm = StubChatModel(latency_seconds=0.05)
+    client = ChatGPTClient(llm=llm)
+    json_statements = [
+        [":=", ["var", "xyz"], ["var", "abc"]], 
+        ["assert", ["startsWith", ["var", "xyz"], "www"]]
+    ]
+
+    time_start = time.perf_counter() 
+    solution, result = client.solve_and_verify_json_statements(json_statements)
+    assert(time.perf_counter() - time_start >= 0.05)
+    assert(solution == {"abc_1": "www.example.net"})
+    assert(result.is_valid)
+
+    # the latency of concurrent calls overlaps 
+    time_start = time.perf_counter() 
+    results = asyncio.run(client.asolve_many([json_statements] * 8, max_concurrency=8))
+    assert(time.perf_counter() - time_start < 0.05 * 4)
+    assert(all([result == {"abc_1": "www.example.net"} for result in results]))
+    assert(llm.n_calls == 9)
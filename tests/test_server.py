@@ -0,0 +1,182 @@
+import json
+import asyncio
+import pytest
+
+from aitestgen.cli import build_arg_parser
+from aitestgen.llm.client import ChatGPTClient
+from aitestgen.llm.registry import ClientRegistry
+from aitestgen.server import SingleFlight, SolveService, SolveServer, ServiceOverloadedError, InvalidPuzzleError, error_to_status
+from aitestgen.llm.replay import ReplayMissError
+from aitestgen.instrumentation import Instrumentation, StatsInstrument
+
+from utils import EchoChatModel
+
+import logging
+logging.basicConfig(level=logging.INFO)
+
+PUZZLE_0 = [["assert", ["startsWith", ["var", "abc"], "www"]]]
+PUZZLE_1 = [["assert", ["endsWith", ["var", "xyz"], ".net"]]]
+PUZZLE_2 = [["assert", ["startsWith", ["var", "pqr"], "ftp"]]]
+
+async def http_request (port, method, path, payload=None):
+    reader, writer = await asyncio.open_connection("127.0.0.1", port)
+    body = (b"" if payload is None else json.dumps(payload).encode("utf-8"))
+    writer.write(f"{method} {path} HTTP/1.1\r\nHost: localhost\r\nContent-Length: {len(body)}\r\nConnection: close\r\n\r\n".encode("latin-1") + body)
+    await writer.drain()
+    response = await reader.read()
+    writer.close()
+
+    head, _, response_body = response.partition(b"\r\n\r\n")
+    status = int(head.split(b" ")[1])
+    return (status, json.loads(response_body))
+
+# ====
+# Tests for SingleFlight and SolveService
+# ====
+def test_single_flight_0 ():
+    async def run ():
+        single_flight = SingleFlight()
+        n_calls = [0]
+
+        async def call ():
+            n_calls[0] += 1
+            await asyncio.sleep(0.05)
+            return n_calls[0]
+
+        results = await asyncio.gather(*[single_flight.do("key", call) for _ in range(4)])
+        assert(results == [1, 1, 1, 1] and n_calls[0] == 1 and single_flight.n_coalesced == 3)
+        assert(len(single_flight) == 0) # the key is forgotten once the call is done
+        assert(await single_flight.do("key", call) == 2)
+
+    asyncio.run(run())
+
+def test_solve_service_coalescing ():
+    async def run ():
+        llm = EchoChatModel(latency_seconds=0.05)
+        service = SolveService(ChatGPTClient(llm=llm), max_concurrency=2)
+        solutions = await asyncio.gather(*[service.solve(PUZZLE_0) for _ in range(8)])
+        assert(all([solution == {"abc_0": "www.example.net"} for solution in solutions]))
+        assert(llm.n_calls == 1)
+
+        results = await service.solve_many([PUZZLE_0, PUZZLE_1, PUZZLE_0, [["assert"]]])
+        assert(results[0] == results[2] == {"abc_0": "www.example.net"})
+        assert(results[1] == {"xyz_0": "www.example.net"})
+        assert(isinstance(results[3], InvalidPuzzleError))
+        assert(llm.n_calls == 3)
+        await service.close()
+
+    asyncio.run(run())
+
+def test_solve_service_backpressure ():
+    async def run ():
+        llm = EchoChatModel(latency_seconds=0.1)
+        service = SolveService(ChatGPTClient(llm=llm), max_concurrency=1, max_queue_size=1)
+        first = asyncio.ensure_future(service.solve(PUZZLE_0))
+        await asyncio.sleep(0.02) # the worker took it
+        second = asyncio.ensure_future(service.solve(PUZZLE_1)) # waits in the queue
+        await asyncio.sleep(0)
+
+        with pytest.raises(ServiceOverloadedError):
+            await service.solve(PUZZLE_2)
+        with pytest.raises(ServiceOverloadedError):
+            await service.solve_many([PUZZLE_2])
+        assert(await service.solve(PUZZLE_1) == {"xyz_0": "www.example.net"}) # a duplicate takes no room
+
+        await asyncio.gather(first, second)
+        assert(service.stats()["rejected"] == 2)
+        await service.close()
+
+    asyncio.run(run())
+
+def test_solve_service_batch_admission ():
+    async def run ():
+        llm = EchoChatModel(latency_seconds=0.1)
+        service = SolveService(ChatGPTClient(llm=llm), max_concurrency=1, max_queue_size=2)
+        first = asyncio.ensure_future(service.solve(PUZZLE_0))
+        await asyncio.sleep(0.02) # the worker took it
+
+        # the admitted batch is enqueued before the other request runs
+        batch = asyncio.ensure_future(service.solve_many([PUZZLE_1, PUZZLE_2]))
+        other = asyncio.ensure_future(service.solve([["assert", ["endsWith", ["var", "ijk"], ".org"]]]))
+        results = await batch
+        assert(all([isinstance(result, dict) for result in results]))
+        with pytest.raises(ServiceOverloadedError):
+            await other
+        await first
+        await service.close()
+
+    asyncio.run(run())
+
+def test_error_to_status ():
+    assert(error_to_status(InvalidPuzzleError("bad")) == 400)
+    assert(error_to_status(ServiceOverloadedError()) == 503)
+    assert(error_to_status(TimeoutError()) == 504)
+    # the errors of a valid puzzle's solve are the server's
+    for ex in [ReplayMissError("missing"), ValueError("bad answer"), KeyError("abc_0")]:
+        assert(error_to_status(ex) == 502)
+
+# ====
+# Tests for SolveServer
+# ====
+def test_solve_server_0 ():
+    async def run ():
+        stats = StatsInstrument()
+        client = ChatGPTClient(llm=EchoChatModel(), instrumentation=Instrumentation([stats]))
+        server = SolveServer(SolveService(client, max_queue_size=4, stats_instrument=stats))
+        _, port = await server.start(port=0)
+        try:
+            status, payload = await http_request(port, "POST", "/solve", {"statements": PUZZLE_0})
+            assert(status == 200 and payload == {"solution": {"abc_0": "www.example.net"}})
+
+            status, payload = await http_request(port, "POST", "/solve_many", {"puzzles": [PUZZLE_1, [["assert"]]], "max_tokens": 64})
+            assert(status == 200)
+            assert(payload["results"][0] == {"solution": {"xyz_0": "www.example.net"}})
+            assert(payload["results"][1]["type"] == "InvalidPuzzleError")
+
+            status, payload = await http_request(port, "POST", "/solve", {"puzzle": PUZZLE_0})
+            assert(status == 400)
+            status, payload = await http_request(port, "GET", "/solve")
+            assert(status == 405)
+            status, payload = await http_request(port, "GET", "/healthz")
+            assert(status == 200 and payload["status"] == "ok" and payload["max_queue_size"] == 4)
+            assert(payload["instrumentation"]["phases"]["solve"]["count"] == 2)
+        finally:
+            await server.close()
+
+    asyncio.run(run())
+
+def test_solve_server_unsat ():
+    async def run ():
+        server = SolveServer(SolveService(ChatGPTClient(llm=EchoChatModel(), simplify=True)))
+        _, port = await server.start(port=0)
+        try:
+            status, payload = await http_request(port, "POST", "/solve", {"statements": [
+                ["assert", ["startsWith", ["var", "abc"], "www"]],
+                ["assert", ["startsWith", ["var", "abc"], "ftp"]]
+            ]})
+            assert(status == 422 and payload["type"] == "UnsatisfiableConstraintsError")
+        finally:
+            await server.close()
+
+    asyncio.run(run())
+
+def test_solve_server_close ():
+    async def run ():
+        registry = ClientRegistry()
+        client = registry.get_client(openai_api_key="sk-test")
+        server = SolveServer(SolveService(client), registry=registry)
+        await server.start(port=0)
+        await server.close()
+        assert(len(registry) == 0 and client.llm.http_async_client.is_closed)
+
+    asyncio.run(run())
+
+# ====
+# Tests for the CLI
+# ====
+def test_cli_serve ():
+    args = build_arg_parser().parse_args(["serve", "--port", "9000", "--queue-size", "32", "--simplify"])
+    assert(args.command == "serve" and args.port == 9000 and args.queue_size == 32 and args.simplify)
+    assert(args.host == "127.0.0.1" and not args.symbolic)
+    assert(args.answer_format == "text")
+    assert(build_arg_parser().parse_args(["serve", "--answer-format", "json"]).answer_format == "json")
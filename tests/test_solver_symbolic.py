@@ -0,0 +1,94 @@
+from aitestgen.ir.evaluator import verify_solution 
+from aitestgen.llm.json_2_prompt import execute_json_statements 
+from aitestgen.llm.client import ChatGPTClient 
+from aitestgen.solver.symbolic import SAT, UNSAT, UNKNOWN, UnsatisfiableConstraintsError, solve_symbolically 
+
+from utils import get_fresh_exe_context, EchoChatModel
+
+import logging 
+logging.basicConfig(level=logging.INFO)
+
+def solve (json_statements): 
+    get_fresh_exe_context() 
+    exe_context = execute_json_statements(json_statements)
+    return (exe_context, solve_symbolically(exe_context))
+
+# ====
+# Tests for solve_symbolically 
+# ====
+def test_solve_symbolically_0 (): 
+    exe_context, symbolic_solution = solve([
+        [":=", ["var", "xyz"], ["var", "abc"]], 
+        ["assert", ["startsWith", ["var", "xyz"], "www"]], 
+        ["assert", ["endsWith", ["var", "xyz"], ".net"]]
+    ])
+    assert(symbolic_solution.status == SAT)
+    assert(symbolic_solution.to_solution() == {"abc_1": "www.net"})
+
+def test_solve_symbolically_1 (): 
+    exe_context, symbolic_solution = solve([
+        ["assert", ["startsWith", ["var", "abc"], "ab"]], 
+        ["assert", ["endsWith", ["var", "abc"], "bc"]], 
+        ["assert", ["not", ["endsWith", ["var", "abc"], "abc"]]], 
+        ["assert", ["==", ["var", "abc"], ["var", "pqr"]]], 
+        ["assert", ["not", ["==", ["var", "pqr"], ["var", "ijk"]]]], 
+        ["assert", ["startsWith", ["var", "ijk"], "ab"]]
+    ])
+    assert(symbolic_solution.status == SAT)
+    assert(verify_solution(exe_context, symbolic_solution.model).is_valid)
+    assert(not symbolic_solution.to_solution()["abc_0"].endswith("abc"))
+
+def test_solve_symbolically_2 (): 
+    for json_statements in [
+        [
+            ["assert", ["startsWith", ["var", "abc"], "www"]], 
+            ["assert", ["startsWith", ["var", "abc"], "ftp"]]
+        ], 
+        [
+            [":=", ["var", "xyz"], ["subStr", "www.example.net", 0, 3]], 
+            ["assert", ["==", ["var", "abc"], ["var", "xyz"]]], 
+            ["assert", ["endsWith", ["var", "abc"], ".net"]]
+        ], 
+        [
+            ["assert", ["startsWith", ["var", "abc"], "www"]], 
+            ["assert", ["not", ["startsWith", ["var", "abc"], "ww"]]]
+        ], 
+        [
+            ["assert", ["==", ["var", "abc"], ["var", "xyz"]]], 
+            ["assert", ["not", ["==", ["var", "xyz"], ["var", "abc"]]]]
+        ]
+    ]: 
+        _, symbolic_solution = solve(json_statements)
+        assert(symbolic_solution.status == UNSAT), json_statements
+
+def test_solve_symbolically_3 (): 
+    _, symbolic_solution = solve([
+        [":=", ["var", "xyz"], ["subStr", ["var", "abc"], 0, 3]], 
+        ["assert", ["==", ["var", "xyz"], "www"]]
+    ])
+    assert(symbolic_solution.status == UNKNOWN)
+
+# ====
+# Tests for the client's fast path 
+# ====
+def test_client_symbolic_solver_0 (): 
+    get_fresh_exe_context() 
+
+    llm = EchoChatModel() 
+    client = ChatGPTClient(llm=llm, use_symbolic_solver=True)
+
+    assert(client.solve_json_statements([["assert", ["startsWith", ["var", "abc"], "www"]]]) == {"abc_0": "www"})
+    assert(llm.n_calls == 0)
+
+    try: 
+        client.solve_json_statements([["assert", ["==", "www", "ftp"]], ["assert", ["==", ["var", "abc"], "x"]]])
+        assert(False), "Expected UnsatisfiableConstraintsError"
+    except UnsatisfiableConstraintsError: 
+        pass 
+
+    # the residual puzzle goes to the LLM 
+    client.solve_json_statements([
+        [":=", ["var", "xyz"], ["subStr", ["var", "abc"], 0, 3]], 
+        ["assert", ["==", ["var", "xyz"], "www"]]
+    ])
+    assert(llm.n_calls == 1)
@@ -1,6 +1,28 @@
-from aitestgen.ir import node as ir_node 
+from typing import Any, Dict, Iterator, List 
+from langchain_core.messages import BaseMessage
+from langchain_core.outputs import ChatGenerationChunk
 from aitestgen.ir.interpreter import ExecutionContext 
+from aitestgen.llm.stub import StubChatModel 
 
 def get_fresh_exe_context (): 
-    ir_node.NEXT_VARIABLE_ID = 0
-    return ExecutionContext() 
\ No newline at end of file
+    return ExecutionContext() 
+
+# ====
+# Offline chat model for the LLM client tests 
+# ====
+class EchoChatModel (StubChatModel): 
+    """
+    The stub chat model, which also appends the ramble to its answers and records the calls. 
+    """
+    ramble :str = "" 
+    n_streamed_chunks :int = 0 
+    call_kwargs :List[Dict] = [] 
+
+    def _say (self, messages :List[BaseMessage], **kwargs) -> str: 
+        self.call_kwargs.append(kwargs)
+        return super()._say(messages, **kwargs) + self.ramble 
+
+    def _stream (self, messages :List[BaseMessage], stop :Any=None, run_manager :Any=None, **kwargs) -> Iterator[ChatGenerationChunk]: 
+        for chunk in super()._stream(messages, stop=stop, run_manager=run_manager, **kwargs): 
+            self.n_streamed_chunks += 1 
+            yield chunk 